@@ -0,0 +1,68 @@
+from itertools import combinations
+
+import pandas as pd
+
+# Cubo de agregados pré-calculados para o drill-down.
+# O cubo agrupa os lançamentos uma única vez pelos níveis (mês, centro,
+# especificação) e guarda um rollup para cada combinação de níveis. Um clique
+# em um gráfico vira apenas uma consulta (.xs) no rollup certo, sem refiltrar
+# nem reagrupar os lançamentos. Totais em centavos inteiros. Chaves vazias
+# (ex.: lançamento sem Centro de Custo) formam um grupo próprio, para que os
+# totais do drill-down batam com os do recorte.
+
+NIVEIS_DESPESAS = ('Mes_Num', 'Centro de Custo', 'Especificação')
+METRICAS = {'Total': 'sum', 'Quantidade': 'sum', 'Maior Valor': 'max'}
+
+
+# Linha única com o total geral de uma tabela de rollup
+def _resumo(tabela):
+    return pd.DataFrame({
+        'Total': [int(tabela['Total'].sum())],
+        'Quantidade': [int(tabela['Quantidade'].sum())],
+        'Maior Valor': [int(tabela['Maior Valor'].max()) if len(tabela) > 0 else 0]
+    })
+
+
+class Cubo:
+    def __init__(self, df, niveis=NIVEIS_DESPESAS, coluna_valor='Centavos'):
+        self.niveis = tuple(niveis)
+        base = df.groupby(list(self.niveis), observed=True, dropna=False)[coluna_valor].agg(['sum', 'count', 'max'])
+        base.columns = ['Total', 'Quantidade', 'Maior Valor']
+
+        # Um rollup por subconjunto de níveis (2^3 = 8 tabelas pequenas)
+        self._rollups = {self.niveis: base}
+        for tamanho in range(len(self.niveis) - 1, 0, -1):
+            for combinacao in combinations(self.niveis, tamanho):
+                self._rollups[combinacao] = base.groupby(level=list(combinacao), dropna=False).agg(METRICAS)
+        self._rollups[()] = _resumo(base)
+
+    # drill: {nível: valor} já escolhidos; agrupar_por: níveis do resultado
+    def consultar(self, drill, agrupar_por=()):
+        chaves = [nivel for nivel in self.niveis if nivel in drill or nivel in agrupar_por]
+        tabela = self._rollups[tuple(chaves)]
+        if not drill:
+            return tabela.reset_index() if agrupar_por else tabela
+
+        filtro = [nivel for nivel in chaves if nivel in drill]
+        valores = tuple(drill[nivel] for nivel in filtro)
+        try:
+            if any(pd.isna(valor) for valor in valores):
+                # Chave vazia não é localizada por .xs/.loc
+                mascara = pd.Series(True, index=tabela.index)
+                for nivel, valor in zip(filtro, valores):
+                    nivel_valores = tabela.index.get_level_values(nivel)
+                    mascara &= nivel_valores.isna() if pd.isna(valor) else nivel_valores == valor
+                resultado = tabela[mascara.to_numpy()]
+            elif len(chaves) == 1:
+                resultado = tabela.loc[[valores[0]]]
+            else:
+                resultado = tabela.xs(valores, level=filtro, drop_level=False)
+        except KeyError:
+            resultado = tabela.iloc[0:0]
+
+        if not agrupar_por:
+            return _resumo(resultado)
+        return resultado.reset_index()[list(agrupar_por) + list(METRICAS)]
+
+    def tamanho(self):
+        return sum(len(tabela) for tabela in self._rollups.values())
@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+
+from cache_limitado import cache
+
+# Detecção de lançamentos fora do padrão e de possíveis pagamentos duplicados.
+# Para cada chave (centro, especificação, fornecedor) o módulo mantém
+# estatísticas acumuladas do logaritmo do valor: quantidade, média e soma dos
+# quadrados dos desvios (Welford), combinadas mês a mês pela fórmula de Chan.
+# Cada lançamento é comparado com o histórico da própria chave (meses
+# anteriores e os demais lançamentos do mês); quando a chave tem pouco
+# histórico, usa-se a chave mais ampla (centro + especificação, depois só o
+# centro). Duplicata: mesmo fornecedor e mesmo valor em até N dias.
+#
+# Os meses são processados em ordem e o resultado de cada um (lançamentos
+# pontuados e estado acumulado) fica no cache, chaveado pela versão do mês
+# (impressão digital dos arquivos, ver repositorio.py) e pelas dos meses
+# anteriores. Um mês só é lido quando o seu passo não está no cache: com o
+# histórico já pontuado, um mês novo ou alterado é lido e pontuado sozinho
+# (mais os meses seguintes a ele, cujo estado de partida mudou).
+
+NIVEIS = [
+    ('Centro de Custo', 'Especificação', 'Fornecedor'),
+    ('Centro de Custo', 'Especificação'),
+    ('Centro de Custo',),
+]
+NOMES_NIVEIS = {3: 'centro + especificação + fornecedor', 2: 'centro + especificação', 1: 'centro'}
+
+# Histórico mínimo para pontuar e limiar do desvio padronizado
+MIN_HISTORICO = 5
+LIMIAR_Z = 3.0
+JANELA_DUPLICATA_DIAS = 3
+
+# Colunas usadas como identificação do fornecedor, na ordem de preferência
+# (nas planilhas o favorecido costuma vir só na Observação)
+COLUNAS_FORNECEDOR = ['Fornecedor', 'Pessoa', 'Observação', 'Histórico']
+
+COLUNAS_RESULTADO = ['Data Lançamento', 'Centro de Custo', 'Especificação', 'Fornecedor', 'Centavos',
+                     'Valor Típico', 'Desvio', 'Base', 'Referência', 'Fora do Padrão', 'Duplicata',
+                     'Dias da Anterior']
+
+
+# Fornecedor de cada lançamento: primeira coluna preenchida da lista
+def _fornecedor(df):
+    fornecedor = pd.Series('', index=df.index, dtype=object)
+    for coluna in reversed(COLUNAS_FORNECEDOR):
+        if coluna in df.columns:
+            valores = df[coluna].astype('string').str.strip()
+            fornecedor = valores.where(valores.notna() & (valores != ''), fornecedor)
+    return fornecedor.astype(object)
+
+
+# Colunas usadas na pontuação, com chaves sem vazios (NaN não casa em junções)
+def _preparar(df):
+    centavos = df['Centavos'].astype('int64')
+    base = pd.DataFrame({
+        'Data Lançamento': pd.to_datetime(df['Data Lançamento'], errors='coerce')
+        if 'Data Lançamento' in df.columns else pd.NaT,
+        'Centro de Custo': df['Centro de Custo'].fillna('(não informado)').astype(object),
+        'Especificação': df['Especificação'].fillna('(não informado)').astype(object),
+        'Fornecedor': _fornecedor(df),
+        'Centavos': centavos,
+    }, index=df.index)
+    base['x'] = np.log(centavos.where(centavos > 0).astype('float64'))
+    return base
+
+
+def _estado_vazio():
+    return {nivel: pd.DataFrame({'n': [], 'media': [], 'm2': []}) for nivel in NIVEIS}
+
+
+# Estatísticas de um mês por chave: quantidade, média e soma dos quadrados
+def _estatisticas(base, chaves):
+    validos = base[base['x'].notna()]
+    grupos = validos.groupby(list(chaves))['x']
+    return pd.DataFrame({'n': grupos.count(), 'media': grupos.mean(), 'm2': grupos.var(ddof=0) * grupos.count()})
+
+
+# Combinação de dois estados (Chan et al.), vetorizada sobre as chaves
+def _combinar(a, b):
+    if a.empty:
+        return b
+    if b.empty:
+        return a
+    a, b = a.align(b, join='outer', fill_value=0)
+    n = a['n'] + b['n']
+    delta = b['media'] - a['media']
+    return pd.DataFrame({
+        'n': n,
+        'media': a['media'] + delta * b['n'] / n,
+        'm2': a['m2'] + b['m2'] + delta ** 2 * a['n'] * b['n'] / n
+    })
+
+
+# Desvio de cada lançamento contra o estado do nível, sem o próprio lançamento
+def _desvio(base, estado, chaves):
+    chaves = list(chaves)
+    juncao = base[chaves + ['x']].join(estado, on=chaves)
+    n, media, m2, x = juncao['n'], juncao['media'], juncao['m2'], juncao['x']
+    n_sem = n - 1
+    media_sem = (n * media - x) / n_sem
+    m2_sem = m2 - (x - media) * (x - media_sem)
+    desvio_padrao = np.sqrt((m2_sem / (n_sem - 1)).where(n_sem > 1))
+    z = ((x - media_sem) / desvio_padrao).where(desvio_padrao > 0)
+    return pd.DataFrame({'z': z, 'n': n_sem, 'media': media_sem}, index=base.index)
+
+
+# Pontua um mês: desvio pelo nível mais específico com histórico suficiente
+def _pontuar(base, estado):
+    z = pd.Series(np.nan, index=base.index)
+    referencia = pd.Series(0, index=base.index)
+    historico = pd.Series(0, index=base.index)
+    media = pd.Series(np.nan, index=base.index)
+    for nivel in NIVEIS:
+        desvio = _desvio(base, estado[nivel], nivel)
+        usar = z.isna() & (desvio['n'] >= MIN_HISTORICO) & desvio['z'].notna()
+        z = z.where(~usar, desvio['z'])
+        referencia = referencia.where(~usar, len(nivel))
+        historico = historico.where(~usar, desvio['n'])
+        media = media.where(~usar, desvio['media'])
+    return z, referencia, historico, media
+
+
+# Possíveis duplicatas: mesmo fornecedor e valor em até `janela` dias. A cauda
+# do mês anterior entra na comparação, mas só o mês atual é marcado.
+def _duplicatas(base, cauda, janela):
+    conjunto = base.assign(_atual=True)
+    if cauda is not None:
+        conjunto = pd.concat([cauda.assign(_atual=False), conjunto])
+    conjunto = conjunto[(conjunto['Fornecedor'] != '') & conjunto['Data Lançamento'].notna()]
+    conjunto = conjunto.sort_values(['Fornecedor', 'Centavos', 'Data Lançamento'], kind='stable')
+    anterior = conjunto.groupby(['Fornecedor', 'Centavos'], sort=False)['Data Lançamento'].shift()
+    dias = (conjunto['Data Lançamento'] - anterior).dt.days
+    marcados = conjunto['_atual'] & (dias <= janela)
+    return dias[marcados].reindex(base.index)
+
+
+def _processar_mes(df, estado, cauda, janela):
+    if df is None or df.empty or 'Centavos' not in df.columns:
+        return pd.DataFrame(columns=COLUNAS_RESULTADO), estado, cauda
+    base = _preparar(df)
+    estado_mes = {nivel: _combinar(estado[nivel], _estatisticas(base, nivel)) for nivel in NIVEIS}
+    z, referencia, historico, media = _pontuar(base, estado_mes)
+    dias = _duplicatas(base, cauda, janela)
+
+    pontuados = base.drop(columns='x').assign(
+        **{
+            'Valor Típico': np.rint(np.exp(media)).astype('Int64'),
+            'Desvio': z,
+            'Base': historico.astype('int64'),
+            'Referência': referencia.map(NOMES_NIVEIS),
+            'Fora do Padrão': z.abs() >= LIMIAR_Z,
+            'Duplicata': dias.notna(),
+            'Dias da Anterior': dias.astype('Int64'),
+        }
+    )
+
+    # Lançamentos dos últimos dias do mês, para as duplicatas do mês seguinte
+    datas = base['Data Lançamento'].dropna()
+    nova_cauda = base.iloc[0:0]
+    if not datas.empty:
+        nova_cauda = base[base['Data Lançamento'] > datas.max() - pd.Timedelta(days=janela)]
+    return pontuados[COLUNAS_RESULTADO], estado_mes, nova_cauda.drop(columns='x')
+
+
+# Pontua os meses em ordem cronológica e devolve todos os lançamentos com
+# desvio, referência e marcação de duplicata. meses: lista de (rótulo,
+# versão, carregar), em que carregar() devolve o DataFrame do mês e só é
+# chamado quando o mês não está no cache
+def pontuar_meses(meses, janela=JANELA_DUPLICATA_DIAS):
+    estado, cauda = _estado_vazio(), None
+    # A chave de cada mês encadeia as versões dos meses anteriores
+    chave_estado = ('anomalias', janela)
+    partes = []
+    for rotulo, versao, carregar in meses:
+        chave_estado = (chave_estado, rotulo, versao)
+        pontuados, estado, cauda = cache.obter_ou_calcular(
+            chave_estado, 'agregados', lambda: _processar_mes(carregar(), estado, cauda, janela)
+        )
+        if not pontuados.empty:
+            partes.append(pontuados.assign(Mês=rotulo))
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_RESULTADO + ['Mês'])
+    return pd.concat(partes)
+
+
+# Só os lançamentos marcados, dos mais destoantes para os menos
+def sinalizados(pontuados):
+    marcados = pontuados[pontuados['Fora do Padrão'] | pontuados['Duplicata']]
+    return marcados.assign(_ordem=marcados['Desvio'].abs().fillna(0)).sort_values(
+        ['Duplicata', '_ordem'], ascending=False
+    ).drop(columns='_ordem')
@@ -0,0 +1,318 @@
+import argparse
+import hashlib
+import json
+import logging
+import math
+import re
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from cache_limitado import cache
+from dados import (ASSINATURA_CODIGO, MESES_NOMES, iniciar_monitor, listar_meses_mensais, obter_despesas,
+                   obter_mensal, obter_receitas)
+from dinheiro import para_reais, percentual
+
+# API JSON local com os mesmos números dos dashboards, para outros programas
+# (boletim semanal, planilha da tesouraria) não precisarem reler o Excel.
+# O ETag de cada resposta vem das versões dos conjuntos usados, então um
+# cliente que repete a pergunta recebe 304 enquanto as planilhas não mudam.
+# Cada requisição roda em uma thread (ThreadingHTTPServer); os dados vêm do
+# repositório e do cache compartilhado, que já são seguros entre threads.
+#
+# Uso: python api.py [--host 127.0.0.1] [--porta 8600]
+#
+# Filtros das rotas de despesas (podem ser repetidos):
+#   ?centro=MISSÕES&excluir=CHÁCARA&especificacao=...&mes=03/2025
+
+logger = logging.getLogger(__name__)
+
+PORTA_PADRAO = 8600
+TOP_MAXIMO = 100
+
+
+# Erro com status HTTP (vira uma resposta JSON com a mensagem)
+class ErroApi(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+def _numero(valor):
+    if valor is None or (isinstance(valor, float) and not math.isfinite(valor)):
+        return None
+    return round(float(valor), 2)
+
+
+def _registros(df):
+    registros = []
+    for linha in df.to_dict('records'):
+        registros.append({
+            chave: (_numero(v) if isinstance(v, float) else (None if pd.isna(v) else v))
+            for chave, v in linha.items()
+        })
+    return registros
+
+
+def _top_n(params):
+    try:
+        n = int(params.get('n', ['10'])[0])
+    except ValueError:
+        raise ErroApi(HTTPStatus.BAD_REQUEST, "parâmetro 'n' deve ser inteiro")
+    return max(1, min(n, TOP_MAXIMO))
+
+
+# Somas em centavos inteiros; reais só na serialização
+def _total(df):
+    return int(df['Centavos'].sum()) if len(df) > 0 else 0
+
+
+def _kpis(df):
+    vazio = len(df) == 0
+    return {
+        'total': _numero(para_reais(_total(df))),
+        'lancamentos': int(len(df)),
+        'media': _numero(para_reais(df['Centavos'].mean())) if not vazio else 0.0,
+        'maior': _numero(para_reais(int(df['Centavos'].max()))) if not vazio else 0.0
+    }
+
+
+def _resumo_centros(df):
+    if df.empty or 'Centro de Custo' not in df.columns:
+        return []
+    resumo = df.groupby('Centro de Custo')['Centavos'].agg(['sum', 'mean', 'count', 'max']).reset_index()
+    resumo.columns = ['centro', 'total', 'media', 'lancamentos', 'maior']
+    resumo = resumo.sort_values('total', ascending=False)
+    resumo['percentual'] = resumo['total'] / resumo['total'].sum() * 100
+    resumo[['total', 'media', 'maior']] = para_reais(resumo[['total', 'media', 'maior']])
+    return _registros(resumo)
+
+
+def _top_especificacoes(df, n):
+    if df.empty:
+        return []
+    top = df.groupby('Especificação')['Centavos'].agg(['sum', 'count']).reset_index()
+    top.columns = ['especificacao', 'total', 'lancamentos']
+    top = top.sort_values('total', ascending=False).head(n)
+    top['total'] = para_reais(top['total'])
+    return _registros(top)
+
+
+# Despesas anuais com os mesmos filtros da barra lateral do dashboard
+def _despesas_filtradas(instantaneo, params):
+    df, _ = instantaneo.dados
+    filtros = {
+        'Centro de Custo': {'incluir': params.get('centro', []), 'excluir': params.get('excluir', [])},
+        'Especificação': {'incluir': params.get('especificacao', [])},
+        'Mês Ano Ref.': {'incluir': params.get('mes', [])}
+    }
+    return df[instantaneo.derivados['indice'].filtrar(filtros)]
+
+
+def _receitas_filtradas(instantaneo, params):
+    df_receitas, _ = instantaneo.dados
+    if params.get('mes'):
+        meses = [int(m.split('/')[0]) for m in params['mes'] if m.split('/')[0].isdigit()]
+        df_receitas = df_receitas[df_receitas['Mes_Num'].isin(meses)]
+    return df_receitas
+
+
+def kpis_anual(instantaneos, params, grupos):
+    despesas, receitas = instantaneos
+    df = _despesas_filtradas(despesas, params)
+    resposta = {'despesas': _kpis(df)}
+    # Como no dashboard: com centro de custo escolhido, receitas não se aplicam
+    if not params.get('centro'):
+        total_receitas = _total(_receitas_filtradas(receitas, params))
+        total_despesas = _total(df)
+        resposta['receitas'] = {
+            'total': _numero(para_reais(total_receitas)),
+            'saldo': _numero(para_reais(total_receitas - total_despesas)),
+            'percentual_despesas': _numero(percentual(total_despesas, total_receitas))
+        }
+    return resposta
+
+
+def centros_anual(instantaneos, params, grupos):
+    return {'centros': _resumo_centros(_despesas_filtradas(instantaneos[0], params))}
+
+
+def serie_anual(instantaneos, params, grupos):
+    despesas, receitas = instantaneos
+    por_mes = pd.DataFrame({
+        'despesas': _despesas_filtradas(despesas, params).groupby('Mes_Num')['Centavos'].sum(),
+        'receitas': _receitas_filtradas(receitas, params).groupby('Mes_Num')['Centavos'].sum()
+    }).fillna(0).astype('int64').sort_index()
+    por_mes['saldo'] = por_mes['receitas'] - por_mes['despesas']
+    por_mes = para_reais(por_mes)
+    por_mes.index.name = 'mes'
+    por_mes = por_mes.reset_index()
+    por_mes.insert(1, 'nome', por_mes['mes'].map(MESES_NOMES))
+    return {'meses': _registros(por_mes)}
+
+
+def top_anual(instantaneos, params, grupos):
+    df = _despesas_filtradas(instantaneos[0], params)
+    return {'top': _top_especificacoes(df, _top_n(params))}
+
+
+def _tipo_mensal(params):
+    tipo = params.get('tipo', ['saidas'])[0]
+    if tipo not in ('entradas', 'saidas'):
+        raise ErroApi(HTTPStatus.BAD_REQUEST, "parâmetro 'tipo' deve ser 'entradas' ou 'saidas'")
+    return tipo
+
+
+def kpis_mes(instantaneos, params, grupos):
+    entradas, saidas = (i.dados[0] for i in instantaneos)
+    saldo = _total(entradas) - _total(saidas)
+    return {
+        'mes': grupos['mes'],
+        'entradas': _kpis(entradas),
+        'saidas': _kpis(saidas),
+        'saldo': _numero(para_reais(saldo))
+    }
+
+
+def centros_mes(instantaneos, params, grupos):
+    tipo = _tipo_mensal(params)
+    df = instantaneos[0 if tipo == 'entradas' else 1].dados[0]
+    return {'mes': grupos['mes'], 'tipo': tipo, 'centros': _resumo_centros(df)}
+
+
+def serie_mes(instantaneos, params, grupos):
+    serie = {}
+    for tipo, instantaneo in zip(('entradas', 'saidas'), instantaneos):
+        df = instantaneo.dados[0]
+        if df.empty:
+            serie[tipo] = []
+            continue
+        por_dia = df.groupby(df['Data Lançamento'].dt.strftime('%Y-%m-%d'))['Centavos'].sum().reset_index()
+        por_dia.columns = ['data', 'total']
+        por_dia['total'] = para_reais(por_dia['total'])
+        serie[tipo] = _registros(por_dia)
+    return {'mes': grupos['mes'], **serie}
+
+
+def top_mes(instantaneos, params, grupos):
+    tipo = _tipo_mensal(params)
+    df = instantaneos[0 if tipo == 'entradas' else 1].dados[0]
+    return {'mes': grupos['mes'], 'tipo': tipo, 'top': _top_especificacoes(df, _top_n(params))}
+
+
+def meses(instantaneos, params, grupos):
+    return {'meses': listar_meses_mensais()}
+
+
+def _conjuntos_anuais(grupos):
+    return (obter_despesas(), obter_receitas())
+
+
+def _conjuntos_mes(grupos):
+    if grupos['mes'] not in listar_meses_mensais():
+        raise ErroApi(HTTPStatus.NOT_FOUND, f"mês '{grupos['mes']}' não encontrado em mensal/")
+    return (obter_mensal('entradas', grupos['mes']), obter_mensal('saidas', grupos['mes']))
+
+
+# (padrão da rota, conjuntos usados, função que monta a resposta)
+ROTAS = [
+    (r'/api/anual/kpis', _conjuntos_anuais, kpis_anual),
+    (r'/api/anual/centros', _conjuntos_anuais, centros_anual),
+    (r'/api/anual/mensal', _conjuntos_anuais, serie_anual),
+    (r'/api/anual/top', _conjuntos_anuais, top_anual),
+    (r'/api/mensal', lambda grupos: (), meses),
+    (r'/api/mensal/(?P<mes>[a-z]{3})/kpis', _conjuntos_mes, kpis_mes),
+    (r'/api/mensal/(?P<mes>[a-z]{3})/centros', _conjuntos_mes, centros_mes),
+    (r'/api/mensal/(?P<mes>[a-z]{3})/diario', _conjuntos_mes, serie_mes),
+    (r'/api/mensal/(?P<mes>[a-z]{3})/top', _conjuntos_mes, top_mes),
+]
+ROTAS = [(re.compile(padrao + r'/?$'), conjuntos, funcao) for padrao, conjuntos, funcao in ROTAS]
+
+
+def _etag(caminho, params, instantaneos):
+    # A lista de meses muda com os arquivos da pasta, não com uma versão
+    extra = listar_meses_mensais() if not instantaneos else []
+    partes = [caminho, json.dumps(sorted(params.items())), ASSINATURA_CODIGO, str(extra)]
+    partes += [instantaneo.versao for instantaneo in instantaneos]
+    return '"' + hashlib.sha1("|".join(partes).encode('utf-8')).hexdigest()[:20] + '"'
+
+
+class ManipuladorApi(BaseHTTPRequestHandler):
+    server_version = 'IPBApi/1.0'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        try:
+            for padrao, conjuntos, funcao in ROTAS:
+                encontrado = padrao.match(url.path)
+                if encontrado:
+                    break
+            else:
+                raise ErroApi(HTTPStatus.NOT_FOUND, f"rota '{url.path}' não existe")
+
+            grupos = encontrado.groupdict()
+            instantaneos = conjuntos(grupos)
+            etag = _etag(url.path, params, instantaneos)
+            if etag in [e.strip() for e in self.headers.get('If-None-Match', '').split(',')]:
+                self._responder(HTTPStatus.NOT_MODIFIED, None, etag)
+                return
+
+            corpo = cache.obter_ou_calcular(
+                ('api', etag), 'exportacoes',
+                lambda: json.dumps(funcao(instantaneos, params, grupos), ensure_ascii=False).encode('utf-8')
+            )
+            self._responder(HTTPStatus.OK, corpo, etag)
+        except ErroApi as erro:
+            corpo = json.dumps({'erro': erro.mensagem}, ensure_ascii=False).encode('utf-8')
+            self._responder(erro.status, corpo)
+        except Exception:
+            logger.exception("Erro ao responder %s", self.path)
+            corpo = json.dumps({'erro': 'erro interno'}).encode('utf-8')
+            self._responder(HTTPStatus.INTERNAL_SERVER_ERROR, corpo)
+
+    def _responder(self, status, corpo, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        if corpo is not None:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        if corpo is not None:
+            self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        logger.info("%s - %s", self.address_string(), formato % args)
+
+
+def criar_servidor(host='127.0.0.1', porta=PORTA_PADRAO):
+    servidor = ThreadingHTTPServer((host, porta), ManipuladorApi)
+    servidor.daemon_threads = True
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API JSON local dos dashboards IPB")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=PORTA_PADRAO)
+    opcoes = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    iniciar_monitor()
+    servidor = criar_servidor(opcoes.host, opcoes.porta)
+    print(f"API disponível em http://{opcoes.host}:{opcoes.porta}/api/anual/kpis")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
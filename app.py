@@ -0,0 +1,22 @@
+import streamlit as st
+
+from dados import iniciar_monitor
+from interface import configurar_pagina
+
+# Aplicação única do Dashboard IPB: as páginas anual e mensal rodam no mesmo
+# servidor e compartilham o repositório de dados de dados.py, então cada
+# planilha, índice e agregado é lido uma vez e serve às duas páginas e a
+# todas as sessões.
+#
+# Uso: streamlit run app.py
+
+configurar_pagina("Dashboard Financeiro - IPB", "⛪")
+
+# Monitorar as planilhas (uma vez por processo, para as duas páginas)
+iniciar_monitor()
+
+pagina = st.navigation([
+    st.Page("dashboard_despesas.py", title="Visão Anual", icon="⛪", url_path="anual", default=True),
+    st.Page("dashboard_mensal.py", title="Visão Mensal", icon="📅", url_path="mensal"),
+])
+pagina.run()
@@ -0,0 +1,96 @@
+import argparse
+import sys
+import time
+
+import dados
+
+# Aquecimento do cache na subida do servidor.
+# Lê todos os conjuntos (Excel, receitas, orçamento e meses da pasta mensal/),
+# monta os agregados e índices derivados e executa uma vez a visão padrão
+# (sem filtros) de cada dashboard, o que deixa cubos e figuras no cache.
+#
+# Uso:
+#   python aquecimento.py                               # só aquece e grava os instantâneos em disco
+#   python aquecimento.py --servir app.py               # aquece e sobe o Streamlit no mesmo processo
+#
+# Com --servir o cache aquecido é o mesmo usado pelo servidor, então o
+# primeiro visitante já encontra tudo pronto. Sem --servir, o ganho vem dos
+# instantâneos gravados em disco, lidos pelo servidor na primeira consulta.
+
+DASHBOARDS = ['dashboard_despesas.py', 'dashboard_mensal.py']
+
+
+def _cronometrar(rotulo, funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    print(f"  {rotulo:<40} {time.perf_counter() - inicio:6.2f}s")
+    return resultado
+
+
+# Lê todos os conjuntos registrados (com seus derivados)
+def carregar_conjuntos():
+    _cronometrar("despesas", dados.obter_despesas)
+    _cronometrar("receitas", dados.obter_receitas)
+    _cronometrar("hierarquia de receitas", dados.obter_arvore_receitas)
+    _cronometrar("orçamento", dados.obter_orcamento)
+    _cronometrar("saldos iniciais", dados.obter_saldos_iniciais)
+    for mes in dados.listar_meses_mensais():
+        for tipo in ('entradas', 'saidas'):
+            _cronometrar(f"{tipo}/{mes}", lambda: dados.obter_mensal(tipo, mes))
+
+
+# Executa a visão padrão de cada dashboard neste processo
+def renderizar_paginas():
+    from streamlit.testing.v1 import AppTest
+
+    falhas = []
+    for pagina in DASHBOARDS:
+        app = AppTest.from_file(str(dados.BASE_DIR / pagina), default_timeout=300)
+        _cronometrar(f"página {pagina}", app.run)
+        if app.exception:
+            falhas.append(pagina)
+            print(f"  ⚠️ {pagina}: {app.exception[0].value}")
+    return falhas
+
+
+def aquecer(renderizar=True):
+    inicio = time.perf_counter()
+    print("Carregando conjuntos de dados...")
+    carregar_conjuntos()
+    falhas = []
+    if renderizar:
+        print("Renderizando a visão padrão dos dashboards...")
+        falhas = renderizar_paginas()
+
+    metricas = dados.cache.metricas()
+    print(
+        f"Aquecimento concluído em {time.perf_counter() - inicio:.2f}s "
+        f"({metricas['itens']} itens, {metricas['bytes'] / 1024**2:.1f} MB em cache)"
+    )
+    return falhas
+
+
+# Sobe o Streamlit neste mesmo processo (equivale a `streamlit run`)
+def servir(script, argumentos):
+    from streamlit.web import cli
+
+    sys.argv = ['streamlit', 'run', script] + list(argumentos)
+    return cli.main()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aquece o cache dos dashboards IPB")
+    parser.add_argument('--sem-render', action='store_true',
+                        help="apenas carrega os dados, sem executar os dashboards")
+    parser.add_argument('--servir', metavar='SCRIPT',
+                        help="depois de aquecer, sobe o Streamlit com este script (ex.: app.py)")
+    opcoes, argumentos_streamlit = parser.parse_known_args()
+
+    falhas = aquecer(renderizar=not opcoes.sem_render)
+    if opcoes.servir:
+        return servir(opcoes.servir, argumentos_streamlit)
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
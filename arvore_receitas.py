@@ -0,0 +1,188 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from dinheiro import para_centavos
+from validacao import COLUNA_CATEGORIA_RECEITAS, MESES_COLUNAS
+
+# Hierarquia da planilha de receitas.
+# A planilha tem grupos (dizimáveis / não dizimáveis, fechados pelas linhas
+# "Total geral de ..."), seções (A) DIZIMAVEIS IGREJA, NOVA GRANADA...),
+# subgrupos terminados em ':' (Chácara:, Rendimentos:...) e as categorias.
+# A árvore vira uma tabela de nós (id, pai, rótulo, nível) com os subtotais de
+# cada mês já somados em centavos, então sunburst, treemap e tabelas de
+# subtotal leem os nós direto, sem reagrupar as linhas.
+#
+# O fim de um subgrupo não é marcado na planilha: as categorias dele vêm sem
+# negrito, e a primeira linha em negrito volta para o nível da seção. Sem a
+# informação de negrito (CSV), o subgrupo vai até a próxima seção ou total.
+
+RAIZ = 'Receitas'
+SEPARADOR = ' / '
+MESES = list(range(1, 13))
+TIPOS = {1: 'grupo', 2: 'seção', 3: 'subgrupo', 4: 'categoria'}
+
+
+# Negrito da coluna de rótulos, linha a linha (mesma ordem do pandas)
+def ler_negrito(arquivo):
+    import openpyxl
+
+    livro = openpyxl.load_workbook(arquivo, read_only=True)
+    try:
+        planilha = livro.worksheets[0]
+        negrito = [bool(linha[0].font.b) if linha and linha[0].font is not None else False
+                   for linha in planilha.iter_rows(min_row=2, max_col=1)]
+    finally:
+        livro.close()
+    return negrito
+
+
+def _nome_grupo(rotulo):
+    nome = re.sub(r'(?i)^\s*total\s+geral\s+de\s+', '', rotulo).strip().rstrip(':').strip()
+    return nome[:1].upper() + nome[1:]
+
+
+# Percorre as linhas uma vez e devolve as folhas (com o caminho até elas) e as
+# linhas de total da própria planilha, para conferência
+def _percorrer(df, negrito):
+    meses = [mes for mes in MESES_COLUNAS if mes in df.columns]
+    valores = df[meses].apply(pd.to_numeric, errors='coerce')
+    sem_valores = valores.isna().all(axis=1).to_numpy()
+    rotulos = df[COLUNA_CATEGORIA_RECEITAS]
+
+    folhas, totais = [], []
+    secoes_pendentes = []
+    secao, subgrupo = COLUNA_CATEGORIA_RECEITAS, None
+    for posicao, (indice, rotulo) in enumerate(rotulos.items()):
+        if pd.isna(rotulo) or not str(rotulo).strip():
+            continue
+        rotulo = str(rotulo).strip()
+        linha_excel = indice + 2
+
+        if re.match(r'(?i)^total', rotulo):
+            if re.match(r'(?i)^total\s+geral\s+de\s+receitas', rotulo):
+                totais.append((linha_excel, rotulo, 'raiz', None))
+            elif re.match(r'(?i)^total\s+geral', rotulo):
+                grupo = _nome_grupo(rotulo)
+                for folha in folhas:
+                    if folha['secao'] in secoes_pendentes and folha['grupo'] is None:
+                        folha['grupo'] = grupo
+                totais.append((linha_excel, rotulo, 'grupo', grupo))
+                secoes_pendentes = []
+            else:
+                totais.append((linha_excel, rotulo, 'secao', secao))
+            subgrupo = None
+            continue
+
+        if sem_valores[posicao]:
+            if rotulo.endswith(':'):
+                subgrupo = rotulo.rstrip(':').strip()
+            else:
+                secao, subgrupo = rotulo, None
+            continue
+
+        if subgrupo is not None and negrito is not None and posicao < len(negrito) and negrito[posicao]:
+            subgrupo = None
+        if secao not in secoes_pendentes:
+            secoes_pendentes.append(secao)
+        folhas.append({
+            'grupo': None, 'secao': secao, 'subgrupo': subgrupo, 'categoria': rotulo, 'indice': indice
+        })
+
+    folhas = pd.DataFrame(folhas, columns=['grupo', 'secao', 'subgrupo', 'categoria', 'indice'])
+    centavos = para_centavos(valores.loc[folhas['indice']].to_numpy()) if len(folhas) else np.zeros((0, len(meses)), 'int64')
+    numeros = [MESES_COLUNAS.index(mes) + 1 for mes in meses]
+    for coluna, mes in enumerate(numeros):
+        folhas[mes] = centavos[:, coluna] if len(folhas) else pd.Series(dtype='int64')
+    for mes in MESES:
+        if mes not in folhas.columns:
+            folhas[mes] = 0
+    return folhas, totais, valores
+
+
+# Tabela de nós: cada folha contribui para si e para todos os ancestrais;
+# um único groupby soma os subtotais de todos os níveis
+def _nos(folhas):
+    partes, caminhos, tipos = [], [], []
+    for folha in folhas[['grupo', 'secao', 'subgrupo', 'categoria']].itertuples(index=False):
+        niveis = [(nivel, parte) for nivel, parte in enumerate(folha, start=1) if isinstance(parte, str)]
+        caminhos.append([RAIZ] + [parte for _, parte in niveis])
+        tipos.append(['raiz'] + [TIPOS[nivel] for nivel, _ in niveis])
+    valores = folhas[MESES].to_numpy(dtype='int64')
+
+    for profundidade in range(max((len(c) for c in caminhos), default=1)):
+        linhas = [i for i, caminho in enumerate(caminhos) if len(caminho) > profundidade]
+        if not linhas:
+            continue
+        parte = pd.DataFrame(valores[linhas], columns=MESES)
+        parte.insert(0, 'id', [SEPARADOR.join(caminhos[i][:profundidade + 1]) for i in linhas])
+        parte.insert(1, 'pai', [SEPARADOR.join(caminhos[i][:profundidade]) for i in linhas])
+        parte.insert(2, 'rotulo', [caminhos[i][profundidade] for i in linhas])
+        parte.insert(3, 'nivel', profundidade)
+        parte.insert(4, 'tipo', [tipos[i][profundidade] for i in linhas])
+        parte.insert(5, 'ordem', linhas)
+        partes.append(parte)
+
+    if not partes:
+        return pd.DataFrame(columns=['id', 'pai', 'rotulo', 'nivel', 'tipo'] + MESES + ['Total'])
+
+    nos = pd.concat(partes, ignore_index=True)
+    nos = nos.groupby(['id', 'pai', 'rotulo', 'nivel', 'tipo'], sort=False, as_index=False).agg(
+        {'ordem': 'min', **{mes: 'sum' for mes in MESES}}
+    )
+    nos['Total'] = nos[MESES].sum(axis=1)
+
+    # Ordem da planilha, com cada nó logo antes dos seus filhos
+    ordem_por_id = dict(zip(nos['id'], nos['ordem']))
+    partes_id = nos['id'].str.split(SEPARADOR, regex=False)
+    nos['_ordem'] = [tuple(ordem_por_id[SEPARADOR.join(partes[:i + 1])] for i in range(len(partes)))
+                     for partes in partes_id]
+    nos = nos.sort_values('_ordem').drop(columns=['_ordem', 'ordem'])
+    return nos.reset_index(drop=True)
+
+
+# Confere os totais da planilha com os subtotais calculados, mês a mês
+def _divergencias(nos, totais, valores):
+    registros = []
+    por_id = nos.set_index('id')
+    for linha_excel, rotulo, tipo, nome in totais:
+        if tipo == 'raiz':
+            alvo = RAIZ
+        else:
+            candidatos = nos[(nos['rotulo'] == nome) & (nos['tipo'] == ('grupo' if tipo == 'grupo' else 'seção'))]
+            if candidatos.empty:
+                continue
+            alvo = candidatos['id'].iloc[-1]
+        if alvo not in por_id.index:
+            continue
+        planilha = para_centavos(valores.loc[linha_excel - 2].to_numpy())
+        meses = [MESES_COLUNAS.index(mes) + 1 for mes in valores.columns]
+        calculado = por_id.loc[alvo, meses].to_numpy(dtype='int64')
+        for mes, valor_planilha, valor_calculado in zip(meses, planilha, calculado):
+            if valor_planilha != valor_calculado:
+                registros.append({
+                    'Linha': linha_excel, 'Total': rotulo, 'Mês': mes,
+                    'Planilha': int(valor_planilha), 'Calculado': int(valor_calculado)
+                })
+    return pd.DataFrame(registros, columns=['Linha', 'Total', 'Mês', 'Planilha', 'Calculado'])
+
+
+# Monta a árvore a partir da planilha lida pelo pandas (negrito opcional)
+def montar_arvore(df, negrito=None):
+    if COLUNA_CATEGORIA_RECEITAS not in df.columns:
+        return _nos(pd.DataFrame(columns=['grupo', 'secao', 'subgrupo', 'categoria'] + MESES)), pd.DataFrame()
+    folhas, totais, valores = _percorrer(df, negrito)
+    nos = _nos(folhas)
+    return nos, _divergencias(nos, totais, valores)
+
+
+# Valor de cada nó somando apenas os meses escolhidos (todos se vazio)
+def valores_nos(arvore, meses=None):
+    meses = [mes for mes in (meses or MESES) if mes in MESES]
+    return arvore[meses].sum(axis=1)
+
+
+# Nós até um nível (1 = grupos, 2 = seções, 3 = subgrupos, 4 = categorias)
+def nos_ate_nivel(arvore, nivel):
+    return arvore[arvore['nivel'] <= nivel]
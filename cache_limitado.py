@@ -0,0 +1,179 @@
+import functools
+import logging
+import os
+import sys
+import threading
+import types
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Cache único do processo com orçamento de memória.
+# Conjuntos de dados, agregados, figuras e arquivos de exportação dividem o
+# mesmo orçamento; quando ele estoura, sai o item usado há mais tempo (LRU),
+# seja de qual categoria for. As métricas mostram acertos, bytes, despejos e
+# itens recusados por serem maiores que o orçamento inteiro.
+
+# Orçamento padrão em MB (pode ser ajustado pela variável de ambiente)
+ORCAMENTO_PADRAO_MB = 256
+CATEGORIAS = ('conjuntos', 'agregados', 'figuras', 'exportacoes')
+
+logger = logging.getLogger(__name__)
+
+
+# Estimativa do tamanho em memória de um valor (sem serializar)
+def estimar_tamanho(valor, _vistos=None):
+    if _vistos is None:
+        _vistos = set()
+    if id(valor) in _vistos:
+        return 0
+    _vistos.add(id(valor))
+
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(index=True, deep=True))
+    if isinstance(valor, pd.Index):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if isinstance(valor, (bytes, bytearray, str)):
+        return sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(
+            estimar_tamanho(k, _vistos) + estimar_tamanho(v, _vistos) for k, v in valor.items()
+        )
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return sys.getsizeof(valor) + sum(estimar_tamanho(v, _vistos) for v in valor)
+    # Figuras do plotly: mede a estrutura JSON (os arrays continuam numpy)
+    if hasattr(valor, 'to_plotly_json'):
+        return estimar_tamanho(valor.to_plotly_json(), _vistos)
+    if hasattr(valor, '_asdict'):
+        return estimar_tamanho(tuple(valor), _vistos)
+    # Objetos próprios (IndiceFacetas, Cubo, Previsao...): o objeto mais o
+    # que ele guarda nos atributos (arrays, DataFrames, dicionários)
+    if not isinstance(valor, (type, types.ModuleType, types.FunctionType, types.MethodType)):
+        atributos = [getattr(valor, nome) for classe in type(valor).__mro__
+                     for nome in getattr(classe, '__slots__', ()) if hasattr(valor, nome)]
+        if hasattr(valor, '__dict__'):
+            atributos.append(vars(valor))
+        if atributos:
+            return sys.getsizeof(valor) + sum(estimar_tamanho(atributo, _vistos) for atributo in atributos)
+    return sys.getsizeof(valor)
+
+
+class CacheLimitado:
+    def __init__(self, orcamento_bytes):
+        self.orcamento_bytes = orcamento_bytes
+        self._itens = OrderedDict()
+        self._trava = threading.RLock()
+        self._bytes = 0
+        self._metricas = {cat: {'acertos': 0, 'falhas': 0, 'despejos': 0, 'rejeitados': 0}
+                          for cat in CATEGORIAS}
+
+    def obter(self, chave, categoria, padrao=None):
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is None:
+                self._metricas[categoria]['falhas'] += 1
+                return padrao
+            self._itens.move_to_end(chave)
+            self._metricas[categoria]['acertos'] += 1
+            return item[0]
+
+    # Consulta sem contar acerto/falha nem mexer na ordem do LRU
+    def contem(self, chave):
+        with self._trava:
+            return chave in self._itens
+
+    def guardar(self, chave, valor, categoria, tamanho=None):
+        if tamanho is None:
+            tamanho = estimar_tamanho(valor)
+
+        with self._trava:
+            self._remover(chave)
+            # Um item maior que o orçamento inteiro não é guardado
+            if tamanho > self.orcamento_bytes:
+                self._metricas[categoria]['rejeitados'] += 1
+                logger.warning("Item de %.1f MB (%s) maior que o orçamento do cache (%.1f MB); não guardado",
+                               tamanho / 1024**2, categoria, self.orcamento_bytes / 1024**2)
+                return valor
+            self._itens[chave] = (valor, tamanho, categoria)
+            self._bytes += tamanho
+            self._despejar()
+        return valor
+
+    def obter_ou_calcular(self, chave, categoria, calcular):
+        sentinela = object()
+        valor = self.obter(chave, categoria, sentinela)
+        if valor is sentinela:
+            valor = self.guardar(chave, calcular(), categoria)
+        return valor
+
+    # Decorador: memoriza o resultado pelos argumentos (que devem ser hasheáveis,
+    # por isso as funções recebem versões e filtros, não DataFrames)
+    def memoizar(self, categoria):
+        def decorador(funcao):
+            @functools.wraps(funcao)
+            def envoltorio(*args, **kwargs):
+                chave = (funcao.__module__, funcao.__qualname__, args, tuple(sorted(kwargs.items())))
+                return self.obter_ou_calcular(chave, categoria, lambda: funcao(*args, **kwargs))
+            return envoltorio
+        return decorador
+
+    def remover(self, chave):
+        with self._trava:
+            self._remover(chave)
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+            self._bytes = 0
+
+    def _remover(self, chave):
+        item = self._itens.pop(chave, None)
+        if item is not None:
+            self._bytes -= item[1]
+
+    def _despejar(self):
+        while self._bytes > self.orcamento_bytes and self._itens:
+            _, (_, tamanho, categoria) = self._itens.popitem(last=False)
+            self._bytes -= tamanho
+            self._metricas[categoria]['despejos'] += 1
+
+    def metricas(self):
+        with self._trava:
+            por_categoria = {}
+            for cat, contagem in self._metricas.items():
+                itens = [item for item in self._itens.values() if item[2] == cat]
+                consultas = contagem['acertos'] + contagem['falhas']
+                por_categoria[cat] = dict(
+                    contagem,
+                    itens=len(itens),
+                    bytes=sum(item[1] for item in itens),
+                    taxa_acerto=contagem['acertos'] / consultas if consultas else 0.0
+                )
+            acertos = sum(c['acertos'] for c in self._metricas.values())
+            consultas = acertos + sum(c['falhas'] for c in self._metricas.values())
+            return {
+                'bytes': self._bytes,
+                'orcamento_bytes': self.orcamento_bytes,
+                'itens': len(self._itens),
+                'taxa_acerto': acertos / consultas if consultas else 0.0,
+                'despejos': sum(c['despejos'] for c in self._metricas.values()),
+                'rejeitados': sum(c['rejeitados'] for c in self._metricas.values()),
+                'categorias': por_categoria
+            }
+
+
+def _orcamento_configurado():
+    try:
+        mb = float(os.environ.get('IPB_CACHE_MB', ORCAMENTO_PADRAO_MB))
+    except ValueError:
+        mb = ORCAMENTO_PADRAO_MB
+    return int(mb * 1024 * 1024)
+
+
+# Instância compartilhada por todos os módulos e sessões do processo
+cache = CacheLimitado(_orcamento_configurado())
@@ -0,0 +1,383 @@
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+import dados
+
+# Teste de carga com várias sessões simultâneas.
+# Sobe o servidor da aplicação (app.py, já aquecido pelo aquecimento.py) em
+# outro processo e abre N sessões pelo mesmo websocket que o navegador usa.
+# Cada sessão executa uma sequência sorteada de interações (filtros, busca,
+# troca de mês) na página anual ou mensal e mede o tempo de cada rerun: do
+# envio dos widgets até o fim do script no servidor, com todos os elementos
+# recebidos. Enquanto isso a memória residente do servidor é amostrada.
+# No fim saem os percentis p50/p95/p99 por página e interação.
+#
+# Uso:
+#   python carga.py                                   # 20 sessões, 10 interações cada
+#   python carga.py --sessoes 50 --interacoes 20 --paginas mensal
+#   python carga.py --url http://127.0.0.1:8501 --pid 1234   # servidor já em execução
+#   python carga.py --json resultado.json             # também grava o relatório em JSON
+
+PAGINAS = ['anual', 'mensal']
+ROTULO_BUSCA_ANUAL = "🔍 Buscar (Especificação, Observação ou Centro de Custo):"
+WIDGETS = {'multiselect', 'selectbox', 'text_input', 'radio', 'slider'}
+
+
+# Memória residente de um processo em MB (None se não der para ler)
+def memoria_mb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for linha in f:
+                if linha.startswith('VmRSS:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+# Amostra a memória do servidor em segundo plano enquanto o teste roda
+class AmostradorMemoria:
+    def __init__(self, pid, intervalo=0.2):
+        self.pid = pid
+        self.intervalo = intervalo
+        self.amostras = []
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+
+    def _amostrar(self):
+        if self.pid is not None:
+            memoria = memoria_mb(self.pid)
+            if memoria is not None:
+                self.amostras.append(memoria)
+
+    def _executar(self):
+        while not self._parar.is_set():
+            self._amostrar()
+            self._parar.wait(self.intervalo)
+
+    def __enter__(self):
+        self._amostrar()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *erro):
+        self._parar.set()
+        self._thread.join()
+        self._amostrar()
+
+
+# Uma sessão de navegador falando o protocolo do Streamlit: a cada rerun envia
+# o estado de todos os widgets já alterados e lê as mensagens até o fim do script
+# O teste fala com o servidor por websocket; o pacote não vem com o streamlit
+def _exigir_websockets():
+    try:
+        import websockets
+    except ImportError as erro:
+        raise ImportError("O teste de carga precisa do pacote websockets (pip install websockets)") from erro
+
+
+class Sessao:
+    def __init__(self, url):
+        self.url = url.rstrip('/').replace('http', 'ws', 1) + '/_stcore/stream'
+        self.conexao = None
+        self.paginas = {}
+        self.pagina = ''
+        self.widgets = {}
+        self.estado = {}
+        self.excecoes = []
+
+    async def abrir(self, pagina):
+        import websockets
+
+        self.conexao = await websockets.connect(self.url, subprotocols=['streamlit'], max_size=None)
+        await self.rerun()
+        if pagina in self.paginas and self.paginas[pagina] != self.pagina:
+            self.pagina = self.paginas[pagina]
+            self.estado = {}
+            await self.rerun()
+
+    async def fechar(self):
+        if self.conexao is not None:
+            await self.conexao.close()
+
+    async def rerun(self):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        mensagem = BackMsg()
+        mensagem.rerun_script.query_string = ''
+        mensagem.rerun_script.page_script_hash = self.pagina
+        mensagem.rerun_script.widget_states.widgets.extend(self.estado.values())
+        await self.conexao.send(mensagem.SerializeToString())
+
+        self.widgets, self.excecoes = {}, []
+        while True:
+            recebida = ForwardMsg()
+            recebida.ParseFromString(await self.conexao.recv())
+            tipo = recebida.WhichOneof('type')
+            if tipo == 'navigation':
+                self.paginas = {p.url_pathname: p.page_script_hash for p in recebida.navigation.app_pages}
+                self.pagina = recebida.navigation.page_script_hash
+            elif tipo == 'delta' and recebida.delta.WhichOneof('type') == 'new_element':
+                elemento = recebida.delta.new_element
+                tipo_elemento = elemento.WhichOneof('type')
+                if tipo_elemento == 'exception':
+                    self.excecoes.append(elemento.exception.message)
+                elif tipo_elemento in WIDGETS:
+                    proto = getattr(elemento, tipo_elemento)
+                    self.widgets[proto.id] = (tipo_elemento, proto)
+            elif tipo == 'script_finished':
+                return
+
+    # Widget pela chave (fim do id) ou pelo rótulo
+    def widget(self, chave=None, rotulo=None):
+        for id_widget, (tipo, proto) in self.widgets.items():
+            if (chave and id_widget.endswith(f"-{chave}")) or (rotulo and proto.label == rotulo):
+                return id_widget, proto
+        raise KeyError(chave or rotulo)
+
+    def definir(self, id_widget, valor):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        estado = WidgetState(id=id_widget)
+        if isinstance(valor, list):
+            estado.string_array_value.data.extend(valor)
+        else:
+            estado.string_value = valor
+        self.estado[id_widget] = estado
+
+
+# Interações da página anual (cada uma altera widgets da sessão)
+def _interacoes_anual(termos):
+    def filtrar_meses(sessao, sorteio):
+        id_widget, proto = sessao.widget(chave='filtro_meses')
+        sessao.definir(id_widget, sorteio.sample(list(proto.options), k=min(sorteio.randint(1, 3), len(proto.options))))
+
+    def filtrar_centro(sessao, sorteio):
+        id_widget, proto = sessao.widget(chave='filtro_centro_incluir')
+        sessao.definir(id_widget, [sorteio.choice(list(proto.options))])
+
+    def excluir_centro(sessao, sorteio):
+        sessao.definir(sessao.widget(chave='filtro_centro_incluir')[0], [])
+        id_widget, proto = sessao.widget(chave='filtro_centro_excluir')
+        sessao.definir(id_widget, [sorteio.choice(list(proto.options))])
+
+    def buscar(sessao, sorteio):
+        sessao.definir(sessao.widget(rotulo=ROTULO_BUSCA_ANUAL)[0], sorteio.choice(termos))
+
+    def limpar(sessao, sorteio):
+        for chave in ('filtro_centro_incluir', 'filtro_centro_excluir', 'filtro_especificacao', 'filtro_meses'):
+            sessao.definir(sessao.widget(chave=chave)[0], [])
+
+    return {'filtro_meses': filtrar_meses, 'filtro_centro': filtrar_centro,
+            'excluir_centro': excluir_centro, 'busca': buscar, 'limpar_filtros': limpar}
+
+
+# Interações da página mensal
+def _interacoes_mensal(termos):
+    def trocar_mes(sessao, sorteio):
+        id_widget, proto = sessao.widget(rotulo="Mês")
+        sessao.definir(id_widget, sorteio.choice(list(proto.options)))
+
+    def buscar_entrada(sessao, sorteio):
+        sessao.definir(sessao.widget(chave='busca_entrada')[0], sorteio.choice(termos))
+
+    def buscar_saida(sessao, sorteio):
+        sessao.definir(sessao.widget(chave='busca_saida')[0], sorteio.choice(termos))
+
+    def filtrar_centro_saida(sessao, sorteio):
+        id_widget, proto = sessao.widget(chave='centro_saida')
+        sessao.definir(id_widget, sorteio.choice(list(proto.options)))
+
+    return {'troca_mes': trocar_mes, 'busca_entrada': buscar_entrada,
+            'busca_saida': buscar_saida, 'centro_saida': filtrar_centro_saida}
+
+
+# Termos de busca tirados das próprias especificações (primeira palavra)
+def _termos_busca():
+    especificacoes = dados.opcoes_despesas()['especificacoes']
+    termos = sorted({str(e).split()[0] for e in especificacoes if str(e).strip()})
+    return termos or ['a']
+
+
+# Uma sessão: abre a página e executa as interações sorteadas, medindo cada rerun
+async def executar_sessao(url, numero, pagina, interacoes, quantidade, semente, pausa):
+    sorteio = random.Random(semente + numero)
+    medicoes, erros = [], []
+    sessao = Sessao(url)
+
+    async def medir(rotulo, acao):
+        inicio = time.perf_counter()
+        await acao()
+        medicoes.append((pagina, rotulo, time.perf_counter() - inicio))
+        erros.extend((pagina, rotulo, excecao) for excecao in sessao.excecoes)
+
+    try:
+        await medir('abertura', lambda: sessao.abrir(pagina))
+        nomes = list(interacoes)
+        for _ in range(quantidade):
+            await asyncio.sleep(sorteio.uniform(0, pausa))
+            rotulo = sorteio.choice(nomes)
+            try:
+                interacoes[rotulo](sessao, sorteio)
+            except (KeyError, IndexError, ValueError) as erro:
+                # Widget ausente nesta execução (ex.: seção oculta pelo filtro)
+                erros.append((pagina, rotulo, f"interação não aplicada: {erro!r}"))
+                continue
+            await medir(rotulo, sessao.rerun)
+    except Exception as erro:
+        erros.append((pagina, 'sessão', repr(erro)))
+    finally:
+        await sessao.fechar()
+    return medicoes, erros
+
+
+def _percentis(tempos):
+    tempos = np.asarray(tempos) * 1000
+    return {
+        'n': int(len(tempos)),
+        'p50': float(np.percentile(tempos, 50)),
+        'p95': float(np.percentile(tempos, 95)),
+        'p99': float(np.percentile(tempos, 99)),
+        'max': float(tempos.max())
+    }
+
+
+async def _executar_sessoes(url, sessoes, interacoes, paginas, semente, pausa):
+    termos = _termos_busca()
+    roteiros = {'anual': _interacoes_anual(termos), 'mensal': _interacoes_mensal(termos)}
+    tarefas = [
+        executar_sessao(url, numero, paginas[numero % len(paginas)], roteiros[paginas[numero % len(paginas)]],
+                        interacoes, semente, pausa)
+        for numero in range(sessoes)
+    ]
+    return await asyncio.gather(*tarefas)
+
+
+def executar_carga(url, pid=None, sessoes=20, interacoes=10, paginas=tuple(PAGINAS), semente=0, pausa=0.5):
+    _exigir_websockets()
+    inicio = time.perf_counter()
+    with AmostradorMemoria(pid) as amostrador:
+        resultados = asyncio.run(_executar_sessoes(url, sessoes, interacoes, paginas, semente, pausa))
+    duracao = time.perf_counter() - inicio
+
+    medicoes = [m for resultado in resultados for m in resultado[0]]
+    erros = [e for resultado in resultados for e in resultado[1]]
+    por_acao = {}
+    for pagina, rotulo, tempo in medicoes:
+        por_acao.setdefault((pagina, rotulo), []).append(tempo)
+
+    return {
+        'sessoes': sessoes,
+        'interacoes_por_sessao': interacoes,
+        'duracao_s': duracao,
+        'reruns_por_s': len(medicoes) / duracao if duracao else 0.0,
+        'geral': _percentis([tempo for _, _, tempo in medicoes]) if medicoes else {},
+        'por_pagina': {
+            pagina: _percentis([t for p, _, t in medicoes if p == pagina])
+            for pagina in paginas if any(p == pagina for p, _, _ in medicoes)
+        },
+        'por_acao': {f"{pagina}/{rotulo}": _percentis(tempos) for (pagina, rotulo), tempos in sorted(por_acao.items())},
+        'memoria_mb': {
+            'inicial': amostrador.amostras[0],
+            'pico': max(amostrador.amostras),
+            'final': amostrador.amostras[-1]
+        } if amostrador.amostras else {},
+        'erros': [{'pagina': p, 'acao': r, 'erro': str(e)} for p, r, e in erros]
+    }
+
+
+def imprimir_relatorio(relatorio):
+    print(
+        f"\n{relatorio['sessoes']} sessões × {relatorio['interacoes_por_sessao']} interações "
+        f"em {relatorio['duracao_s']:.1f}s ({relatorio['reruns_por_s']:.1f} reruns/s)\n"
+    )
+    print(f"  {'recorte':<28} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'máx ms':>9}")
+    linhas = [('geral', relatorio['geral'])] + list(relatorio['por_pagina'].items()) + list(relatorio['por_acao'].items())
+    for rotulo, p in linhas:
+        if p:
+            print(f"  {rotulo:<28} {p['n']:>5} {p['p50']:>9.0f} {p['p95']:>9.0f} {p['p99']:>9.0f} {p['max']:>9.0f}")
+
+    memoria = relatorio['memoria_mb']
+    if memoria:
+        print(
+            f"\n  memória do servidor: {memoria['inicial']:.0f} MB no início, "
+            f"pico de {memoria['pico']:.0f} MB, {memoria['final']:.0f} MB no fim"
+        )
+    else:
+        print("\n  memória do servidor: indisponível (informe --pid)")
+    if relatorio['erros']:
+        print(f"\n  ⚠️ {len(relatorio['erros'])} erro(s); primeiros:")
+        for erro in relatorio['erros'][:5]:
+            print(f"    {erro['pagina']}/{erro['acao']}: {erro['erro']}")
+
+
+# Sobe app.py pelo aquecimento (como em produção) e espera o servidor responder
+def subir_servidor(porta, tempo_limite=300):
+    comando = [sys.executable, str(dados.BASE_DIR / 'aquecimento.py'), '--sem-render', '--servir',
+               str(dados.BASE_DIR / 'app.py'), '--server.headless', 'true', '--server.port', str(porta)]
+    processo = subprocess.Popen(comando, cwd=dados.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{porta}"
+    limite = time.monotonic() + tempo_limite
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"o servidor terminou ao subir (código {processo.returncode})")
+        try:
+            with urllib.request.urlopen(f"{url}/_stcore/health", timeout=2) as resposta:
+                if resposta.status == 200:
+                    return processo, url
+        except OSError:
+            time.sleep(0.5)
+    processo.terminate()
+    raise RuntimeError("o servidor não respondeu a tempo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga dos dashboards IPB")
+    parser.add_argument('--sessoes', type=int, default=20, help="sessões simultâneas (padrão: 20)")
+    parser.add_argument('--interacoes', type=int, default=10, help="interações por sessão (padrão: 10)")
+    parser.add_argument('--paginas', nargs='+', choices=PAGINAS, default=PAGINAS,
+                        help="páginas exercitadas, alternadas entre as sessões")
+    parser.add_argument('--pausa', type=float, default=0.5,
+                        help="pausa máxima (s) entre interações de uma sessão (padrão: 0.5)")
+    parser.add_argument('--semente', type=int, default=0, help="semente do sorteio das interações")
+    parser.add_argument('--url', help="usar um servidor já em execução (ex.: http://127.0.0.1:8501)")
+    parser.add_argument('--pid', type=int, help="pid do servidor indicado em --url, para medir a memória")
+    parser.add_argument('--porta', type=int, default=8599, help="porta do servidor de teste (padrão: 8599)")
+    parser.add_argument('--json', metavar='ARQUIVO', help="grava o relatório em JSON")
+    opcoes = parser.parse_args()
+    # Antes de subir o servidor de teste
+    _exigir_websockets()
+
+    processo = None
+    url, pid = opcoes.url, opcoes.pid
+    if url is None:
+        print("Subindo o servidor de teste (com aquecimento)...")
+        processo, url = subir_servidor(opcoes.porta)
+        pid = processo.pid
+    try:
+        relatorio = executar_carga(url, pid, opcoes.sessoes, opcoes.interacoes, tuple(opcoes.paginas),
+                                   opcoes.semente, opcoes.pausa)
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait(timeout=30)
+
+    imprimir_relatorio(relatorio)
+    if opcoes.json:
+        with open(opcoes.json, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    return 1 if relatorio['erros'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import pandas as pd
+
+from cache_limitado import cache
+
+# Comparação entre períodos (MoM, YoY, acumulado do ano e personalizado).
+# Trabalha sobre a tabela de agregados mensais (Ano, Mês, Centro, Especificação),
+# que é pequena e já vem pronta do repositório: cada comparação é a soma de
+# dois recortes dessa tabela alinhados por junção, guardada no cache por par
+# de períodos. Valores em centavos inteiros.
+
+NIVEIS_AGREGADO = ['Ano', 'Mes_Num', 'Centro de Custo', 'Especificação']
+
+
+# Tabela de agregados mensais (derivado do conjunto de despesas)
+def agregado_mensal(df):
+    agregado = df.groupby(NIVEIS_AGREGADO, observed=True, dropna=False)['Centavos'].agg(['sum', 'count']).reset_index()
+    agregado.columns = NIVEIS_AGREGADO + ['Centavos', 'Quantidade']
+    agregado['Periodo'] = agregado['Ano'] * 100 + agregado['Mes_Num']
+    return agregado
+
+
+# Um período é uma tupla ordenada de códigos AAAAMM
+def periodo_mes(ano, mes):
+    return (ano * 100 + mes,)
+
+
+def mes_anterior(ano, mes):
+    return (ano - 1, 12) if mes == 1 else (ano, mes - 1)
+
+
+def periodo_acumulado(ano, mes):
+    return tuple(ano * 100 + m for m in range(1, mes + 1))
+
+
+def deslocar_ano(periodo, anos=-1):
+    return tuple(codigo + anos * 100 for codigo in periodo)
+
+
+def periodo_de_meses(meses_ano_ref):
+    codigos = []
+    for mes_ano in meses_ano_ref:
+        mes, ano = mes_ano.split('/')
+        codigos.append(int(ano) * 100 + int(mes))
+    return tuple(sorted(codigos))
+
+
+def descrever_periodo(periodo, nomes_meses):
+    if not periodo:
+        return "-"
+    rotulos = [f"{nomes_meses.get(c % 100, c % 100)[:3]}/{c // 100}" for c in periodo]
+    if len(rotulos) <= 3:
+        return ", ".join(rotulos)
+    return f"{rotulos[0]} a {rotulos[-1]} ({len(rotulos)} meses)"
+
+
+# filtros: {'Centro de Custo': {'incluir': [...], 'excluir': [...]}, 'Especificação': {...}}
+def _recortar(agregado, periodo, filtros):
+    mascara = agregado['Periodo'].isin(periodo)
+    for coluna, filtro in (filtros or {}).items():
+        if filtro.get('incluir'):
+            mascara &= agregado[coluna].isin(filtro['incluir'])
+        if filtro.get('excluir'):
+            mascara &= ~agregado[coluna].isin(filtro['excluir'])
+    return agregado[mascara]
+
+
+def _calcular(agregado, periodo_a, periodo_b, nivel, filtros):
+    total_a = _recortar(agregado, periodo_a, filtros).groupby(nivel, dropna=False)['Centavos'].sum().rename('Período A')
+    total_b = _recortar(agregado, periodo_b, filtros).groupby(nivel, dropna=False)['Centavos'].sum().rename('Período B')
+
+    comparacao = pd.concat([total_a, total_b], axis=1, join='outer').fillna(0).astype('int64')
+    comparacao['Variação'] = comparacao['Período A'] - comparacao['Período B']
+    base = comparacao['Período B'].where(comparacao['Período B'] != 0)
+    comparacao['Variação %'] = comparacao['Variação'] / base * 100
+    comparacao.index.name = nivel
+    return comparacao.sort_values('Variação', key=abs, ascending=False).reset_index()
+
+
+def _congelar(filtros):
+    return tuple(sorted(
+        (coluna, tuple(sorted(f.get('incluir') or [])), tuple(sorted(f.get('excluir') or [])))
+        for coluna, f in (filtros or {}).items()
+    ))
+
+
+# Período A contra período B por centro de custo ou especificação
+def comparar_periodos(agregado, versao, periodo_a, periodo_b, nivel, filtros=None):
+    chave = ('comparacao', versao, tuple(periodo_a), tuple(periodo_b), nivel, _congelar(filtros))
+    return cache.obter_ou_calcular(
+        chave, 'agregados',
+        lambda: _calcular(agregado, periodo_a, periodo_b, nivel, filtros)
+    )
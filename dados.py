@@ -0,0 +1,382 @@
+import os
+import pandas as pd
+from pathlib import Path
+
+import arvore_receitas
+import comparacao
+import diferencas
+import dinheiro
+import facetas
+import fontes
+import normalizacao
+import validacao
+from cache_limitado import cache
+from arvore_receitas import montar_arvore
+from comparacao import agregado_mensal
+from diferencas import atualizar_agregado, diferenca_conjunto, hash_linhas
+from dinheiro import para_centavos
+from facetas import IndiceFacetas
+from fontes import PARTICAO_MENSAL, criar_fonte
+from monitor_arquivos import MonitorArquivos
+from normalizacao import normalizar_colunas
+from repositorio import Repositorio, impressao_digital
+from validacao import (MESES_COLUNAS, COLUNAS_DESPESAS, COLUNA_CATEGORIA_RECEITAS, validar_despesas,
+                       validar_mensal, validar_orcamento, validar_receitas, validar_saldos)
+
+# Camada de dados compartilhada pelos dashboards.
+# Os carregadores ficam registrados no repositório, que invalida e reconstrói
+# cada conjunto quando o arquivo correspondente muda no disco. As tabelas vêm
+# da fonte configurada em IPB_FONTE (planilhas xlsx por padrão; ver fontes.py).
+
+# Diretório base do projeto
+BASE_DIR = Path(__file__).parent
+# Orçamento por centro de custo (Excel ou CSV, o primeiro que existir)
+ORCAMENTO_FILES = [BASE_DIR / "orcamento.xlsx", BASE_DIR / "orcamento.csv"]
+# Saldos de abertura das contas (extrato do dashboard mensal)
+SALDOS_FILES = [BASE_DIR / "saldos_iniciais.xlsx", BASE_DIR / "saldos_iniciais.csv"]
+# Nomes canônicos de Especificação e Fornecedor (editáveis à mão) e junções
+# por semelhança propostas na leitura, para revisão; ver normalizacao.py
+NOMES_FILE = BASE_DIR / "nomes_canonicos.csv"
+NOMES_PROPOSTOS_FILE = BASE_DIR / "nomes_propostos.csv"
+COLUNAS_NORMALIZADAS = ['Especificação', 'Fornecedor']
+
+# Fonte das tabelas de despesas, receitas, entradas e saídas
+# (ex.: IPB_FONTE=parquet:/dados/ipb ou IPB_FONTE=sqlite:/dados/contabil.db)
+FONTE = criar_fonte(os.environ.get('IPB_FONTE'), BASE_DIR)
+
+# Dimensões com filtros em cascata
+DIMENSOES_DESPESAS = ['Centro de Custo', 'Especificação', 'Mês Ano Ref.']
+DIMENSOES_MENSAL = ['Centro de Custo', 'Especificação']
+
+# Ordem do calendário dos prefixos dos arquivos mensais (ex.: 'dez-saidas.xlsx')
+ORDEM_MESES = ['jan', 'fev', 'mar', 'abr', 'mai', 'jun', 'jul', 'ago', 'set', 'out', 'nov', 'dez']
+
+# Quantos dos meses mais recentes ficam pré-carregados no dashboard mensal
+MESES_PRE_CARGA = 3
+
+MESES_NOMES = {1: 'Janeiro', 2: 'Fevereiro', 3: 'Março', 4: 'Abril',
+               5: 'Maio', 6: 'Junho', 7: 'Julho', 8: 'Agosto',
+               9: 'Setembro', 10: 'Outubro', 11: 'Novembro', 12: 'Dezembro'}
+
+# Instantâneos em disco para o aquecimento após reiniciar o servidor. A
+# assinatura do código de leitura entra no nome do arquivo, então alterar um
+# carregador invalida os instantâneos antigos.
+INSTANTANEOS_DIR = Path(os.environ.get('IPB_INSTANTANEOS_DIR', BASE_DIR / ".instantaneos"))
+ASSINATURA_CODIGO = impressao_digital(
+    [Path(__file__)] + [Path(modulo.__file__) for modulo in (validacao, facetas, comparacao, dinheiro, arvore_receitas, fontes, diferencas,
+                                                   normalizacao)]
+)
+
+repositorio = Repositorio(cache, diretorio=INSTANTANEOS_DIR, assinatura=ASSINATURA_CODIGO)
+monitor = MonitorArquivos(repositorio, [BASE_DIR] + FONTE.diretorios(),
+                          recursivos=FONTE.diretorios() if FONTE.recursivo else ())
+
+
+# Valores distintos de uma coluna, já ordenados (usado nas opções dos filtros)
+def _opcoes(df, coluna):
+    if coluna not in df.columns:
+        return []
+    return sorted(df[coluna].dropna().unique().tolist())
+
+
+# Função para ler a planilha anual de despesas (colunas e filtros opcionais
+# são repassados à fonte, que lê só o necessário)
+def _ler_despesas(colunas=None, filtros=None):
+    df = FONTE.ler('despesas', colunas, filtros)
+
+    # Validar esquema, valores e 'Mês Ano Ref.' (já cria Mes_Num e Ano)
+    df, quarentena = validar_despesas(df)
+
+    # Grafias diferentes do mesmo nome viram o nome canônico
+    df = normalizar_colunas(df, COLUNAS_NORMALIZADAS, NOMES_FILE, 'despesas', NOMES_PROPOSTOS_FILE)
+
+    # Criar nome do mês
+    df['Nome_Mes'] = df['Mes_Num'].map(MESES_NOMES)
+
+    return df, quarentena
+
+
+# Consulta direta às despesas, fora do repositório: só as colunas pedidas
+# (mais as exigidas pela validação) e, com meses ('MM/AAAA') ou centros, só
+# as linhas desses recortes são lidas da fonte
+def consultar_despesas(colunas=None, meses=None, centros=None):
+    if colunas is not None:
+        colunas = list(dict.fromkeys(list(colunas) + COLUNAS_DESPESAS))
+    return _ler_despesas(colunas, {'Mês Ano Ref.': meses, 'Centro de Custo': centros})
+
+
+# Função para ler a planilha de receitas
+def _ler_receitas():
+    df_receitas = FONTE.ler('receitas')
+
+    # Meses para transformação
+    meses_num = {m: i+1 for i, m in enumerate(MESES_COLUNAS)}
+
+    # Validar e filtrar apenas linhas de categoria (exclui totais, títulos e linhas vazias)
+    df_receitas, quarentena = validar_receitas(df_receitas)
+    meses_presentes = [mes for mes in MESES_COLUNAS if mes in df_receitas.columns]
+
+    # Transformar de wide para long format
+    df_long = df_receitas.melt(
+        id_vars=[COLUNA_CATEGORIA_RECEITAS],
+        value_vars=meses_presentes,
+        var_name='Mes',
+        value_name='Valor'
+    )
+    df_long = df_long[df_long['Valor'].notna() & (df_long['Valor'] != 0)]
+
+    df_long = pd.DataFrame({
+        'Categoria': df_long[COLUNA_CATEGORIA_RECEITAS].to_numpy(),
+        'Nome_Mes': df_long['Mes'].str.capitalize().to_numpy(),
+        'Mes_Num': df_long['Mes'].map(meses_num).to_numpy(),
+        'Valor': df_long['Valor'].astype('float64').to_numpy()
+    })
+    df_long['Centavos'] = para_centavos(df_long['Valor'])
+    df_long['Valor'] = df_long['Centavos'] / 100
+    return df_long, quarentena
+
+
+# Função para ler a hierarquia completa da planilha de receitas (grupos,
+# seções, subgrupos e categorias), com os subtotais mensais de cada nível
+def _ler_arvore_receitas():
+    return montar_arvore(FONTE.ler('receitas'), FONTE.negrito('receitas'))
+
+
+# Função para ler uma planilha mensal (entradas ou saídas); só a partição do
+# mês é lida
+def _ler_mensal(tipo, mes):
+    df = FONTE.ler(tipo, filtros={PARTICAO_MENSAL: [mes]})
+    if df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    # Validar e converter data/valor; linhas inválidas vão para quarentena
+    df, quarentena = validar_mensal(df)
+    return normalizar_colunas(df, COLUNAS_NORMALIZADAS, NOMES_FILE, f"{tipo}/{mes}",
+                              NOMES_PROPOSTOS_FILE), quarentena
+
+
+# Função para ler uma planilha auxiliar (xlsx ou CSV separado por ';' ou
+# ','); None quando nenhum dos arquivos existe
+def _ler_auxiliar(arquivos):
+    arquivo = next((a for a in arquivos if a.exists()), None)
+    if arquivo is None:
+        return None
+
+    if arquivo.suffix.lower() == '.csv':
+        with open(arquivo, encoding='utf-8-sig') as f:
+            cabecalho = f.readline()
+        # Valores ficam como texto; a validação entende "1.234,56"
+        return pd.read_csv(arquivo, sep=';' if ';' in cabecalho else ',', dtype=str, encoding='utf-8-sig')
+    return pd.read_excel(arquivo)
+
+
+# Função para ler o orçamento
+def _ler_orcamento():
+    df = _ler_auxiliar(ORCAMENTO_FILES)
+    if df is None:
+        return validar_orcamento(pd.DataFrame({'Centro de Custo': []}))
+    return validar_orcamento(df)
+
+
+# Função para ler os saldos iniciais das contas
+def _ler_saldos():
+    df = _ler_auxiliar(SALDOS_FILES)
+    if df is None:
+        return validar_saldos(pd.DataFrame({'Conta': [], 'Saldo Inicial': []}))
+    return validar_saldos(df)
+
+
+# Opções dos filtros da planilha anual
+def _opcoes_despesas(dados):
+    df, _ = dados
+    meses = sorted(df['Mês Ano Ref.'].unique().tolist(),
+                   key=lambda x: (int(x.split('/')[1]), int(x.split('/')[0])))
+    return {
+        'centros': _opcoes(df, 'Centro de Custo'),
+        'especificacoes': _opcoes(df, 'Especificação'),
+        'meses': meses,
+        'valor_max': float(df['Valor'].max()) if len(df) > 0 else 0.0
+    }
+
+
+def _opcoes_mensal(dados):
+    df, _ = dados
+    return {
+        'centros': _opcoes(df, 'Centro de Custo'),
+        'especificacoes': _opcoes(df, 'Especificação')
+    }
+
+
+def _indice_despesas(dados):
+    return IndiceFacetas(dados[0], DIMENSOES_DESPESAS)
+
+
+def _agregado_despesas(dados):
+    return agregado_mensal(dados[0])
+
+
+def _indice_mensal(dados):
+    df, _ = dados
+    if df.empty:
+        return IndiceFacetas(pd.DataFrame({'Centavos': []}), [])
+    return IndiceFacetas(df, DIMENSOES_MENSAL)
+
+
+repositorio.registrar(
+    'despesas',
+    arquivos=lambda: FONTE.arquivos('despesas') + [NOMES_FILE],
+    carregar=_ler_despesas,
+    derivados={'opcoes': _opcoes_despesas, 'indice': _indice_despesas,
+               'agregado_mensal': _agregado_despesas, 'linhas': lambda dados: hash_linhas(dados[0])},
+    # Planilha reexportada com poucos lançamentos alterados: o agregado
+    # mensal recebe só as linhas inseridas e removidas
+    incrementais={'agregado_mensal': atualizar_agregado},
+    diferenciar=diferenca_conjunto
+)
+repositorio.registrar(
+    'receitas',
+    arquivos=lambda: FONTE.arquivos('receitas'),
+    carregar=_ler_receitas,
+    derivados={'categorias': lambda dados: _opcoes(dados[0], 'Categoria')}
+)
+
+repositorio.registrar(
+    'arvore_receitas',
+    arquivos=lambda: FONTE.arquivos('receitas'),
+    carregar=_ler_arvore_receitas
+)
+
+repositorio.registrar(
+    'orcamento',
+    arquivos=lambda: ORCAMENTO_FILES,
+    carregar=_ler_orcamento
+)
+
+repositorio.registrar(
+    'saldos_iniciais',
+    arquivos=lambda: SALDOS_FILES,
+    carregar=_ler_saldos
+)
+
+
+# Registra sob demanda o conjunto de um mês (ex.: 'saidas/dez')
+def _conjunto_mensal(tipo, mes):
+    nome = f"{tipo}/{mes}"
+    if not repositorio.registrado(nome):
+        repositorio.registrar(
+            nome,
+            arquivos=lambda: FONTE.arquivos(tipo, {PARTICAO_MENSAL: [mes]}) + [NOMES_FILE],
+            carregar=lambda: _ler_mensal(tipo, mes),
+            derivados={'opcoes': _opcoes_mensal, 'indice': _indice_mensal}
+        )
+    return nome
+
+
+# Inicia o monitor de arquivos (uma vez por processo)
+def iniciar_monitor():
+    return monitor.iniciar()
+
+
+def carregar_dados():
+    return repositorio.obter('despesas').dados
+
+
+def carregar_receitas():
+    return repositorio.obter('receitas').dados
+
+
+def carregar_entradas(mes):
+    return repositorio.obter(_conjunto_mensal('entradas', mes)).dados
+
+
+def carregar_saidas(mes):
+    return repositorio.obter(_conjunto_mensal('saidas', mes)).dados
+
+
+# Instantâneos completos (dados, derivados e versão de uma mesma leitura),
+# para que o dashboard nunca combine dados de uma versão com o índice de outra
+def obter_despesas():
+    return repositorio.obter('despesas')
+
+
+def obter_receitas():
+    return repositorio.obter('receitas')
+
+
+def obter_arvore_receitas():
+    return repositorio.obter('arvore_receitas')
+
+
+def obter_orcamento():
+    return repositorio.obter('orcamento')
+
+
+def obter_mensal(tipo, mes):
+    return repositorio.obter(_conjunto_mensal(tipo, mes))
+
+
+def obter_saldos_iniciais():
+    return repositorio.obter('saldos_iniciais')
+
+
+def opcoes_despesas():
+    return repositorio.obter('despesas').derivados['opcoes']
+
+
+def categorias_receitas():
+    return repositorio.obter('receitas').derivados['categorias']
+
+
+def opcoes_mensal(tipo, mes):
+    return repositorio.obter(_conjunto_mensal(tipo, mes)).derivados['opcoes']
+
+
+# Meses com entradas na fonte, em ordem do calendário (relido a cada
+# execução, então um mês novo aparece sem reiniciar o servidor)
+def listar_meses_mensais():
+    meses = FONTE.meses_mensais()
+    return sorted(meses, key=lambda m: (ORDEM_MESES.index(m) if m in ORDEM_MESES else len(ORDEM_MESES), m))
+
+
+# Agenda em segundo plano a leitura dos meses vizinhos ao mês aberto e dos
+# últimos meses disponíveis; os já carregados são ignorados
+def pre_carregar_meses(mes, meses=None, ultimos=MESES_PRE_CARGA):
+    meses = listar_meses_mensais() if meses is None else meses
+    candidatos = []
+    if mes in meses:
+        posicao = meses.index(mes)
+        candidatos += meses[posicao + 1:posicao + 2] + meses[max(posicao - 1, 0):posicao]
+    candidatos += meses[::-1][:ultimos]
+
+    agendados = []
+    for outro in dict.fromkeys(candidatos):
+        if outro == mes:
+            continue
+        for tipo in ('entradas', 'saidas'):
+            if repositorio.pre_carregar(_conjunto_mensal(tipo, outro)) is not None:
+                agendados.append(f"{tipo}/{outro}")
+    return agendados
+
+
+# Versões dos conjuntos usados por cada dashboard (mudam quando o monitor
+# troca o instantâneo)
+def _versoes(*nomes):
+    versoes = repositorio.versoes()
+    return tuple(versoes.get(nome) for nome in nomes)
+
+
+def versao_anual():
+    return _versoes('despesas', 'receitas', 'orcamento', 'arvore_receitas')
+
+
+def versao_mensal(mes):
+    return _versoes(_conjunto_mensal('entradas', mes), _conjunto_mensal('saidas', mes), 'saldos_iniciais')
+
+
+# Versão de um mês sem lê-lo: a do instantâneo servido ou, se o mês ainda não
+# foi carregado, a impressão digital dos arquivos (a que a leitura vai ter).
+# É a chave dos cálculos encadeados mês a mês (anomalias, extrato,
+# calendário), que só leem os meses cuja versão mudou
+def versao_conjunto_mensal(tipo, mes):
+    nome = _conjunto_mensal(tipo, mes)
+    versao = repositorio.versoes().get(nome)
+    return versao if versao is not None else repositorio.versao(nome)
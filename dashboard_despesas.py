@@ -3,183 +3,222 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
-from pathlib import Path
-
-# Diretório base do projeto
-BASE_DIR = Path(__file__).parent
-DATA_FILE = BASE_DIR / "despesas-anual.xlsx"
-RECEITAS_FILE = BASE_DIR / "receitas-anual.xlsx"
-
-# Configuração da página
-st.set_page_config(
-    page_title="Dashboard Financeiro - IPB",
-    page_icon="⛪",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
 
-# CSS customizado
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: #1E3A5F;
-        text-align: center;
-        margin-bottom: 1rem;
-    }
-    .metric-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 1rem;
-        border-radius: 10px;
-        color: white;
-    }
-    .stMetric {
-        background-color: #f8f9fa;
-        padding: 1rem;
-        border-radius: 10px;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-    div[data-testid="stMetricValue"] {
-        font-size: 1.8rem;
-        font-weight: 700;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# Função para formatar valores em Real
-def formatar_real(valor):
-    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-# Função para carregar dados
-@st.cache_data
-def carregar_dados():
-    df = pd.read_excel(DATA_FILE)
-
-    # Criar coluna de mês numérico para ordenação
-    df['Mes_Num'] = df['Mês Ano Ref.'].apply(lambda x: int(x.split('/')[0]) if pd.notna(x) else 0)
-    df['Ano'] = df['Mês Ano Ref.'].apply(lambda x: int(x.split('/')[1]) if pd.notna(x) else 0)
-
-    # Criar nome do mês
-    meses = {1: 'Janeiro', 2: 'Fevereiro', 3: 'Março', 4: 'Abril',
-             5: 'Maio', 6: 'Junho', 7: 'Julho', 8: 'Agosto',
-             9: 'Setembro', 10: 'Outubro', 11: 'Novembro', 12: 'Dezembro'}
-    df['Nome_Mes'] = df['Mes_Num'].map(meses)
-
-    return df
-
-# Função para carregar dados de receitas
-@st.cache_data
-def carregar_receitas():
-    df_receitas = pd.read_excel(RECEITAS_FILE)
-
-    # Meses para transformação
-    meses_colunas = ['JANEIRO', 'FEVEREIRO', 'MARÇO', 'ABRIL', 'MAIO', 'JUNHO',
-                     'JULHO', 'AGOSTO', 'SETEMBRO', 'OUTUBRO', 'NOVEMBRO', 'DEZEMBRO']
-    meses_num = {m: i+1 for i, m in enumerate(meses_colunas)}
-
-    # Filtrar apenas linhas com dados relevantes (excluir totais e linhas vazias)
-    df_receitas = df_receitas.dropna(subset=['A) DIZIMAVEIS IGREJA'])
-    df_receitas = df_receitas[~df_receitas['A) DIZIMAVEIS IGREJA'].str.contains('Total|total', na=False)]
-
-    # Transformar de wide para long format
-    registros = []
-    for _, row in df_receitas.iterrows():
-        categoria = row['A) DIZIMAVEIS IGREJA']
-        for mes in meses_colunas:
-            if mes in row.index and pd.notna(row[mes]) and row[mes] != 0:
-                registros.append({
-                    'Categoria': categoria,
-                    'Nome_Mes': mes.capitalize(),
-                    'Mes_Num': meses_num[mes],
-                    'Valor': float(row[mes]) if isinstance(row[mes], (int, float)) else 0
-                })
-
-    df_long = pd.DataFrame(registros)
-    return df_long
+from cache_limitado import cache
+from agregados import Cubo
+from arvore_receitas import nos_ate_nivel, valores_nos
+from comparacao import (comparar_periodos, deslocar_ano, descrever_periodo, mes_anterior,
+                        periodo_acumulado, periodo_de_meses, periodo_mes)
+from dados import (MESES_NOMES, FONTE, ORCAMENTO_FILES, iniciar_monitor, obter_arvore_receitas,
+                   obter_despesas, obter_orcamento, obter_receitas, versao_anual)
+from dinheiro import formatar_centavos, formatar_coluna, media_centavos, percentual, somar_em_reais
+from estado_filtros import (estado_da_sessao, filtros_facetas, mascara_das_posicoes, mascara_valor, normalizar,
+                            obter_vista, posicoes_filtradas, sincronizar_url, valores_da_url)
+from exportacao_excel import MIME_XLSX, exportar_xlsx
+from exportacao_html import MIME_HTML, html_anual
+from facetas import opcoes_faceta
+from interface import configurar_pagina, rotulo_faceta
+from orcamento import execucao_orcamento, meses_decorridos, projecao_orcamento
+from previsao import NIVEL_CONFIANCA, fim_comum, previsao_despesas, previsao_receitas
+from recorrencias import HORIZONTE_MESES, detectar, resumir_ano
+
+# Configuração da página (e CSS compartilhado)
+configurar_pagina("Dashboard Financeiro - IPB", "⛪")
+
+# Drill-down: cada clique em um gráfico acrescenta um nível em
+# st.session_state['drill'] ({'Mes_Num': 3, 'Centro de Custo': 'MISSÕES', ...}).
+# A seleção do plotly persiste entre execuções, então só um clique novo conta.
+def registrar_clique(evento, chave, extrair):
+    pontos = evento.selection.points if evento is not None else []
+    assinatura = repr(pontos)
+    if st.session_state.get(f"ultimo_clique_{chave}") == assinatura:
+        return
+    st.session_state[f"ultimo_clique_{chave}"] = assinatura
+    if pontos:
+        st.session_state['drill'].update(extrair(pontos[0]))
+
+def _primeiro(valor):
+    return valor[0] if isinstance(valor, (list, tuple)) else valor
+
+def clique_mes(ponto):
+    if ponto.get('customdata') is None:  # meses projetados não filtram
+        return {}
+    return {'Mes_Num': int(_primeiro(ponto['customdata']))}
+
+def clique_centro(ponto):
+    return {'Centro de Custo': ponto['label']}
+
+def clique_especificacao(ponto):
+    return {'Especificação': _primeiro(ponto['customdata'])}
+
+# No treemap o customdata traz (Centro, Especificação); o nó de um centro
+# tem o próprio centro como id (nomes podem conter '/', então o id não é
+# dividido)
+def clique_treemap(ponto):
+    centro, especificacao = ponto['customdata'][:2]
+    drill = {'Centro de Custo': centro}
+    if ponto['id'] != centro:
+        drill['Especificação'] = especificacao
+    return drill
+
+def remover_drill(nivel):
+    st.session_state['drill'].pop(nivel, None)
+
+def limpar_drill():
+    st.session_state['drill'] = {}
+
+st.session_state.setdefault('drill', {})
+
+# Monitorar as planilhas e recarregar a página quando os dados forem trocados
+iniciar_monitor()
+
+@st.fragment(run_every="10s")
+def verificar_atualizacao():
+    versao = versao_anual()
+    if st.session_state.get('versao_dados_anual') != versao:
+        st.session_state['versao_dados_anual'] = versao
+        st.rerun()
 
 # Carregar dados
-df = carregar_dados()
-df_receitas = carregar_receitas()
+instantaneo_despesas = obter_despesas()
+instantaneo_receitas = obter_receitas()
+instantaneo_orcamento = obter_orcamento()
+instantaneo_arvore = obter_arvore_receitas()
+df, quarentena_despesas = instantaneo_despesas.dados
+df_receitas, quarentena_receitas = instantaneo_receitas.dados
+df_orcamento, quarentena_orcamento = instantaneo_orcamento.dados
+arvore_receitas, divergencias_receitas = instantaneo_arvore.dados
+opcoes = instantaneo_despesas.derivados['opcoes']
+indice = instantaneo_despesas.derivados['indice']
+versao_dados = (instantaneo_despesas.versao, instantaneo_receitas.versao, instantaneo_orcamento.versao,
+                instantaneo_arvore.versao)
+st.session_state['versao_dados_anual'] = versao_dados
+verificar_atualizacao()
 
 # Header
 st.markdown('<h1 class="main-header">⛪ Dashboard Financeiro - IPB 2025</h1>', unsafe_allow_html=True)
 st.markdown("---")
 
+# Relatório de quarentena (linhas inválidas descartadas na validação)
+total_quarentena = len(quarentena_despesas) + len(quarentena_receitas) + len(quarentena_orcamento)
+if total_quarentena > 0:
+    st.warning(f"⚠️ {total_quarentena} linha(s) inválida(s) foram separadas na validação e não entram nos totais.")
+    with st.expander("🧪 Relatório de quarentena"):
+        if len(quarentena_despesas) > 0:
+            st.markdown(f"**Despesas** ({FONTE.descrever('despesas')})")
+            st.dataframe(quarentena_despesas, use_container_width=True, hide_index=True)
+        if len(quarentena_receitas) > 0:
+            st.markdown(f"**Receitas** ({FONTE.descrever('receitas')})")
+            st.dataframe(quarentena_receitas, use_container_width=True, hide_index=True)
+        if len(quarentena_orcamento) > 0:
+            st.markdown("**Orçamento**")
+            st.dataframe(quarentena_orcamento, use_container_width=True, hide_index=True)
+
 # Sidebar - Filtros
 st.sidebar.header("🔍 Filtros")
 
+# Visão aberta por um link (?centro=...&mes=...): os filtros da URL entram
+# no session_state uma vez por sessão, antes de os widgets serem desenhados
+if 'filtros_da_url' not in st.session_state:
+    st.session_state['filtros_da_url'] = True
+    st.session_state.update(valores_da_url(
+        {parametro: st.query_params.get_all(parametro) for parametro in st.query_params},
+        {'centros': opcoes['centros'], 'excluidos': opcoes['centros'], 'especificacoes': opcoes['especificacoes'],
+         'meses': opcoes['meses'], 'categorias': instantaneo_receitas.derivados['categorias']},
+        opcoes['valor_max']
+    ))
+
+# Filtros em cascata: as opções de cada filtro (com quantidade e total)
+# refletem os demais filtros ativos. Os valores atuais vêm do session_state
+# porque cada filtro depende também dos que são desenhados depois dele.
+# As contagens ficam no cache compartilhado, pela chave canônica dos filtros.
+estado_atual = estado_da_sessao(st.session_state, opcoes['valor_max'])
+contagens = obter_vista('contagens', estado_atual, instantaneo_despesas.versao, lambda: indice.contar(
+    filtros_facetas(estado_atual), base=mascara_valor(estado_atual, indice.valores)
+))
+
 # Filtro de Centro de Custo
-centros_custo = ['Todos'] + sorted(df['Centro de Custo'].dropna().unique().tolist())
+contagem_centros = contagens['Centro de Custo']
 centro_selecionado = st.sidebar.multiselect(
     "Incluir Centro de Custo",
-    options=centros_custo[1:],
-    default=[]
+    options=opcoes_faceta(contagem_centros, st.session_state.get('filtro_centro_incluir', [])),
+    format_func=rotulo_faceta(contagem_centros),
+    default=[],
+    key="filtro_centro_incluir"
 )
 
 # Filtro para Excluir Centro de Custo
 centro_excluido = st.sidebar.multiselect(
     "Excluir Centro de Custo",
-    options=centros_custo[1:],
-    default=[]
+    options=opcoes_faceta(contagem_centros, st.session_state.get('filtro_centro_excluir', [])),
+    format_func=rotulo_faceta(contagem_centros),
+    default=[],
+    key="filtro_centro_excluir"
 )
 
 st.sidebar.markdown("---")
 
 # Filtro de Especificação de Despesas
-especificacoes_disponiveis = ['Todas'] + sorted(df['Especificação'].dropna().unique().tolist())
+contagem_especificacoes = contagens['Especificação']
 especificacao_selecionada = st.sidebar.multiselect(
     "Especificação Despesas",
-    options=especificacoes_disponiveis[1:],
-    default=[]
+    options=opcoes_faceta(contagem_especificacoes, st.session_state.get('filtro_especificacao', [])),
+    format_func=rotulo_faceta(contagem_especificacoes),
+    default=[],
+    key="filtro_especificacao"
 )
 
 st.sidebar.markdown("---")
 
 # Filtro de Categoria de Receitas
-categorias_receitas_global = ['Todas'] + sorted(df_receitas['Categoria'].dropna().unique().tolist())
+categorias_receitas_global = ['Todas'] + instantaneo_receitas.derivados['categorias']
 categoria_receita_selecionada = st.sidebar.multiselect(
     "Categoria Receitas",
     options=categorias_receitas_global[1:],
-    default=[]
+    default=[],
+    key="filtro_categoria_receitas"
 )
 
 st.sidebar.markdown("---")
 
 # Filtro de Mês
-meses_disponiveis = sorted(df['Mês Ano Ref.'].unique().tolist(),
-                           key=lambda x: (int(x.split('/')[1]), int(x.split('/')[0])))
+contagem_meses = contagens['Mês Ano Ref.']
 meses_selecionados = st.sidebar.multiselect(
     "Mês/Ano",
-    options=meses_disponiveis,
-    default=[]
+    options=opcoes_faceta(contagem_meses, st.session_state.get('filtro_meses', []), ordem=opcoes['meses']),
+    format_func=rotulo_faceta(contagem_meses),
+    default=[],
+    key="filtro_meses"
 )
 
 # Filtro de valor mínimo/máximo
 valor_min, valor_max = st.sidebar.slider(
     "Faixa de Valor (R$)",
     min_value=0.0,
-    max_value=float(df['Valor'].max()),
-    value=(0.0, float(df['Valor'].max())),
-    format="R$ %.2f"
+    max_value=opcoes['valor_max'],
+    value=(0.0, opcoes['valor_max']),
+    format="R$ %.2f",
+    key="filtro_valor"
 )
 
-# Aplicar filtros
-df_filtrado = df.copy()
+# Estado canônico dos filtros: chave do cache compartilhado e da URL
+estado_filtros = normalizar(centro_selecionado, centro_excluido, especificacao_selecionada, meses_selecionados,
+                            categoria_receita_selecionada, valor_min, valor_max, opcoes['valor_max'])
+sincronizar_url(st.query_params, estado_filtros)
 
-if centro_selecionado:
-    df_filtrado = df_filtrado[df_filtrado['Centro de Custo'].isin(centro_selecionado)]
-
-if centro_excluido:
-    df_filtrado = df_filtrado[~df_filtrado['Centro de Custo'].isin(centro_excluido)]
-
-if especificacao_selecionada:
-    df_filtrado = df_filtrado[df_filtrado['Especificação'].isin(especificacao_selecionada)]
+# Aplicar filtros: as posições do recorte vêm do cache (outra sessão ou um
+# link com os mesmos filtros já as calculou) ou de uma máscara do índice
+posicoes_filtrado = posicoes_filtradas(estado_filtros, instantaneo_despesas.versao, indice)
+df_filtrado = df.iloc[posicoes_filtrado]
+mascara_filtrado = mascara_das_posicoes(posicoes_filtrado, len(df))
 
-if meses_selecionados:
-    df_filtrado = df_filtrado[df_filtrado['Mês Ano Ref.'].isin(meses_selecionados)]
+# Cubo de rollups do recorte atual (um groupby por combinação de filtros,
+# reaproveitado por todos os cliques de drill-down)
+cubo = obter_vista('cubo', estado_filtros, instantaneo_despesas.versao, lambda: Cubo(df_filtrado))
 
-df_filtrado = df_filtrado[(df_filtrado['Valor'] >= valor_min) & (df_filtrado['Valor'] <= valor_max)]
+# Total de despesas por mês do recorte (comparativo e evolução mensal)
+despesas_por_mes = obter_vista('despesas_por_mes', estado_filtros, instantaneo_despesas.versao,
+                               lambda: somar_em_reais(df_filtrado, ['Mes_Num', 'Nome_Mes']).reset_index())
 
 # Filtrar receitas pelos meses selecionados (se houver)
 # Se centro de custo estiver selecionado para inclusão, não mostrar receitas nem comparativo
@@ -213,10 +252,10 @@ st.subheader("📊 Indicadores de Despesas")
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    total_gasto = df_filtrado['Valor'].sum()
+    total_gasto = int(df_filtrado['Centavos'].sum())
     st.metric(
         label="💸 Total Despesas",
-        value=formatar_real(total_gasto)
+        value=formatar_centavos(total_gasto)
     )
 
 with col2:
@@ -227,17 +266,17 @@ with col2:
     )
 
 with col3:
-    media_lancamento = df_filtrado['Valor'].mean() if len(df_filtrado) > 0 else 0
+    media_lancamento = media_centavos(df_filtrado['Centavos'])
     st.metric(
         label="📈 Média/Lançamento",
-        value=formatar_real(media_lancamento)
+        value=formatar_centavos(media_lancamento)
     )
 
 with col4:
-    maior_despesa = df_filtrado['Valor'].max() if len(df_filtrado) > 0 else 0
+    maior_despesa = df_filtrado['Centavos'].max() if len(df_filtrado) > 0 else 0
     st.metric(
         label="🔝 Maior Despesa",
-        value=formatar_real(maior_despesa)
+        value=formatar_centavos(maior_despesa)
     )
 
 # KPIs de Receitas e Saldo (apenas se não houver filtro de centro de custo)
@@ -245,25 +284,25 @@ if mostrar_receitas:
     st.subheader("💰 Indicadores de Receitas e Saldo")
     col1, col2, col3, col4 = st.columns(4)
 
-    total_receitas = df_receitas_filtrado['Valor'].sum()
+    total_receitas = int(df_receitas_filtrado['Centavos'].sum())
     saldo = total_receitas - total_gasto
 
     with col1:
         st.metric(
             label="💵 Total Receitas",
-            value=formatar_real(total_receitas)
+            value=formatar_centavos(total_receitas)
         )
 
     with col2:
         delta_color = "normal" if saldo >= 0 else "inverse"
         st.metric(
             label="📊 Saldo",
-            value=formatar_real(saldo),
-            delta=f"{(saldo/total_receitas*100):.1f}% das receitas" if total_receitas > 0 else "N/A"
+            value=formatar_centavos(saldo),
+            delta=f"{percentual(saldo, total_receitas):.1f}% das receitas" if total_receitas > 0 else "N/A"
         )
 
     with col3:
-        percentual_gasto = (total_gasto / total_receitas * 100) if total_receitas > 0 else 0
+        percentual_gasto = percentual(total_gasto, total_receitas) if total_receitas > 0 else 0
         st.metric(
             label="📉 % Despesas/Receitas",
             value=f"{percentual_gasto:.1f}%"
@@ -288,11 +327,11 @@ if mostrar_comparativo:
     st.subheader("📊 Comparativo Receitas x Despesas por Mês")
 
     # Preparar dados de despesas por mês
-    despesas_mes = df_filtrado.groupby(['Mes_Num', 'Nome_Mes'])['Valor'].sum().reset_index()
+    despesas_mes = despesas_por_mes.copy()
     despesas_mes.columns = ['Mes_Num', 'Nome_Mes', 'Despesas']
 
     # Preparar dados de receitas por mês
-    receitas_mes = df_receitas_filtrado.groupby(['Mes_Num', 'Nome_Mes'])['Valor'].sum().reset_index()
+    receitas_mes = somar_em_reais(df_receitas_filtrado, ['Mes_Num', 'Nome_Mes']).reset_index()
     receitas_mes.columns = ['Mes_Num', 'Nome_Mes', 'Receitas']
 
     # Merge dos dados
@@ -307,6 +346,7 @@ if mostrar_comparativo:
         name='Receitas',
         x=comparativo['Nome_Mes'],
         y=comparativo['Receitas'],
+        customdata=comparativo['Mes_Num'],
         marker_color='#2ecc71',
         hovertemplate="<b>%{x}</b><br>Receitas: R$ %{y:,.2f}<extra></extra>"
     ))
@@ -315,6 +355,7 @@ if mostrar_comparativo:
         name='Despesas',
         x=comparativo['Nome_Mes'],
         y=comparativo['Despesas'],
+        customdata=comparativo['Mes_Num'],
         marker_color='#e74c3c',
         hovertemplate="<b>%{x}</b><br>Despesas: R$ %{y:,.2f}<extra></extra>"
     ))
@@ -324,12 +365,64 @@ if mostrar_comparativo:
         name='Saldo',
         x=comparativo['Nome_Mes'],
         y=comparativo['Saldo'],
+        customdata=comparativo['Mes_Num'],
         mode='lines+markers',
         marker=dict(color='#3498db', size=10),
         line=dict(color='#3498db', width=3),
         hovertemplate="<b>%{x}</b><br>Saldo: R$ %{y:,.2f}<extra></extra>"
     ))
 
+    # Projeção dos meses seguintes (modelo ajustado por versão dos dados; o
+    # recorte usa só os centros e categorias presentes na seleção)
+    mostrar_projecao = st.toggle("🔮 Mostrar projeção dos próximos meses", key="mostrar_projecao")
+    if mostrar_projecao:
+        agregado_previsao = instantaneo_despesas.derivados['agregado_mensal']
+        ano_previsao = int(agregado_previsao['Ano'].max())
+        # As duas séries são projetadas até o mesmo mês e comparadas só nos
+        # meses seguintes ao último com dados em qualquer uma delas
+        ultimos_periodos = [int(agregado_previsao['Periodo'].max()),
+                            ano_previsao * 100 + int(df_receitas['Mes_Num'].max())]
+        fim_previsao = fim_comum(ultimos_periodos)
+        modelo_despesas = previsao_despesas(agregado_previsao, instantaneo_despesas.versao, fim_previsao)
+        modelo_receitas = previsao_receitas(df_receitas, ano_previsao, instantaneo_receitas.versao, fim_previsao)
+        projecao = modelo_receitas.projetar(df_receitas_filtrado['Categoria'].unique()).merge(
+            modelo_despesas.projetar(df_filtrado['Centro de Custo'].fillna('(não informado)').unique()),
+            on=['Periodo', 'Ano', 'Mes_Num'], suffixes=(' Receitas', ' Despesas')
+        )
+        projecao = projecao[projecao['Periodo'] > max(ultimos_periodos)]
+        rotulos_projecao = [f"{MESES_NOMES[mes]} {ano} (proj.)"
+                            for ano, mes in zip(projecao['Ano'], projecao['Mes_Num'])]
+
+        for nome, cor in [('Receitas', '#2ecc71'), ('Despesas', '#e74c3c')]:
+            previsto, inferior, superior = (projecao[f'{coluna} {nome}'] for coluna in ['Previsto', 'Inferior', 'Superior'])
+            fig_comparativo.add_trace(go.Bar(
+                name=f'{nome} (projeção)',
+                x=rotulos_projecao,
+                y=previsto / 100,
+                marker=dict(color=cor, opacity=0.45, pattern_shape='/'),
+                error_y=dict(
+                    type='data', symmetric=False,
+                    array=(superior - previsto) / 100,
+                    arrayminus=(previsto - inferior) / 100
+                ),
+                # Faixa no hovertext: barras projetadas ficam sem customdata,
+                # que é o mês usado pelo clique (meses projetados não filtram)
+                hovertext=[f"{formatar_centavos(minimo)} a {formatar_centavos(maximo)}"
+                           for minimo, maximo in zip(inferior, superior)],
+                hovertemplate=f"<b>%{{x}}</b><br>{nome} previstas: R$ %{{y:,.2f}}<br>"
+                              "Faixa: %{hovertext}<extra></extra>"
+            ))
+
+        fig_comparativo.add_trace(go.Scatter(
+            name='Saldo (projeção)',
+            x=rotulos_projecao,
+            y=(projecao['Previsto Receitas'] - projecao['Previsto Despesas']) / 100,
+            mode='lines+markers',
+            marker=dict(color='#3498db', size=8),
+            line=dict(color='#3498db', width=2, dash='dash'),
+            hovertemplate="<b>%{x}</b><br>Saldo previsto: R$ %{y:,.2f}<extra></extra>"
+        ))
+
     fig_comparativo.update_layout(
         barmode='group',
         height=450,
@@ -337,10 +430,31 @@ if mostrar_comparativo:
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
         yaxis_title="Valor (R$)"
     )
-    st.plotly_chart(fig_comparativo, use_container_width=True)
+    evento = st.plotly_chart(fig_comparativo, use_container_width=True,
+                             on_select="rerun", selection_mode="points", key="grafico_comparativo")
+    registrar_clique(evento, "comparativo", clique_mes)
+
+    if mostrar_projecao:
+        st.caption(
+            f"Projeção por tendência linear ajustada a cada centro de custo e categoria de receita, com faixa de "
+            f"{NIVEL_CONFIANCA}% de confiança. Valores atípicos no histórico alargam a faixa."
+        )
+        with st.expander("🔮 Projeção por centro de custo e categoria"):
+            col_p1, col_p2 = st.columns(2)
+            for coluna_tela, modelo, titulo in [(col_p1, modelo_receitas, 'Receitas por categoria'),
+                                                (col_p2, modelo_despesas, 'Despesas por centro de custo')]:
+                with coluna_tela:
+                    st.markdown(f"**{titulo}** ({len(modelo.futuro)} meses)")
+                    resumo_previsao = modelo.por_serie()
+                    for coluna in ['Últimos 12 Meses', 'Previsto', 'Inferior', 'Superior']:
+                        resumo_previsao[coluna] = formatar_coluna(resumo_previsao[coluna])
+                    st.dataframe(resumo_previsao, use_container_width=True, hide_index=True)
 
     st.markdown("---")
 
+# Painel de drill-down (preenchido no fim, depois de lidos todos os cliques)
+painel_drill = st.container()
+
 # Gráficos - Linha 1
 col1, col2 = st.columns(2)
 
@@ -348,7 +462,7 @@ with col1:
     st.subheader("📅 Evolução Mensal das Despesas")
 
     # Agrupar por mês
-    evolucao_mensal = df_filtrado.groupby(['Mes_Num', 'Nome_Mes'])['Valor'].sum().reset_index()
+    evolucao_mensal = despesas_por_mes
     evolucao_mensal = evolucao_mensal.sort_values('Mes_Num')
 
     fig_evolucao = px.bar(
@@ -357,6 +471,7 @@ with col1:
         y='Valor',
         color='Valor',
         color_continuous_scale='Blues',
+        custom_data=['Mes_Num'],
         labels={'Valor': 'Valor (R$)', 'Nome_Mes': 'Mês'}
     )
     fig_evolucao.update_layout(
@@ -368,13 +483,15 @@ with col1:
     fig_evolucao.update_traces(
         hovertemplate="<b>%{x}</b><br>Valor: R$ %{y:,.2f}<extra></extra>"
     )
-    st.plotly_chart(fig_evolucao, use_container_width=True)
+    evento = st.plotly_chart(fig_evolucao, use_container_width=True,
+                             on_select="rerun", selection_mode="points", key="grafico_evolucao")
+    registrar_clique(evento, "evolucao", clique_mes)
 
 with col2:
     st.subheader("🏷️ Distribuição por Centro de Custo")
 
     # Agrupar por centro de custo
-    por_centro = df_filtrado.groupby('Centro de Custo')['Valor'].sum().reset_index()
+    por_centro = somar_em_reais(df_filtrado, 'Centro de Custo').reset_index()
     por_centro = por_centro.sort_values('Valor', ascending=False)
 
     fig_centro = px.pie(
@@ -390,7 +507,9 @@ with col2:
         textinfo='percent',
         hovertemplate="<b>%{label}</b><br>Valor: R$ %{value:,.2f}<br>Percentual: %{percent}<extra></extra>"
     )
-    st.plotly_chart(fig_centro, use_container_width=True)
+    evento = st.plotly_chart(fig_centro, use_container_width=True,
+                             on_select="rerun", selection_mode="points", key="grafico_centro")
+    registrar_clique(evento, "centro", clique_centro)
 
 st.markdown("---")
 
@@ -402,7 +521,7 @@ if mostrar_receitas:
         st.subheader("💵 Distribuição de Receitas por Categoria")
 
         # Agrupar receitas por categoria
-        receitas_por_categoria = df_receitas_filtrado.groupby('Categoria')['Valor'].sum().reset_index()
+        receitas_por_categoria = somar_em_reais(df_receitas_filtrado, 'Categoria').reset_index()
         receitas_por_categoria = receitas_por_categoria.sort_values('Valor', ascending=False)
         receitas_por_categoria['Categoria_Curta'] = receitas_por_categoria['Categoria'].apply(
             lambda x: x[:30] + '...' if len(str(x)) > 30 else x
@@ -426,7 +545,7 @@ if mostrar_receitas:
     with col2:
         st.subheader("🔝 Top 10 Maiores Despesas por Especificação")
 
-        top_especificacoes = df_filtrado.groupby('Especificação')['Valor'].sum().reset_index()
+        top_especificacoes = somar_em_reais(df_filtrado, 'Especificação').reset_index()
         top_especificacoes = top_especificacoes.sort_values('Valor', ascending=False).head(10)
         top_especificacoes['Especificação_Curta'] = top_especificacoes['Especificação'].apply(
             lambda x: x[:40] + '...' if len(x) > 40 else x
@@ -439,6 +558,7 @@ if mostrar_receitas:
             orientation='h',
             color='Valor',
             color_continuous_scale='Reds',
+            custom_data=['Especificação'],
             labels={'Valor': 'Valor (R$)', 'Especificação_Curta': 'Especificação'}
         )
         fig_top.update_layout(
@@ -450,12 +570,14 @@ if mostrar_receitas:
         fig_top.update_traces(
             hovertemplate="<b>%{y}</b><br>Valor: R$ %{x:,.2f}<extra></extra>"
         )
-        st.plotly_chart(fig_top, use_container_width=True)
+        evento = st.plotly_chart(fig_top, use_container_width=True,
+                                 on_select="rerun", selection_mode="points", key="grafico_top")
+        registrar_clique(evento, "top", clique_especificacao)
 else:
     # Mostrar apenas o gráfico de despesas em largura total
     st.subheader("🔝 Top 10 Maiores Despesas por Especificação")
 
-    top_especificacoes = df_filtrado.groupby('Especificação')['Valor'].sum().reset_index()
+    top_especificacoes = somar_em_reais(df_filtrado, 'Especificação').reset_index()
     top_especificacoes = top_especificacoes.sort_values('Valor', ascending=False).head(10)
     top_especificacoes['Especificação_Curta'] = top_especificacoes['Especificação'].apply(
         lambda x: x[:40] + '...' if len(x) > 40 else x
@@ -468,6 +590,7 @@ else:
         orientation='h',
         color='Valor',
         color_continuous_scale='Reds',
+        custom_data=['Especificação'],
         labels={'Valor': 'Valor (R$)', 'Especificação_Curta': 'Especificação'}
     )
     fig_top.update_layout(
@@ -479,7 +602,9 @@ else:
     fig_top.update_traces(
         hovertemplate="<b>%{y}</b><br>Valor: R$ %{x:,.2f}<extra></extra>"
     )
-    st.plotly_chart(fig_top, use_container_width=True)
+    evento = st.plotly_chart(fig_top, use_container_width=True,
+                             on_select="rerun", selection_mode="points", key="grafico_top")
+    registrar_clique(evento, "top", clique_especificacao)
 
 st.markdown("---")
 
@@ -487,17 +612,18 @@ st.markdown("---")
 st.subheader("📋 Resumo por Centro de Custo")
 
 resumo_centro = df_filtrado.groupby('Centro de Custo').agg({
-    'Valor': ['sum', 'mean', 'count', 'max']
+    'Centavos': ['sum', 'mean', 'count', 'max']
 }).reset_index()
 resumo_centro.columns = ['Centro de Custo', 'Total', 'Média', 'Qtd. Lançamentos', 'Maior Valor']
+resumo_centro['Média'] = resumo_centro['Média'].round().astype('int64')
 resumo_centro = resumo_centro.sort_values('Total', ascending=False)
 resumo_centro['% do Total'] = (resumo_centro['Total'] / resumo_centro['Total'].sum() * 100).round(2)
 
 # Formatar valores para exibição
 resumo_display = resumo_centro.copy()
-resumo_display['Total'] = resumo_display['Total'].apply(formatar_real)
-resumo_display['Média'] = resumo_display['Média'].apply(formatar_real)
-resumo_display['Maior Valor'] = resumo_display['Maior Valor'].apply(formatar_real)
+resumo_display['Total'] = formatar_coluna(resumo_display['Total'])
+resumo_display['Média'] = formatar_coluna(resumo_display['Média'])
+resumo_display['Maior Valor'] = formatar_coluna(resumo_display['Maior Valor'])
 resumo_display['% do Total'] = resumo_display['% do Total'].apply(lambda x: f"{x:.2f}%")
 
 st.dataframe(
@@ -519,7 +645,7 @@ if mostrar_receitas:
         st.markdown("**📈 Evolução Mensal das Receitas**")
 
         # Agrupar receitas por mês
-        evolucao_receitas = df_receitas_filtrado.groupby(['Mes_Num', 'Nome_Mes'])['Valor'].sum().reset_index()
+        evolucao_receitas = somar_em_reais(df_receitas_filtrado, ['Mes_Num', 'Nome_Mes']).reset_index()
         evolucao_receitas = evolucao_receitas.sort_values('Mes_Num')
 
         fig_evolucao_rec = px.bar(
@@ -545,7 +671,7 @@ if mostrar_receitas:
         st.markdown("**🏆 Top Categorias de Receita**")
 
         # Top categorias de receita
-        top_receitas = df_receitas_filtrado.groupby('Categoria')['Valor'].sum().reset_index()
+        top_receitas = somar_em_reais(df_receitas_filtrado, 'Categoria').reset_index()
         top_receitas = top_receitas.sort_values('Valor', ascending=True).tail(10)
         top_receitas['Categoria_Curta'] = top_receitas['Categoria'].apply(
             lambda x: x[:35] + '...' if len(str(x)) > 35 else x
@@ -574,16 +700,17 @@ if mostrar_receitas:
     st.markdown("**📋 Resumo de Receitas por Categoria**")
 
     resumo_receitas = df_receitas_filtrado.groupby('Categoria').agg({
-        'Valor': ['sum', 'mean', 'count']
+        'Centavos': ['sum', 'mean', 'count']
     }).reset_index()
     resumo_receitas.columns = ['Categoria', 'Total', 'Média Mensal', 'Meses com Registro']
+    resumo_receitas['Média Mensal'] = resumo_receitas['Média Mensal'].round().astype('int64')
     resumo_receitas = resumo_receitas.sort_values('Total', ascending=False)
     resumo_receitas['% do Total'] = (resumo_receitas['Total'] / resumo_receitas['Total'].sum() * 100).round(2)
 
     # Formatar valores
     resumo_receitas_display = resumo_receitas.copy()
-    resumo_receitas_display['Total'] = resumo_receitas_display['Total'].apply(formatar_real)
-    resumo_receitas_display['Média Mensal'] = resumo_receitas_display['Média Mensal'].apply(formatar_real)
+    resumo_receitas_display['Total'] = formatar_coluna(resumo_receitas_display['Total'])
+    resumo_receitas_display['Média Mensal'] = formatar_coluna(resumo_receitas_display['Média Mensal'])
     resumo_receitas_display['% do Total'] = resumo_receitas_display['% do Total'].apply(lambda x: f"{x:.2f}%")
 
     st.dataframe(
@@ -592,12 +719,65 @@ if mostrar_receitas:
         hide_index=True
     )
 
+    # Hierarquia completa da planilha (grupos, seções, subgrupos e categorias).
+    # Os subtotais de cada nó já vêm somados por mês na árvore; aqui só se
+    # escolhem as colunas dos meses filtrados.
+    st.markdown("**🌳 Hierarquia de Receitas**")
+    st.caption("Segue o filtro de meses; o filtro de categorias não se aplica à hierarquia.")
+
+    meses_arvore = [int(m.split('/')[0]) for m in meses_selecionados] if meses_selecionados else None
+    nos_receitas = arvore_receitas.assign(Centavos=valores_nos(arvore_receitas, meses_arvore))
+    nos_receitas = nos_receitas[nos_receitas['Centavos'] > 0]
+
+    if not nos_receitas.empty:
+        col_arv1, col_arv2 = st.columns([3, 2])
+
+        with col_arv1:
+            tipo_hierarquia = st.radio(
+                "Visualização", ["Sunburst", "Treemap"], horizontal=True, key="hierarquia_receitas_tipo"
+            )
+            grafico = go.Sunburst if tipo_hierarquia == "Sunburst" else go.Treemap
+            fig_hierarquia = go.Figure(grafico(
+                ids=nos_receitas['id'],
+                labels=nos_receitas['rotulo'],
+                parents=nos_receitas['pai'],
+                values=nos_receitas['Centavos'] / 100,
+                branchvalues='total',
+                hovertemplate="<b>%{label}</b><br>Valor: R$ %{value:,.2f}<br>%{percentRoot:.1%} do total<extra></extra>"
+            ))
+            fig_hierarquia.update_layout(height=500, margin=dict(t=10, l=10, r=10, b=10))
+            st.plotly_chart(fig_hierarquia, use_container_width=True)
+
+        with col_arv2:
+            niveis_hierarquia = {"Grupos": 1, "Seções": 2, "Subgrupos": 3, "Categorias": 4}
+            nivel_hierarquia = st.selectbox(
+                "Detalhar até", list(niveis_hierarquia), index=1, key="hierarquia_receitas_nivel"
+            )
+            subtotais = nos_ate_nivel(nos_receitas, niveis_hierarquia[nivel_hierarquia])
+            total_raiz = int(nos_receitas.loc[nos_receitas['nivel'] == 0, 'Centavos'].sum())
+            subtotais_display = pd.DataFrame({
+                'Item': subtotais['nivel'].map(lambda nivel: '\u2003' * max(nivel - 1, 0)) + subtotais['rotulo'],
+                'Total': formatar_coluna(subtotais['Centavos']).to_numpy(),
+                '% do Total': (subtotais['Centavos'] * 100 / total_raiz).map(lambda x: f"{x:.2f}%").to_numpy()
+            })
+            st.dataframe(subtotais_display, use_container_width=True, hide_index=True, height=460)
+
+    if not divergencias_receitas.empty:
+        with st.expander(f"⚠️ {len(divergencias_receitas)} total(is) da planilha não conferem com a soma das categorias"):
+            divergencias_display = divergencias_receitas.assign(
+                Mês=divergencias_receitas['Mês'].map(MESES_NOMES),
+                Diferença=formatar_coluna(divergencias_receitas['Planilha'] - divergencias_receitas['Calculado']),
+                Planilha=formatar_coluna(divergencias_receitas['Planilha']),
+                Calculado=formatar_coluna(divergencias_receitas['Calculado'])
+            )
+            st.dataframe(divergencias_display, use_container_width=True, hide_index=True)
+
     st.markdown("---")
 
 # Gráfico de evolução por Centro de Custo (Treemap)
 st.subheader("🗂️ Mapa de Despesas por Centro de Custo e Especificação")
 
-treemap_data = df_filtrado.groupby(['Centro de Custo', 'Especificação'])['Valor'].sum().reset_index()
+treemap_data = somar_em_reais(df_filtrado, ['Centro de Custo', 'Especificação']).reset_index()
 treemap_data = treemap_data[treemap_data['Valor'] > 0]
 
 fig_treemap = px.treemap(
@@ -605,16 +785,321 @@ fig_treemap = px.treemap(
     path=['Centro de Custo', 'Especificação'],
     values='Valor',
     color='Valor',
-    color_continuous_scale='RdYlBu_r'
+    color_continuous_scale='RdYlBu_r',
+    custom_data=['Centro de Custo', 'Especificação']
 )
 fig_treemap.update_layout(height=600)
 fig_treemap.update_traces(
     hovertemplate="<b>%{label}</b><br>Valor: R$ %{value:,.2f}<extra></extra>"
 )
-st.plotly_chart(fig_treemap, use_container_width=True)
+evento = st.plotly_chart(fig_treemap, use_container_width=True,
+                         on_select="rerun", selection_mode="points", key="grafico_treemap")
+registrar_clique(evento, "treemap", clique_treemap)
+
+st.markdown("---")
+
+# Comparação de períodos sobre os agregados mensais pré-calculados.
+# Respeita os filtros de centro de custo e especificação da barra lateral;
+# os períodos são escolhidos aqui, independentemente do filtro de mês.
+st.subheader("📆 Comparação de Períodos")
+
+agregado = instantaneo_despesas.derivados['agregado_mensal']
+codigos_disponiveis = sorted(agregado['Periodo'].unique().tolist())
+
+col_modo, col_ref, col_nivel = st.columns([2, 1, 1])
+with col_modo:
+    modo_comparacao = st.radio(
+        "Comparar",
+        ["Mês anterior (MoM)", "Mesmo mês do ano anterior (YoY)",
+         "Acumulado do ano (YTD) x ano anterior", "Personalizado"],
+        horizontal=True,
+        key="comparacao_modo"
+    )
+with col_nivel:
+    nivel_comparacao = st.radio(
+        "Agrupar por",
+        ["Centro de Custo", "Especificação"],
+        key="comparacao_nivel"
+    )
+
+if modo_comparacao == "Personalizado":
+    col_a, col_b = st.columns(2)
+    with col_a:
+        meses_a = st.multiselect("Período A", options=opcoes['meses'],
+                                 default=opcoes['meses'][-1:], key="comparacao_periodo_a")
+    with col_b:
+        meses_b = st.multiselect("Período B (base)", options=opcoes['meses'],
+                                 default=opcoes['meses'][-2:-1], key="comparacao_periodo_b")
+    periodo_a = periodo_de_meses(meses_a)
+    periodo_b = periodo_de_meses(meses_b)
+else:
+    with col_ref:
+        mes_referencia = st.selectbox("Mês de referência", options=opcoes['meses'][::-1],
+                                      key="comparacao_referencia")
+    ano_ref, mes_ref = divmod(periodo_de_meses([mes_referencia])[0], 100)
+    if modo_comparacao.startswith("Mês anterior"):
+        periodo_a = periodo_mes(ano_ref, mes_ref)
+        periodo_b = periodo_mes(*mes_anterior(ano_ref, mes_ref))
+    elif modo_comparacao.startswith("Mesmo mês"):
+        periodo_a = periodo_mes(ano_ref, mes_ref)
+        periodo_b = deslocar_ano(periodo_a)
+    else:
+        periodo_a = periodo_acumulado(ano_ref, mes_ref)
+        periodo_b = deslocar_ano(periodo_a)
+
+filtros_comparacao = {
+    'Centro de Custo': {'incluir': centro_selecionado, 'excluir': centro_excluido},
+    'Especificação': {'incluir': especificacao_selecionada}
+}
+comparacao = comparar_periodos(agregado, instantaneo_despesas.versao, periodo_a, periodo_b,
+                               nivel_comparacao, filtros_comparacao)
+
+total_a = int(comparacao['Período A'].sum())
+total_b = int(comparacao['Período B'].sum())
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.metric(f"Período A: {descrever_periodo(periodo_a, MESES_NOMES)}", formatar_centavos(total_a))
+with col2:
+    st.metric(f"Período B: {descrever_periodo(periodo_b, MESES_NOMES)}", formatar_centavos(total_b))
+with col3:
+    variacao_pct = f"{percentual(total_a - total_b, total_b):+.1f}%" if total_b else None
+    st.metric("Variação", formatar_centavos(total_a - total_b), delta=variacao_pct, delta_color="inverse")
+
+if not any(codigo in codigos_disponiveis for codigo in periodo_b):
+    st.info("ℹ️ Não há lançamentos no período B; os valores de base aparecem como zero.")
+
+if len(comparacao) > 0:
+    rotulos_comparacao = comparacao[nivel_comparacao].fillna("(não informado)")
+    top_variacoes = comparacao.assign(**{nivel_comparacao: rotulos_comparacao}).head(15).iloc[::-1]
+    fig_comparacao = go.Figure(go.Bar(
+        x=top_variacoes['Variação'] / 100,
+        y=top_variacoes[nivel_comparacao],
+        orientation='h',
+        marker_color=['#d62728' if v > 0 else '#2ca02c' for v in top_variacoes['Variação']],
+        customdata=top_variacoes[['Período A', 'Período B']].to_numpy() / 100,
+        hovertemplate="<b>%{y}</b><br>A: R$ %{customdata[0]:,.2f}<br>B: R$ %{customdata[1]:,.2f}"
+                      "<br>Variação: R$ %{x:,.2f}<extra></extra>"
+    ))
+    fig_comparacao.update_layout(height=450, xaxis_title="Variação (R$)", yaxis_title="")
+    st.plotly_chart(fig_comparacao, use_container_width=True)
+
+    comparacao_display = comparacao.assign(**{nivel_comparacao: rotulos_comparacao})
+    for coluna in ['Período A', 'Período B', 'Variação']:
+        comparacao_display[coluna] = formatar_coluna(comparacao_display[coluna])
+    comparacao_display['Variação %'] = comparacao['Variação %'].apply(
+        lambda x: f"{x:+.1f}%" if pd.notna(x) else "novo"
+    )
+    st.dataframe(comparacao_display, use_container_width=True, hide_index=True)
+else:
+    st.info("Nenhum lançamento nos períodos escolhidos.")
+
+st.markdown("---")
+
+# Orçamento x Realizado por centro de custo. A execução mês a mês vem do
+# agregado mensal já calculado; só os meses alterados são recalculados.
+st.subheader("🎯 Orçamento x Realizado")
+
+if df_orcamento.empty:
+    st.info(
+        f"ℹ️ Nenhum orçamento encontrado. Salve **{ORCAMENTO_FILES[0].name}** ou **{ORCAMENTO_FILES[1].name}** "
+        "na pasta do projeto com a coluna 'Centro de Custo' e uma coluna por mês (JANEIRO a DEZEMBRO) "
+        "ou a coluna 'Orçamento Anual'. A coluna 'Ano' é opcional."
+    )
+else:
+    ano_orcamento = int(agregado['Ano'].max())
+    execucao = execucao_orcamento(df_orcamento, agregado, ano_orcamento)
+    decorridos = meses_decorridos(agregado, ano_orcamento)
+
+    # Mesmos filtros de centro de custo da barra lateral
+    if centro_selecionado:
+        execucao = execucao[execucao['Centro de Custo'].isin(centro_selecionado)]
+    if centro_excluido:
+        execucao = execucao[~execucao['Centro de Custo'].isin(centro_excluido)]
+    resumo_orcamento = projecao_orcamento(execucao, decorridos)
+
+    orcado_anual = int(resumo_orcamento['Orçado Anual'].sum())
+    realizado_ano = int(resumo_orcamento['Realizado'].sum())
+    projecao_anual = int(resumo_orcamento['Projeção Anual'].sum())
+
+    st.caption(f"Ano {ano_orcamento} · {decorridos} mês(es) com lançamentos · projeção mantendo o ritmo médio mensal")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("📋 Orçado no Ano", formatar_centavos(orcado_anual))
+    with col2:
+        st.metric("💸 Realizado", formatar_centavos(realizado_ano))
+    with col3:
+        st.metric("📊 % Executado", f"{percentual(realizado_ano, orcado_anual):.1f}%" if orcado_anual else "-")
+    with col4:
+        st.metric("🔮 Projeção Anual", formatar_centavos(projecao_anual),
+                  delta=formatar_centavos(projecao_anual - orcado_anual), delta_color="inverse")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        grafico_centros = resumo_orcamento.head(12).iloc[::-1]
+        grafico_centros = grafico_centros.assign(**{
+            coluna: grafico_centros[coluna] / 100 for coluna in ['Orçado Anual', 'Realizado', 'Projeção Anual']
+        })
+        rotulos_centros = grafico_centros['Centro de Custo'].fillna("(não informado)")
+        fig_orcamento = go.Figure()
+        fig_orcamento.add_trace(go.Bar(y=rotulos_centros, x=grafico_centros['Orçado Anual'],
+                                       name='Orçado', orientation='h', marker_color='#9ecae1'))
+        fig_orcamento.add_trace(go.Bar(y=rotulos_centros, x=grafico_centros['Realizado'],
+                                       name='Realizado', orientation='h', marker_color='#1f77b4'))
+        fig_orcamento.add_trace(go.Scatter(y=rotulos_centros, x=grafico_centros['Projeção Anual'],
+                                           name='Projeção', mode='markers',
+                                           marker=dict(symbol='diamond', size=10, color='#d62728')))
+        fig_orcamento.update_layout(barmode='overlay', height=450, xaxis_title="Valor (R$)",
+                                    legend=dict(orientation="h", yanchor="bottom", y=1.02))
+        st.plotly_chart(fig_orcamento, use_container_width=True)
+
+    with col2:
+        por_mes = (execucao.groupby('Mes_Num')[['Orçado', 'Realizado']].sum().cumsum() / 100).reset_index()
+        por_mes['Mês'] = por_mes['Mes_Num'].map(MESES_NOMES)
+        por_mes.loc[por_mes['Mes_Num'] > decorridos, 'Realizado'] = None
+        fig_acumulado = go.Figure()
+        fig_acumulado.add_trace(go.Scatter(x=por_mes['Mês'], y=por_mes['Orçado'], name='Orçado acumulado',
+                                           mode='lines', line=dict(color='#9ecae1', width=3)))
+        fig_acumulado.add_trace(go.Scatter(x=por_mes['Mês'], y=por_mes['Realizado'], name='Realizado acumulado',
+                                           mode='lines+markers', line=dict(color='#1f77b4', width=3)))
+        fig_acumulado.update_layout(height=450, yaxis_title="Valor acumulado (R$)",
+                                    legend=dict(orientation="h", yanchor="bottom", y=1.02))
+        st.plotly_chart(fig_acumulado, use_container_width=True)
+
+    resumo_display = resumo_orcamento.copy()
+    resumo_display['Centro de Custo'] = resumo_display['Centro de Custo'].fillna("(não informado)")
+    for coluna in ['Orçado Anual', 'Orçado até o Mês', 'Realizado', 'Variação', 'Ritmo Mensal', 'Projeção Anual']:
+        resumo_display[coluna] = formatar_coluna(resumo_display[coluna])
+    for coluna in ['% Executado', '% Projetado']:
+        resumo_display[coluna] = resumo_orcamento[coluna].apply(lambda x: f"{x:.1f}%" if pd.notna(x) else "sem orçamento")
+    st.dataframe(resumo_display, use_container_width=True, hide_index=True)
+
+st.markdown("---")
+
+# Pagamentos recorrentes sobre a planilha inteira (sem os filtros): os
+# resumos vêm do cache pela versão dos dados, e numa versão nova só um mês
+# novo ou alterado é resumido de novo. Sem 'Data Lançamento' (coluna
+# opcional), a referência é o fim do último mês
+st.subheader("🔁 Pagamentos Recorrentes")
+
+series_recorrentes, calendario, pendentes = detectar(
+    resumir_ano(df, instantaneo_despesas.versao),
+    referencia=df['Data Lançamento'].max() if 'Data Lançamento' in df.columns else None
+)
+
+if series_recorrentes.empty:
+    st.info("ℹ️ Nenhum pagamento recorrente identificado (são necessários ao menos 3 meses com o mesmo pagamento).")
+else:
+    mensais = series_recorrentes[series_recorrentes['Período (meses)'] == 1]
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("🔁 Séries Recorrentes", len(series_recorrentes))
+    with col2:
+        st.metric("📅 Compromisso Mensal", formatar_centavos(int(mensais['Valor Típico'].sum())))
+    with col3:
+        st.metric("⚠️ Pendências", len(pendentes))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown(f"**Próximos compromissos** (até {HORIZONTE_MESES} meses)")
+        if calendario.empty:
+            st.caption("Nenhum compromisso previsto.")
+        else:
+            por_mes_previsto = calendario.groupby(calendario['Data Prevista'].dt.to_period('M'))['Valor Previsto'].sum()
+            fig_compromissos = px.bar(
+                x=[f"{MESES_NOMES[p.month]}/{p.year}" for p in por_mes_previsto.index],
+                y=por_mes_previsto.to_numpy() / 100,
+                labels={'x': 'Mês', 'y': 'Valor previsto (R$)'},
+                color_discrete_sequence=['#1f77b4']
+            )
+            fig_compromissos.update_layout(height=300)
+            st.plotly_chart(fig_compromissos, use_container_width=True)
+            calendario_display = calendario.copy()
+            calendario_display['Data Prevista'] = calendario_display['Data Prevista'].dt.strftime('%d/%m/%Y')
+            calendario_display['Valor Previsto'] = formatar_coluna(calendario_display['Valor Previsto'])
+            st.dataframe(calendario_display, use_container_width=True, hide_index=True, height=300)
+
+    with col2:
+        st.markdown("**Pagamentos em falta ou atrasados**")
+        if pendentes.empty:
+            st.caption("Nenhum pagamento recorrente em falta.")
+        else:
+            pendentes_display = pendentes.copy()
+            pendentes_display['Data Prevista'] = pendentes_display['Data Prevista'].dt.strftime('%d/%m/%Y')
+            pendentes_display['Valor Previsto'] = formatar_coluna(pendentes_display['Valor Previsto'])
+            st.dataframe(pendentes_display, use_container_width=True, hide_index=True, height=640)
+
+    with st.expander("📋 Todas as séries recorrentes"):
+        series_display = series_recorrentes.copy()
+        series_display['Valor Típico'] = formatar_coluna(series_display['Valor Típico'])
+        series_display['Último Pagamento'] = series_display['Último Pagamento'].map(
+            lambda p: f"{MESES_NOMES[p % 100]}/{p // 100}")
+        series_display['Próximo Vencimento'] = series_display['Próximo Vencimento'].dt.strftime('%d/%m/%Y')
+        st.dataframe(series_display, use_container_width=True, hide_index=True)
 
 st.markdown("---")
 
+# Drill-down servido pelo cubo: cada visão é uma consulta ao rollup
+# correspondente, sem refiltrar df_filtrado
+with painel_drill:
+    drill = st.session_state['drill']
+    if drill:
+        st.subheader("🔎 Drill-down")
+        st.caption("Clique em uma barra, fatia ou bloco dos gráficos para detalhar. Clique em um nível para removê-lo.")
+
+        col_niveis = st.columns(len(drill) + 1)
+        for i, (nivel, valor) in enumerate(list(drill.items())):
+            rotulo = MESES_NOMES.get(valor, valor) if nivel == 'Mes_Num' else valor
+            rotulo = "(não informado)" if pd.isna(rotulo) else rotulo
+            col_niveis[i].button(f"✖ {rotulo}", key=f"remover_drill_{nivel}",
+                                 on_click=remover_drill, args=(nivel,))
+        col_niveis[-1].button("Limpar drill-down", key="limpar_drill", on_click=limpar_drill)
+
+        resumo_drill = cubo.consultar(drill).iloc[0]
+        col_d1, col_d2, col_d3 = st.columns(3)
+        with col_d1:
+            st.metric("Total", formatar_centavos(resumo_drill['Total']))
+        with col_d2:
+            st.metric("Lançamentos", f"{int(resumo_drill['Quantidade']):,}".replace(",", "."))
+        with col_d3:
+            st.metric("Maior Valor", formatar_centavos(resumo_drill['Maior Valor']))
+
+        visoes = []
+        if 'Mes_Num' not in drill:
+            visoes.append(('Mes_Num', "Por Mês"))
+        if 'Centro de Custo' not in drill:
+            visoes.append(('Centro de Custo', "Por Centro de Custo"))
+        if 'Especificação' not in drill:
+            visoes.append(('Especificação', "Top 10 Especificações"))
+
+        if visoes:
+            col_visoes = st.columns(len(visoes))
+            for coluna, (nivel, titulo) in zip(col_visoes, visoes):
+                with coluna:
+                    st.markdown(f"**{titulo}**")
+                    visao = cubo.consultar(drill, (nivel,))
+                    visao['Total'] = visao['Total'] / 100
+                    if nivel == 'Mes_Num':
+                        visao = visao.sort_values('Mes_Num')
+                        visao['Rotulo'] = visao['Mes_Num'].map(MESES_NOMES)
+                    else:
+                        visao = visao.sort_values('Total', ascending=False).head(10)
+                        visao['Rotulo'] = visao[nivel].fillna("(não informado)").apply(
+                            lambda x: x[:30] + '...' if len(str(x)) > 30 else x)
+                    fig_drill = px.bar(
+                        visao,
+                        x='Rotulo' if nivel == 'Mes_Num' else 'Total',
+                        y='Total' if nivel == 'Mes_Num' else 'Rotulo',
+                        orientation='v' if nivel == 'Mes_Num' else 'h',
+                        labels={'Total': 'Valor (R$)', 'Rotulo': ''}
+                    )
+                    fig_drill.update_layout(
+                        height=350,
+                        yaxis={'categoryorder': 'total ascending'} if nivel != 'Mes_Num' else {}
+                    )
+                    st.plotly_chart(fig_drill, use_container_width=True, key=f"drill_{nivel}")
+
+        st.markdown("---")
+
 # Tabela de dados detalhada
 st.subheader("📑 Dados Detalhados de Despesas")
 
@@ -622,22 +1107,40 @@ st.subheader("📑 Dados Detalhados de Despesas")
 st.markdown("**Filtros da Tabela:**")
 col_filtro1, col_filtro2, col_filtro3 = st.columns(3)
 
+# Filtros da tabela também em cascata, sobre as linhas já filtradas na barra lateral
+especificacao_tabela = st.session_state.get('tabela_especificacao', 'Todas')
+centro_tabela = st.session_state.get('tabela_centro', 'Todos')
+contagens_tabela = indice.contar({
+    'Especificação': {'incluir': [] if especificacao_tabela == 'Todas' else [especificacao_tabela]},
+    'Centro de Custo': {'incluir': [] if centro_tabela == 'Todos' else [centro_tabela]}
+}, base=mascara_filtrado)
+
 with col_filtro1:
     # Filtro de Especificação
-    especificacoes = ['Todas'] + sorted(df_filtrado['Especificação'].dropna().unique().tolist())
+    contagem_tabela_especificacoes = contagens_tabela['Especificação']
+    especificacoes = ['Todas'] + opcoes_faceta(
+        contagem_tabela_especificacoes, [] if especificacao_tabela == 'Todas' else [especificacao_tabela]
+    )
     especificacao_tabela = st.selectbox(
         "Especificação",
         options=especificacoes,
-        index=0
+        format_func=rotulo_faceta(contagem_tabela_especificacoes),
+        index=0,
+        key="tabela_especificacao"
     )
 
 with col_filtro2:
     # Filtro de Centro de Custo para tabela
-    centros_tabela = ['Todos'] + sorted(df_filtrado['Centro de Custo'].dropna().unique().tolist())
+    contagem_tabela_centros = contagens_tabela['Centro de Custo']
+    centros_tabela = ['Todos'] + opcoes_faceta(
+        contagem_tabela_centros, [] if centro_tabela == 'Todos' else [centro_tabela]
+    )
     centro_tabela = st.selectbox(
         "Centro de Custo (Tabela)",
         options=centros_tabela,
-        index=0
+        format_func=rotulo_faceta(contagem_tabela_centros),
+        index=0,
+        key="tabela_centro"
     )
 
 with col_filtro3:
@@ -665,7 +1168,7 @@ with col_filtro5:
 
 # Preparar dados para exibição
 colunas_exibir = ['Mês Ano Ref.', 'Especificação', 'Centro de Custo', 'Valor', 'Observação']
-df_exibir = df_filtrado[colunas_exibir].copy()
+df_exibir = df_filtrado[colunas_exibir + ['Centavos']].copy()
 
 # Aplicar filtro de especificação
 if especificacao_tabela != 'Todas':
@@ -704,8 +1207,8 @@ if limite_registros != 'Todos':
 st.caption(f"Exibindo {len(df_exibir)} de {len(df_filtrado)} registros filtrados")
 
 # Formatar valores para exibição
-df_exibir_formatado = df_exibir.copy()
-df_exibir_formatado['Valor'] = df_exibir_formatado['Valor'].apply(formatar_real)
+df_exibir_formatado = df_exibir.drop(columns='Centavos')
+df_exibir_formatado['Valor'] = formatar_coluna(df_exibir['Centavos'])
 
 st.dataframe(
     df_exibir_formatado,
@@ -718,16 +1221,16 @@ st.dataframe(
 if len(df_exibir) > 0:
     col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
     with col_stat1:
-        st.metric("Total da Seleção", formatar_real(df_exibir['Valor'].sum()))
+        st.metric("Total da Seleção", formatar_centavos(df_exibir['Centavos'].sum()))
     with col_stat2:
-        st.metric("Média da Seleção", formatar_real(df_exibir['Valor'].mean()))
+        st.metric("Média da Seleção", formatar_centavos(media_centavos(df_exibir['Centavos'])))
     with col_stat3:
-        st.metric("Maior Valor", formatar_real(df_exibir['Valor'].max()))
+        st.metric("Maior Valor", formatar_centavos(df_exibir['Centavos'].max()))
     with col_stat4:
-        st.metric("Menor Valor", formatar_real(df_exibir['Valor'].min()))
+        st.metric("Menor Valor", formatar_centavos(df_exibir['Centavos'].min()))
 
-# Botões de download
-col_down1, col_down2 = st.columns(2)
+# Botões de download (o Excel só é gerado quando o botão é clicado)
+col_down1, col_down2, col_down3 = st.columns(3)
 with col_down1:
     st.download_button(
         label="📥 Baixar seleção atual (CSV)",
@@ -742,6 +1245,14 @@ with col_down2:
         file_name=f"despesas_filtradas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
         mime="text/csv"
     )
+with col_down3:
+    st.download_button(
+        label="📊 Baixar todos filtrados (Excel)",
+        data=lambda: exportar_xlsx(df_filtrado, 'Despesas'),
+        file_name=f"despesas_filtradas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+        mime=MIME_XLSX,
+        on_click="ignore"
+    )
 
 st.markdown("---")
 
@@ -801,7 +1312,7 @@ if mostrar_receitas or mostrar_comparativo:
         )
 
     # Preparar dados para exibição
-    df_receitas_exibir = df_receitas_filtrado[['Nome_Mes', 'Categoria', 'Valor']].copy()
+    df_receitas_exibir = df_receitas_filtrado[['Nome_Mes', 'Categoria', 'Valor', 'Centavos']].copy()
     df_receitas_exibir = df_receitas_exibir.merge(
         df_receitas_filtrado[['Nome_Mes', 'Mes_Num']].drop_duplicates(),
         on='Nome_Mes'
@@ -843,7 +1354,7 @@ if mostrar_receitas or mostrar_comparativo:
 
     # Formatar valores para exibição
     df_receitas_formatado = df_receitas_exibir_final.copy()
-    df_receitas_formatado['Valor'] = df_receitas_formatado['Valor'].apply(formatar_real)
+    df_receitas_formatado['Valor'] = formatar_coluna(df_receitas_exibir['Centavos'])
 
     st.dataframe(
         df_receitas_formatado,
@@ -856,13 +1367,13 @@ if mostrar_receitas or mostrar_comparativo:
     if len(df_receitas_exibir) > 0:
         col_stat_rec1, col_stat_rec2, col_stat_rec3, col_stat_rec4 = st.columns(4)
         with col_stat_rec1:
-            st.metric("Total da Seleção", formatar_real(df_receitas_exibir['Valor'].sum()))
+            st.metric("Total da Seleção", formatar_centavos(df_receitas_exibir['Centavos'].sum()))
         with col_stat_rec2:
-            st.metric("Média da Seleção", formatar_real(df_receitas_exibir['Valor'].mean()))
+            st.metric("Média da Seleção", formatar_centavos(media_centavos(df_receitas_exibir['Centavos'])))
         with col_stat_rec3:
-            st.metric("Maior Valor", formatar_real(df_receitas_exibir['Valor'].max()))
+            st.metric("Maior Valor", formatar_centavos(df_receitas_exibir['Centavos'].max()))
         with col_stat_rec4:
-            st.metric("Menor Valor", formatar_real(df_receitas_exibir['Valor'].min()))
+            st.metric("Menor Valor", formatar_centavos(df_receitas_exibir['Centavos'].min()))
 
     # Botões de download de receitas
     col_down_rec1, col_down_rec2 = st.columns(2)
@@ -886,6 +1397,41 @@ else:
     st.subheader("💰 Dados Detalhados de Receitas")
     st.info("📌 Tabela de receitas não disponível - filtro de inclusão de Centro de Custo ativo.")
 
+# Painel estático para quem só consulta: um HTML com os dados agregados, em
+# que filtros e gráficos rodam no navegador (gerado uma vez por versão)
+@cache.memoizar('exportacoes')
+def painel_html(versao):
+    return html_anual(df, df_receitas).encode('utf-8')
+
+st.sidebar.markdown("---")
+st.sidebar.download_button(
+    label="🌐 Baixar painel estático (HTML)",
+    data=lambda: painel_html(versao_dados),
+    file_name=f"painel_anual_{datetime.now().strftime('%Y%m%d')}.html",
+    mime=MIME_HTML,
+    on_click="ignore",
+    help="Arquivo único, que abre no navegador sem o servidor, com filtros e gráficos"
+)
+
+# Métricas do cache compartilhado (memória limitada por IPB_CACHE_MB)
+with st.sidebar.expander("🧠 Cache do servidor"):
+    metricas_cache = cache.metricas()
+    st.caption(
+        f"{metricas_cache['bytes'] / 1024**2:.1f} MB de {metricas_cache['orcamento_bytes'] / 1024**2:.0f} MB "
+        f"· {metricas_cache['itens']} itens"
+    )
+    st.caption(
+        f"Taxa de acerto: {metricas_cache['taxa_acerto'] * 100:.1f}% · Despejos: {metricas_cache['despejos']} "
+        f"· Recusados: {metricas_cache['rejeitados']}"
+    )
+    metricas_categorias = pd.DataFrame(metricas_cache['categorias']).T
+    metricas_categorias['MB'] = (metricas_categorias['bytes'] / 1024**2).round(2)
+    metricas_categorias['Acerto (%)'] = (metricas_categorias['taxa_acerto'] * 100).round(1)
+    st.dataframe(
+        metricas_categorias[['itens', 'MB', 'Acerto (%)', 'despejos', 'rejeitados']],
+        use_container_width=True
+    )
+
 # Footer
 st.markdown("---")
 st.markdown(
@@ -3,98 +3,140 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
-from pathlib import Path
-
-# Diretório base do projeto
-BASE_DIR = Path(__file__).parent
-MENSAL_DIR = BASE_DIR / "mensal"
-
-# Configuração da página
-st.set_page_config(
-    page_title="Dashboard Mensal - IPB",
-    page_icon="📅",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+from functools import partial
+
+from anomalias import JANELA_DUPLICATA_DIAS, LIMIAR_Z, MIN_HISTORICO, pontuar_meses, sinalizados
+from cache_limitado import cache
+from dados import (FONTE, SALDOS_FILES, carregar_entradas, carregar_saidas, iniciar_monitor,
+                   listar_meses_mensais, obter_mensal, obter_saldos_iniciais, pre_carregar_meses,
+                   versao_conjunto_mensal, versao_mensal)
+from dinheiro import formatar_centavos, formatar_coluna, media_centavos, percentual, somar_em_reais
+from exportacao_excel import MIME_XLSX, exportar_xlsx
+from exportacao_html import MIME_HTML, html_mensal
+from extrato import CHAVES_EXTRATO, extrato
+from mapa_calor import (DIAS_SEMANA, binar_dias, dias_com_lancamento, grade_meses, grade_semanas, juntar_dias,
+                        rotulo_mes)
+from facetas import opcoes_faceta
+from fontes import PARTICAO_MENSAL
+from interface import configurar_pagina, rotulo_faceta
+
+# Configuração da página (e CSS compartilhado)
+configurar_pagina("Dashboard Mensal - IPB", "📅")
+
+# Clique em um gráfico aplica o filtro correspondente da tabela (servido pelo
+# índice de facetas). A seleção do plotly persiste entre execuções, então só
+# um clique novo altera o filtro.
+def aplicar_clique_tabela(evento, chave_filtro, extrair):
+    pontos = evento.selection.points if evento is not None else []
+    assinatura = repr(pontos)
+    if st.session_state.get(f"ultimo_clique_{chave_filtro}") == assinatura:
+        return
+    st.session_state[f"ultimo_clique_{chave_filtro}"] = assinatura
+    if pontos:
+        st.session_state[chave_filtro] = extrair(pontos[0])
+
+# Monitorar as planilhas e recarregar a página quando os dados forem trocados
+iniciar_monitor()
+
+@st.fragment(run_every="10s")
+def verificar_atualizacao(mes):
+    versao = versao_mensal(mes)
+    if st.session_state.get('versao_dados_mensal') != versao:
+        st.session_state['versao_dados_mensal'] = versao
+        st.rerun()
+
+# Dados do mês por tipo ('entradas' ou 'saidas')
+def dados_mes(tipo, mes):
+    df, _ = carregar_entradas(mes) if tipo == 'entradas' else carregar_saidas(mes)
+    return df
+
+# Entradas e saídas de um mês (lidas só quando o extrato não está no cache)
+def movimento_mes(mes):
+    return dados_mes('entradas', mes), dados_mes('saidas', mes)
+
+# Figuras e arquivos que dependem só do mês ficam no cache compartilhado,
+# chaveados pela versão dos dados (uma troca de arquivo gera chaves novas)
+@cache.memoizar('figuras')
+def figura_por_centro(tipo, mes, versao, cores):
+    df = dados_mes(tipo, mes)
+    por_centro = somar_em_reais(df, 'Centro de Custo').reset_index()
+    por_centro = por_centro.sort_values('Valor', ascending=False)
+
+    fig = px.pie(
+        por_centro,
+        values='Valor',
+        names='Centro de Custo',
+        hole=0.4,
+        color_discrete_sequence=cores
+    )
+    fig.update_layout(height=400)
+    fig.update_traces(
+        textposition='inside',
+        textinfo='percent',
+        hovertemplate="<b>%{label}</b><br>Valor: R$ %{value:,.2f}<br>Percentual: %{percent}<extra></extra>"
+    )
+    return fig
+
+# Totais diários do mês (vetor indexado pelo código do dia, ver
+# mapa_calor.py), base da evolução diária e do calendário
+@cache.memoizar('agregados')
+def dias_binados(tipo, mes, versao):
+    return binar_dias(dados_mes(tipo, mes))
+
+@cache.memoizar('figuras')
+def figura_por_dia(tipo, mes, versao, escala):
+    datas, centavos, _ = dias_com_lancamento(dias_binados(tipo, mes, versao))
+    por_dia = pd.DataFrame({'Data': pd.to_datetime(datas), 'Valor': centavos / 100})
+
+    fig = px.bar(
+        por_dia,
+        x='Data',
+        y='Valor',
+        color='Valor',
+        color_continuous_scale=escala,
+        labels={'Valor': 'Valor (R$)', 'Data': 'Data'}
+    )
+    fig.update_layout(
+        showlegend=False,
+        coloraxis_showscale=False,
+        height=400
+    )
+    fig.update_traces(
+        hovertemplate="<b>%{x}</b><br>Valor: R$ %{y:,.2f}<extra></extra>"
+    )
+    return fig
 
-# CSS customizado
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: #1E3A5F;
-        text-align: center;
-        margin-bottom: 1rem;
-    }
-    .section-header {
-        font-size: 1.8rem;
-        font-weight: 600;
-        color: #2c3e50;
-        margin-top: 2rem;
-        margin-bottom: 1rem;
-        padding: 0.5rem;
-        background: linear-gradient(90deg, #f0f0f0 0%, #ffffff 100%);
-        border-left: 5px solid #3498db;
-    }
-    .metric-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 1rem;
-        border-radius: 10px;
-        color: white;
-    }
-    .stMetric {
-        background-color: #f8f9fa;
-        padding: 1rem;
-        border-radius: 10px;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-    div[data-testid="stMetricValue"] {
-        font-size: 1.8rem;
-        font-weight: 700;
-    }
-    .entrada-card {
-        background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%);
-        padding: 1rem;
-        border-radius: 10px;
-        color: white;
-    }
-    .saida-card {
-        background: linear-gradient(135deg, #eb3349 0%, #f45c43 100%);
-        padding: 1rem;
-        border-radius: 10px;
-        color: white;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# Função para formatar valores em Real
-def formatar_real(valor):
-    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-# Função para carregar dados de entradas
-@st.cache_data
-def carregar_entradas(mes):
-    arquivo = MENSAL_DIR / f"{mes}-entradas.xlsx"
-    if arquivo.exists():
-        df = pd.read_excel(arquivo)
-        # Converter data para datetime se necessário
-        if 'Data Lançamento' in df.columns:
-            df['Data Lançamento'] = pd.to_datetime(df['Data Lançamento'])
-        return df
-    return pd.DataFrame()
-
-# Função para carregar dados de saídas
-@st.cache_data
-def carregar_saidas(mes):
-    arquivo = MENSAL_DIR / f"{mes}-saidas.xlsx"
-    if arquivo.exists():
-        df = pd.read_excel(arquivo)
-        # Converter data para datetime se necessário
-        if 'Data Lançamento' in df.columns:
-            df['Data Lançamento'] = pd.to_datetime(df['Data Lançamento'])
-        return df
-    return pd.DataFrame()
+# Mapa de calor de uma grade do calendário (valor em reais ou quantidade)
+def figura_calendario(centavos, quantidade, x, y, titulo_x, titulo_y, medida, escala):
+    if medida == 'Valor':
+        valores = centavos / 100
+        dica = "Valor: R$ %{z:,.2f}<br>Lançamentos: %{customdata}"
+    else:
+        valores = quantidade
+        dica = "Lançamentos: %{z}"
+    fig = go.Figure(go.Heatmap(
+        z=valores,
+        x=x,
+        y=y,
+        customdata=quantidade,
+        colorscale=escala,
+        xgap=2,
+        ygap=2,
+        hovertemplate=f"{titulo_x} %{{x}} · {titulo_y} %{{y}}<br>{dica}<extra></extra>"
+    ))
+    fig.update_layout(height=400, xaxis_title=titulo_x, yaxis_title=titulo_y, yaxis_autorange='reversed')
+    fig.update_xaxes(type='category')
+    fig.update_yaxes(type='category')
+    return fig
+
+@cache.memoizar('exportacoes')
+def csv_completo(tipo, mes, versao):
+    return dados_mes(tipo, mes).to_csv(index=False).encode('utf-8')
+
+# Painel estático do mês (HTML com filtros e gráficos no navegador)
+@cache.memoizar('exportacoes')
+def painel_html(mes, rotulo, versao):
+    return html_mensal(rotulo, dados_mes('entradas', mes), dados_mes('saidas', mes)).encode('utf-8')
 
 # Header
 st.markdown('<h1 class="main-header">📅 Dashboard Mensal - IPB 2025</h1>', unsafe_allow_html=True)
@@ -104,11 +146,7 @@ st.markdown("---")
 st.sidebar.header("📆 Seleção de Período")
 
 # Listar meses disponíveis
-meses_disponiveis = []
-if MENSAL_DIR.exists():
-    for arquivo in MENSAL_DIR.glob("*-entradas.xlsx"):
-        mes = arquivo.stem.replace("-entradas", "")
-        meses_disponiveis.append(mes)
+meses_disponiveis = listar_meses_mensais()
 
 if not meses_disponiveis:
     st.error("⚠️ Nenhum arquivo mensal encontrado na pasta 'mensal/'")
@@ -121,7 +159,7 @@ meses_pt = {
     'set': 'Setembro', 'out': 'Outubro', 'nov': 'Novembro', 'dez': 'Dezembro'
 }
 
-mes_opcoes = {meses_pt.get(m, m.upper()): m for m in sorted(meses_disponiveis)}
+mes_opcoes = {meses_pt.get(m, m.upper()): m for m in meses_disponiveis}
 mes_selecionado_label = st.sidebar.selectbox(
     "Mês",
     options=list(mes_opcoes.keys()),
@@ -133,8 +171,29 @@ st.sidebar.markdown("---")
 st.sidebar.info(f"📊 Visualizando dados de **{mes_selecionado_label}/2025**")
 
 # Carregar dados
-df_entradas = carregar_entradas(mes_selecionado)
-df_saidas = carregar_saidas(mes_selecionado)
+instantaneo_entradas = obter_mensal('entradas', mes_selecionado)
+instantaneo_saidas = obter_mensal('saidas', mes_selecionado)
+df_entradas, quarentena_entradas = instantaneo_entradas.dados
+df_saidas, quarentena_saidas = instantaneo_saidas.dados
+indice_entradas = instantaneo_entradas.derivados['indice']
+indice_saidas = instantaneo_saidas.derivados['indice']
+instantaneo_saldos = obter_saldos_iniciais()
+saldos_iniciais, quarentena_saldos = instantaneo_saldos.dados
+versao_dados = (instantaneo_entradas.versao, instantaneo_saidas.versao, instantaneo_saldos.versao)
+st.session_state['versao_dados_mensal'] = versao_dados
+verificar_atualizacao(mes_selecionado)
+
+# Relatório de quarentena (linhas inválidas descartadas na validação)
+total_quarentena = len(quarentena_entradas) + len(quarentena_saidas)
+if total_quarentena > 0:
+    st.warning(f"⚠️ {total_quarentena} linha(s) inválida(s) foram separadas na validação e não entram nos totais.")
+    with st.expander("🧪 Relatório de quarentena"):
+        if len(quarentena_entradas) > 0:
+            st.markdown(f"**Entradas** ({FONTE.descrever('entradas', {PARTICAO_MENSAL: [mes_selecionado]})})")
+            st.dataframe(quarentena_entradas, use_container_width=True, hide_index=True)
+        if len(quarentena_saidas) > 0:
+            st.markdown(f"**Saídas** ({FONTE.descrever('saidas', {PARTICAO_MENSAL: [mes_selecionado]})})")
+            st.dataframe(quarentena_saidas, use_container_width=True, hide_index=True)
 
 # ============================================================================
 # SEÇÃO 1: ENTRADAS (RECEITAS)
@@ -148,15 +207,15 @@ else:
     # KPIs de Entradas
     col1, col2, col3, col4 = st.columns(4)
 
-    total_entradas = df_entradas['Valor'].sum()
+    total_entradas = int(df_entradas['Centavos'].sum())
     qtd_entradas = len(df_entradas)
-    media_entrada = df_entradas['Valor'].mean()
-    maior_entrada = df_entradas['Valor'].max()
+    media_entrada = media_centavos(df_entradas['Centavos'])
+    maior_entrada = df_entradas['Centavos'].max()
 
     with col1:
         st.metric(
             label="💵 Total de Entradas",
-            value=formatar_real(total_entradas)
+            value=formatar_centavos(total_entradas)
         )
 
     with col2:
@@ -168,13 +227,13 @@ else:
     with col3:
         st.metric(
             label="📈 Média por Lançamento",
-            value=formatar_real(media_entrada)
+            value=formatar_centavos(media_entrada)
         )
 
     with col4:
         st.metric(
             label="🔝 Maior Entrada",
-            value=formatar_real(maior_entrada)
+            value=formatar_centavos(maior_entrada)
         )
 
     st.markdown("---")
@@ -186,47 +245,16 @@ else:
         st.subheader("📊 Entradas por Centro de Custo")
 
         if 'Centro de Custo' in df_entradas.columns:
-            entradas_por_centro = df_entradas.groupby('Centro de Custo')['Valor'].sum().reset_index()
-            entradas_por_centro = entradas_por_centro.sort_values('Valor', ascending=False)
-
-            fig_entrada_centro = px.pie(
-                entradas_por_centro,
-                values='Valor',
-                names='Centro de Custo',
-                hole=0.4,
-                color_discrete_sequence=px.colors.sequential.Greens_r
-            )
-            fig_entrada_centro.update_layout(height=400)
-            fig_entrada_centro.update_traces(
-                textposition='inside',
-                textinfo='percent',
-                hovertemplate="<b>%{label}</b><br>Valor: R$ %{value:,.2f}<br>Percentual: %{percent}<extra></extra>"
-            )
-            st.plotly_chart(fig_entrada_centro, use_container_width=True)
+            fig_entrada_centro = figura_por_centro('entradas', mes_selecionado, versao_dados, tuple(px.colors.sequential.Greens_r))
+            evento = st.plotly_chart(fig_entrada_centro, use_container_width=True, on_select="rerun",
+                                     selection_mode="points", key="grafico_centro_entrada")
+            aplicar_clique_tabela(evento, "centro_entrada", lambda ponto: ponto['label'])
 
     with col_g2:
         st.subheader("📅 Evolução Diária de Entradas")
 
         if 'Data Lançamento' in df_entradas.columns:
-            entradas_por_dia = df_entradas.groupby(df_entradas['Data Lançamento'].dt.date)['Valor'].sum().reset_index()
-            entradas_por_dia.columns = ['Data', 'Valor']
-
-            fig_entrada_dia = px.bar(
-                entradas_por_dia,
-                x='Data',
-                y='Valor',
-                color='Valor',
-                color_continuous_scale='Greens',
-                labels={'Valor': 'Valor (R$)', 'Data': 'Data'}
-            )
-            fig_entrada_dia.update_layout(
-                showlegend=False,
-                coloraxis_showscale=False,
-                height=400
-            )
-            fig_entrada_dia.update_traces(
-                hovertemplate="<b>%{x}</b><br>Valor: R$ %{y:,.2f}<extra></extra>"
-            )
+            fig_entrada_dia = figura_por_dia('entradas', mes_selecionado, versao_dados, 'Greens')
             st.plotly_chart(fig_entrada_dia, use_container_width=True)
 
     st.markdown("---")
@@ -237,22 +265,38 @@ else:
     # Filtros para Entradas
     col_f1, col_f2, col_f3 = st.columns(3)
 
+    # Centro de Custo e Especificação em cascata: cada lista mostra só as opções
+    # compatíveis com a outra, com quantidade e total
+    centro_filtro_entrada = st.session_state.get('centro_entrada', 'Todos')
+    spec_filtro_entrada = st.session_state.get('spec_entrada', 'Todas')
+    filtros_entrada = {
+        'Centro de Custo': {'incluir': [] if centro_filtro_entrada == 'Todos' else [centro_filtro_entrada]},
+        'Especificação': {'incluir': [] if spec_filtro_entrada == 'Todas' else [spec_filtro_entrada]}
+    }
+    contagens_entrada = indice_entradas.contar(filtros_entrada)
+
     with col_f1:
         if 'Centro de Custo' in df_entradas.columns:
-            centros_entrada = ['Todos'] + sorted(df_entradas['Centro de Custo'].dropna().unique().tolist())
+            centros_entrada = ['Todos'] + opcoes_faceta(
+                contagens_entrada['Centro de Custo'], filtros_entrada['Centro de Custo']['incluir']
+            )
             centro_filtro_entrada = st.selectbox(
                 "Centro de Custo (Entradas)",
                 options=centros_entrada,
+                format_func=rotulo_faceta(contagens_entrada['Centro de Custo']),
                 index=0,
                 key="centro_entrada"
             )
 
     with col_f2:
         if 'Especificação' in df_entradas.columns:
-            specs_entrada = ['Todas'] + sorted(df_entradas['Especificação'].dropna().unique().tolist())
+            specs_entrada = ['Todas'] + opcoes_faceta(
+                contagens_entrada['Especificação'], filtros_entrada['Especificação']['incluir']
+            )
             spec_filtro_entrada = st.selectbox(
                 "Especificação (Entradas)",
                 options=specs_entrada,
+                format_func=rotulo_faceta(contagens_entrada['Especificação']),
                 index=0,
                 key="spec_entrada"
             )
@@ -280,16 +324,12 @@ else:
         )
 
     # Aplicar filtros
-    df_entradas_filtrado = df_entradas.copy()
-
-    if 'Centro de Custo' in df_entradas.columns and centro_filtro_entrada != 'Todos':
-        df_entradas_filtrado = df_entradas_filtrado[df_entradas_filtrado['Centro de Custo'] == centro_filtro_entrada]
-
-    if 'Especificação' in df_entradas.columns and spec_filtro_entrada != 'Todas':
-        df_entradas_filtrado = df_entradas_filtrado[df_entradas_filtrado['Especificação'] == spec_filtro_entrada]
+    filtros_entrada['Centro de Custo']['incluir'] = [] if centro_filtro_entrada == 'Todos' else [centro_filtro_entrada]
+    filtros_entrada['Especificação']['incluir'] = [] if spec_filtro_entrada == 'Todas' else [spec_filtro_entrada]
+    df_entradas_filtrado = df_entradas[indice_entradas.filtrar(filtros_entrada)]
 
     if busca_entrada:
-        mask = pd.Series([False] * len(df_entradas_filtrado))
+        mask = pd.Series(False, index=df_entradas_filtrado.index)
         for col in ['Especificação', 'Observação', 'Centro de Custo', 'Pessoa']:
             if col in df_entradas_filtrado.columns:
                 mask = mask | df_entradas_filtrado[col].astype(str).str.contains(busca_entrada, case=False, na=False)
@@ -320,7 +360,7 @@ else:
 
     # Formatar valor e data
     if 'Valor' in df_entrada_display.columns:
-        df_entrada_display['Valor'] = df_entrada_display['Valor'].apply(formatar_real)
+        df_entrada_display['Valor'] = formatar_coluna(df_entradas_filtrado['Centavos'])
     if 'Data Lançamento' in df_entrada_display.columns:
         df_entrada_display['Data Lançamento'] = df_entrada_display['Data Lançamento'].dt.strftime('%d/%m/%Y')
 
@@ -337,16 +377,16 @@ else:
     if len(df_entradas_filtrado) > 0:
         col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
         with col_stat1:
-            st.metric("Total da Seleção", formatar_real(df_entradas_filtrado['Valor'].sum()))
+            st.metric("Total da Seleção", formatar_centavos(df_entradas_filtrado['Centavos'].sum()))
         with col_stat2:
-            st.metric("Média da Seleção", formatar_real(df_entradas_filtrado['Valor'].mean()))
+            st.metric("Média da Seleção", formatar_centavos(media_centavos(df_entradas_filtrado['Centavos'])))
         with col_stat3:
-            st.metric("Maior Valor", formatar_real(df_entradas_filtrado['Valor'].max()))
+            st.metric("Maior Valor", formatar_centavos(df_entradas_filtrado['Centavos'].max()))
         with col_stat4:
-            st.metric("Menor Valor", formatar_real(df_entradas_filtrado['Valor'].min()))
+            st.metric("Menor Valor", formatar_centavos(df_entradas_filtrado['Centavos'].min()))
 
-    # Download
-    col_down1, col_down2 = st.columns(2)
+    # Download (o Excel só é gerado quando o botão é clicado)
+    col_down1, col_down2, col_down3 = st.columns(3)
     with col_down1:
         st.download_button(
             label="📥 Baixar seleção atual (CSV)",
@@ -358,11 +398,20 @@ else:
     with col_down2:
         st.download_button(
             label="📥 Baixar todas entradas (CSV)",
-            data=df_entradas.to_csv(index=False).encode('utf-8'),
+            data=csv_completo('entradas', mes_selecionado, versao_dados),
             file_name=f"entradas_{mes_selecionado}_completo_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
             mime="text/csv",
             key="download_entrada_todas"
         )
+    with col_down3:
+        st.download_button(
+            label="📊 Baixar seleção atual (Excel)",
+            data=lambda: exportar_xlsx(df_entradas_filtrado, 'Entradas'),
+            file_name=f"entradas_{mes_selecionado}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+            mime=MIME_XLSX,
+            on_click="ignore",
+            key="download_entrada_excel"
+        )
 
 st.markdown("---")
 st.markdown("---")
@@ -379,15 +428,15 @@ else:
     # KPIs de Saídas
     col1, col2, col3, col4 = st.columns(4)
 
-    total_saidas = df_saidas['Valor'].sum()
+    total_saidas = int(df_saidas['Centavos'].sum())
     qtd_saidas = len(df_saidas)
-    media_saida = df_saidas['Valor'].mean()
-    maior_saida = df_saidas['Valor'].max()
+    media_saida = media_centavos(df_saidas['Centavos'])
+    maior_saida = df_saidas['Centavos'].max()
 
     with col1:
         st.metric(
             label="💸 Total de Saídas",
-            value=formatar_real(total_saidas)
+            value=formatar_centavos(total_saidas)
         )
 
     with col2:
@@ -399,13 +448,13 @@ else:
     with col3:
         st.metric(
             label="📈 Média por Lançamento",
-            value=formatar_real(media_saida)
+            value=formatar_centavos(media_saida)
         )
 
     with col4:
         st.metric(
             label="🔝 Maior Saída",
-            value=formatar_real(maior_saida)
+            value=formatar_centavos(maior_saida)
         )
 
     # KPI de Saldo
@@ -414,13 +463,13 @@ else:
         col_saldo1, col_saldo2, col_saldo3 = st.columns(3)
 
         saldo = total_entradas - total_saidas
-        percentual_gasto = (total_saidas / total_entradas * 100) if total_entradas > 0 else 0
+        percentual_gasto = percentual(total_saidas, total_entradas) if total_entradas > 0 else 0
 
         with col_saldo1:
             st.metric(
                 label="📊 Saldo do Mês",
-                value=formatar_real(saldo),
-                delta=f"{saldo/total_entradas*100:.1f}% das entradas" if total_entradas > 0 else "N/A"
+                value=formatar_centavos(saldo),
+                delta=f"{percentual(saldo, total_entradas):.1f}% das entradas" if total_entradas > 0 else "N/A"
             )
 
         with col_saldo2:
@@ -445,47 +494,16 @@ else:
         st.subheader("📊 Saídas por Centro de Custo")
 
         if 'Centro de Custo' in df_saidas.columns:
-            saidas_por_centro = df_saidas.groupby('Centro de Custo')['Valor'].sum().reset_index()
-            saidas_por_centro = saidas_por_centro.sort_values('Valor', ascending=False)
-
-            fig_saida_centro = px.pie(
-                saidas_por_centro,
-                values='Valor',
-                names='Centro de Custo',
-                hole=0.4,
-                color_discrete_sequence=px.colors.sequential.Reds_r
-            )
-            fig_saida_centro.update_layout(height=400)
-            fig_saida_centro.update_traces(
-                textposition='inside',
-                textinfo='percent',
-                hovertemplate="<b>%{label}</b><br>Valor: R$ %{value:,.2f}<br>Percentual: %{percent}<extra></extra>"
-            )
-            st.plotly_chart(fig_saida_centro, use_container_width=True)
+            fig_saida_centro = figura_por_centro('saidas', mes_selecionado, versao_dados, tuple(px.colors.sequential.Reds_r))
+            evento = st.plotly_chart(fig_saida_centro, use_container_width=True, on_select="rerun",
+                                     selection_mode="points", key="grafico_centro_saida")
+            aplicar_clique_tabela(evento, "centro_saida", lambda ponto: ponto['label'])
 
     with col_g2:
         st.subheader("📅 Evolução Diária de Saídas")
 
         if 'Data Lançamento' in df_saidas.columns:
-            saidas_por_dia = df_saidas.groupby(df_saidas['Data Lançamento'].dt.date)['Valor'].sum().reset_index()
-            saidas_por_dia.columns = ['Data', 'Valor']
-
-            fig_saida_dia = px.bar(
-                saidas_por_dia,
-                x='Data',
-                y='Valor',
-                color='Valor',
-                color_continuous_scale='Reds',
-                labels={'Valor': 'Valor (R$)', 'Data': 'Data'}
-            )
-            fig_saida_dia.update_layout(
-                showlegend=False,
-                coloraxis_showscale=False,
-                height=400
-            )
-            fig_saida_dia.update_traces(
-                hovertemplate="<b>%{x}</b><br>Valor: R$ %{y:,.2f}<extra></extra>"
-            )
+            fig_saida_dia = figura_por_dia('saidas', mes_selecionado, versao_dados, 'Reds')
             st.plotly_chart(fig_saida_dia, use_container_width=True)
 
     st.markdown("---")
@@ -499,9 +517,9 @@ else:
         fig_comparativo.add_trace(go.Bar(
             name='Entradas',
             x=['Total'],
-            y=[total_entradas],
+            y=[total_entradas / 100],
             marker_color='#2ecc71',
-            text=[formatar_real(total_entradas)],
+            text=[formatar_centavos(total_entradas)],
             textposition='auto',
             hovertemplate="<b>Entradas</b><br>R$ %{y:,.2f}<extra></extra>"
         ))
@@ -509,9 +527,9 @@ else:
         fig_comparativo.add_trace(go.Bar(
             name='Saídas',
             x=['Total'],
-            y=[total_saidas],
+            y=[total_saidas / 100],
             marker_color='#e74c3c',
-            text=[formatar_real(total_saidas)],
+            text=[formatar_centavos(total_saidas)],
             textposition='auto',
             hovertemplate="<b>Saídas</b><br>R$ %{y:,.2f}<extra></extra>"
         ))
@@ -519,10 +537,10 @@ else:
         fig_comparativo.add_trace(go.Scatter(
             name='Saldo',
             x=['Total'],
-            y=[saldo],
+            y=[saldo / 100],
             mode='markers+text',
             marker=dict(color='#3498db', size=20),
-            text=[formatar_real(saldo)],
+            text=[formatar_centavos(saldo)],
             textposition='top center',
             hovertemplate="<b>Saldo</b><br>R$ %{y:,.2f}<extra></extra>"
         ))
@@ -553,6 +571,7 @@ else:
             orientation='h',
             color='Valor',
             color_continuous_scale='Reds',
+            custom_data=['Especificação'],
             labels={'Valor': 'Valor (R$)', 'Especificação_Curta': 'Especificação'}
         )
         fig_top_saidas.update_layout(
@@ -564,7 +583,54 @@ else:
         fig_top_saidas.update_traces(
             hovertemplate="<b>%{y}</b><br>Valor: R$ %{x:,.2f}<extra></extra>"
         )
-        st.plotly_chart(fig_top_saidas, use_container_width=True)
+        evento = st.plotly_chart(fig_top_saidas, use_container_width=True, on_select="rerun",
+                                 selection_mode="points", key="grafico_top_saidas")
+        aplicar_clique_tabela(evento, "spec_saida", lambda ponto: ponto['customdata'][0])
+
+    st.markdown("---")
+
+    # Lançamentos fora do padrão ou possivelmente duplicados. O histórico são
+    # os meses até o selecionado; meses já pontuados vêm do cache
+    st.subheader("🚨 Lançamentos Sinalizados")
+
+    meses_historico = meses_disponiveis[:meses_disponiveis.index(mes_selecionado) + 1]
+    pontuados_saidas = pontuar_meses([(mes, versao_conjunto_mensal('saidas', mes), partial(dados_mes, 'saidas', mes))
+                                      for mes in meses_historico])
+    sinalizados_mes = sinalizados(pontuados_saidas[pontuados_saidas['Mês'] == mes_selecionado])
+
+    if sinalizados_mes.empty:
+        st.success("✅ Nenhum lançamento fora do padrão ou duplicado neste mês")
+    else:
+        col_a1, col_a2 = st.columns(2)
+        with col_a1:
+            st.metric("Fora do padrão", f"{int(sinalizados_mes['Fora do Padrão'].sum())}")
+        with col_a2:
+            st.metric("Possíveis duplicatas", f"{int(sinalizados_mes['Duplicata'].sum())}")
+
+        motivo = pd.Series('', index=sinalizados_mes.index)
+        motivo = motivo.mask(sinalizados_mes['Fora do Padrão'], 'Fora do padrão')
+        repetido = 'Repetido após ' + sinalizados_mes['Dias da Anterior'].astype('string') + ' dia(s)'
+        motivo = motivo.mask(sinalizados_mes['Duplicata'] & (motivo != ''), motivo + ' · ' + repetido)
+        motivo = motivo.mask(sinalizados_mes['Duplicata'] & (motivo == ''), repetido)
+
+        valor_tipico = sinalizados_mes['Valor Típico']
+        tabela_sinalizados = pd.DataFrame({
+            'Data': sinalizados_mes['Data Lançamento'].dt.strftime('%d/%m/%Y'),
+            'Centro de Custo': sinalizados_mes['Centro de Custo'],
+            'Especificação': sinalizados_mes['Especificação'],
+            'Fornecedor': sinalizados_mes['Fornecedor'],
+            'Valor': formatar_coluna(sinalizados_mes['Centavos']),
+            'Valor Típico': formatar_coluna(valor_tipico.fillna(0)).where(valor_tipico.notna(), '-'),
+            'Desvio': sinalizados_mes['Desvio'].round(1),
+            'Motivo': motivo,
+            'Referência': sinalizados_mes['Referência'].fillna('-')
+        })
+        st.dataframe(tabela_sinalizados, use_container_width=True, hide_index=True)
+        st.caption(
+            f"Fora do padrão: valor a {LIMIAR_Z:.0f} ou mais desvios do histórico da mesma despesa "
+            f"(mínimo de {MIN_HISTORICO} lançamentos). Duplicata: mesmo fornecedor e valor em até "
+            f"{JANELA_DUPLICATA_DIAS} dias."
+        )
 
     st.markdown("---")
 
@@ -574,22 +640,38 @@ else:
     # Filtros para Saídas
     col_f1, col_f2, col_f3 = st.columns(3)
 
+    # Centro de Custo e Especificação em cascata: cada lista mostra só as opções
+    # compatíveis com a outra, com quantidade e total
+    centro_filtro_saida = st.session_state.get('centro_saida', 'Todos')
+    spec_filtro_saida = st.session_state.get('spec_saida', 'Todas')
+    filtros_saida = {
+        'Centro de Custo': {'incluir': [] if centro_filtro_saida == 'Todos' else [centro_filtro_saida]},
+        'Especificação': {'incluir': [] if spec_filtro_saida == 'Todas' else [spec_filtro_saida]}
+    }
+    contagens_saida = indice_saidas.contar(filtros_saida)
+
     with col_f1:
         if 'Centro de Custo' in df_saidas.columns:
-            centros_saida = ['Todos'] + sorted(df_saidas['Centro de Custo'].dropna().unique().tolist())
+            centros_saida = ['Todos'] + opcoes_faceta(
+                contagens_saida['Centro de Custo'], filtros_saida['Centro de Custo']['incluir']
+            )
             centro_filtro_saida = st.selectbox(
                 "Centro de Custo (Saídas)",
                 options=centros_saida,
+                format_func=rotulo_faceta(contagens_saida['Centro de Custo']),
                 index=0,
                 key="centro_saida"
             )
 
     with col_f2:
         if 'Especificação' in df_saidas.columns:
-            specs_saida = ['Todas'] + sorted(df_saidas['Especificação'].dropna().unique().tolist())
+            specs_saida = ['Todas'] + opcoes_faceta(
+                contagens_saida['Especificação'], filtros_saida['Especificação']['incluir']
+            )
             spec_filtro_saida = st.selectbox(
                 "Especificação (Saídas)",
                 options=specs_saida,
+                format_func=rotulo_faceta(contagens_saida['Especificação']),
                 index=0,
                 key="spec_saida"
             )
@@ -617,16 +699,12 @@ else:
         )
 
     # Aplicar filtros
-    df_saidas_filtrado = df_saidas.copy()
-
-    if 'Centro de Custo' in df_saidas.columns and centro_filtro_saida != 'Todos':
-        df_saidas_filtrado = df_saidas_filtrado[df_saidas_filtrado['Centro de Custo'] == centro_filtro_saida]
-
-    if 'Especificação' in df_saidas.columns and spec_filtro_saida != 'Todas':
-        df_saidas_filtrado = df_saidas_filtrado[df_saidas_filtrado['Especificação'] == spec_filtro_saida]
+    filtros_saida['Centro de Custo']['incluir'] = [] if centro_filtro_saida == 'Todos' else [centro_filtro_saida]
+    filtros_saida['Especificação']['incluir'] = [] if spec_filtro_saida == 'Todas' else [spec_filtro_saida]
+    df_saidas_filtrado = df_saidas[indice_saidas.filtrar(filtros_saida)]
 
     if busca_saida:
-        mask = pd.Series([False] * len(df_saidas_filtrado))
+        mask = pd.Series(False, index=df_saidas_filtrado.index)
         for col in ['Especificação', 'Observação', 'Centro de Custo', 'Fornecedor', 'Histórico']:
             if col in df_saidas_filtrado.columns:
                 mask = mask | df_saidas_filtrado[col].astype(str).str.contains(busca_saida, case=False, na=False)
@@ -657,7 +735,7 @@ else:
 
     # Formatar valor e data
     if 'Valor' in df_saida_display.columns:
-        df_saida_display['Valor'] = df_saida_display['Valor'].apply(formatar_real)
+        df_saida_display['Valor'] = formatar_coluna(df_saidas_filtrado['Centavos'])
     if 'Data Lançamento' in df_saida_display.columns:
         df_saida_display['Data Lançamento'] = df_saida_display['Data Lançamento'].dt.strftime('%d/%m/%Y')
 
@@ -674,16 +752,16 @@ else:
     if len(df_saidas_filtrado) > 0:
         col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
         with col_stat1:
-            st.metric("Total da Seleção", formatar_real(df_saidas_filtrado['Valor'].sum()))
+            st.metric("Total da Seleção", formatar_centavos(df_saidas_filtrado['Centavos'].sum()))
         with col_stat2:
-            st.metric("Média da Seleção", formatar_real(df_saidas_filtrado['Valor'].mean()))
+            st.metric("Média da Seleção", formatar_centavos(media_centavos(df_saidas_filtrado['Centavos'])))
         with col_stat3:
-            st.metric("Maior Valor", formatar_real(df_saidas_filtrado['Valor'].max()))
+            st.metric("Maior Valor", formatar_centavos(df_saidas_filtrado['Centavos'].max()))
         with col_stat4:
-            st.metric("Menor Valor", formatar_real(df_saidas_filtrado['Valor'].min()))
+            st.metric("Menor Valor", formatar_centavos(df_saidas_filtrado['Centavos'].min()))
 
-    # Download
-    col_down1, col_down2 = st.columns(2)
+    # Download (o Excel só é gerado quando o botão é clicado)
+    col_down1, col_down2, col_down3 = st.columns(3)
     with col_down1:
         st.download_button(
             label="📥 Baixar seleção atual (CSV)",
@@ -695,11 +773,167 @@ else:
     with col_down2:
         st.download_button(
             label="📥 Baixar todas saídas (CSV)",
-            data=df_saidas.to_csv(index=False).encode('utf-8'),
+            data=csv_completo('saidas', mes_selecionado, versao_dados),
             file_name=f"saidas_{mes_selecionado}_completo_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
             mime="text/csv",
             key="download_saida_todas"
         )
+    with col_down3:
+        st.download_button(
+            label="📊 Baixar seleção atual (Excel)",
+            data=lambda: exportar_xlsx(df_saidas_filtrado, 'Saídas'),
+            file_name=f"saidas_{mes_selecionado}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+            mime=MIME_XLSX,
+            on_click="ignore",
+            key="download_saida_excel"
+        )
+
+st.markdown("---")
+
+# ============================================================================
+# SEÇÃO 3: EXTRATO POR CONTA
+# ============================================================================
+
+st.markdown('<div class="section-header">🏦 EXTRATO POR CONTA</div>', unsafe_allow_html=True)
+
+# Saldo diário desde o primeiro mês disponível até o selecionado; os meses
+# anteriores vêm do cache e só o mês novo é somado
+chave_extrato = st.radio("Agrupar por", CHAVES_EXTRATO, horizontal=True, key="chave_extrato")
+meses_extrato = meses_disponiveis[:meses_disponiveis.index(mes_selecionado) + 1]
+linhas_extrato, _ = extrato(
+    [(mes, (versao_conjunto_mensal('entradas', mes), versao_conjunto_mensal('saidas', mes)),
+      partial(movimento_mes, mes))
+     for mes in meses_extrato],
+    chave_extrato, saldos_iniciais
+)
+extrato_mes = linhas_extrato[linhas_extrato['Mês'] == mes_selecionado]
+
+if len(quarentena_saldos) > 0:
+    with st.expander(f"⚠️ {len(quarentena_saldos)} linha(s) inválida(s) nos saldos iniciais"):
+        st.dataframe(quarentena_saldos, use_container_width=True, hide_index=True)
+
+if extrato_mes.empty:
+    st.info(f"ℹ️ Nenhum lançamento com data em {mes_selecionado_label}")
+else:
+    resumo_extrato = extrato_mes.groupby(chave_extrato, sort=False).agg(
+        Entradas=('Entradas', 'sum'), Saídas=('Saídas', 'sum'), Líquido=('Líquido', 'sum'),
+        **{'Saldo Final': ('Saldo', 'last')}
+    ).reset_index()
+    resumo_extrato.insert(1, 'Saldo Inicial', resumo_extrato['Saldo Final'] - resumo_extrato['Líquido'])
+    resumo_extrato = resumo_extrato.sort_values('Saldo Final', ascending=False)
+
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        st.subheader("📈 Saldo Diário")
+        fig_saldo = px.line(
+            extrato_mes.assign(Saldo=extrato_mes['Saldo'] / 100),
+            x='Data',
+            y='Saldo',
+            color=chave_extrato,
+            line_shape='hv',
+            markers=True,
+            labels={'Saldo': 'Saldo (R$)', 'Data': 'Data'}
+        )
+        fig_saldo.update_layout(height=400, legend=dict(orientation="h", yanchor="bottom", y=1.02))
+        fig_saldo.update_traces(hovertemplate="<b>%{x|%d/%m/%Y}</b><br>Saldo: R$ %{y:,.2f}<extra></extra>")
+        st.plotly_chart(fig_saldo, use_container_width=True)
+
+    with col2:
+        st.subheader(f"🏦 Saldos em {mes_selecionado_label}")
+        resumo_display = resumo_extrato.drop(columns='Líquido')
+        for coluna in ['Saldo Inicial', 'Entradas', 'Saídas', 'Saldo Final']:
+            resumo_display[coluna] = formatar_coluna(resumo_display[coluna])
+        st.dataframe(resumo_display, use_container_width=True, hide_index=True)
+        if chave_extrato == 'Conta' and saldos_iniciais.empty:
+            st.caption(
+                f"Sem saldos de abertura: os saldos partem de zero no primeiro mês ({meses_extrato[0]}). "
+                f"Salve **{SALDOS_FILES[1].name}** com as colunas 'Conta' e 'Saldo Inicial' para informá-los."
+            )
+        elif chave_extrato != 'Conta':
+            st.caption("Por forma de pagamento o saldo é o resultado acumulado (entradas menos saídas).")
+
+    with st.expander("📋 Movimento diário"):
+        extrato_display = extrato_mes.drop(columns='Mês').copy()
+        extrato_display['Data'] = extrato_display['Data'].dt.strftime('%d/%m/%Y')
+        for coluna in ['Entradas', 'Saídas', 'Líquido', 'Saldo']:
+            extrato_display[coluna] = formatar_coluna(extrato_display[coluna])
+        st.dataframe(extrato_display, use_container_width=True, hide_index=True)
+
+st.markdown("---")
+
+# ============================================================================
+# SEÇÃO 4: CALENDÁRIO DE LANÇAMENTOS
+# ============================================================================
+
+st.markdown('<div class="section-header">🗓️ CALENDÁRIO DE LANÇAMENTOS</div>', unsafe_allow_html=True)
+
+# Sob demanda: o calendário usa todos os meses até o selecionado, e os que
+# ainda não foram lidos não entram no caminho de cada execução da página
+mostrar_calendario = st.toggle("🗓️ Mostrar calendário dos meses até o selecionado", key="mostrar_calendario")
+if mostrar_calendario:
+    col_c1, col_c2 = st.columns(2)
+    with col_c1:
+        tipo_calendario = st.radio("Lançamentos", ['Entradas', 'Saídas'], horizontal=True, key="tipo_calendario")
+    with col_c2:
+        medida_calendario = st.radio("Medida", ['Valor', 'Quantidade'], horizontal=True, key="medida_calendario")
+
+    # Vetores diários de cada mês (no cache pela versão do mês, sem reler os
+    # meses que não mudaram) somados numa linha do tempo só; as grades são
+    # remapeamentos dela
+    tipo_dados = 'entradas' if tipo_calendario == 'Entradas' else 'saidas'
+    diario = juntar_dias([dias_binados(tipo_dados, mes, versao_conjunto_mensal(tipo_dados, mes))
+                          for mes in meses_extrato])
+    escala_calendario = 'Greens' if tipo_dados == 'entradas' else 'Reds'
+
+    if len(diario['centavos']) == 0:
+        st.info(f"ℹ️ Nenhum lançamento com data até {mes_selecionado_label}")
+    else:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("📆 Dia da Semana × Semana")
+            centavos_semanas, quantidade_semanas, segundas = grade_semanas(diario)
+            st.plotly_chart(figura_calendario(
+                centavos_semanas, quantidade_semanas, pd.to_datetime(segundas).strftime('%d/%m'), DIAS_SEMANA,
+                "Semana de", "Dia da semana", medida_calendario, escala_calendario
+            ), use_container_width=True)
+        with col2:
+            st.subheader("📅 Dia do Mês × Mês")
+            centavos_meses, quantidade_meses, meses_grade = grade_meses(diario)
+            st.plotly_chart(figura_calendario(
+                centavos_meses, quantidade_meses, [rotulo_mes(mes) for mes in meses_grade], list(range(1, 32)),
+                "Mês", "Dia do mês", medida_calendario, escala_calendario
+            ), use_container_width=True)
+        st.caption(f"Meses considerados: {', '.join(meses_pt.get(mes, mes) for mes in meses_extrato)}")
+
+# Painel estático para quem só consulta (não mantém sessão no servidor)
+st.sidebar.markdown("---")
+st.sidebar.download_button(
+    label="🌐 Baixar painel estático (HTML)",
+    data=lambda: painel_html(mes_selecionado, f"{mes_selecionado_label}/2025", versao_dados),
+    file_name=f"painel_{mes_selecionado}_{datetime.now().strftime('%Y%m%d')}.html",
+    mime=MIME_HTML,
+    on_click="ignore",
+    help="Arquivo único, que abre no navegador sem o servidor, com filtros e gráficos"
+)
+
+# Métricas do cache compartilhado (memória limitada por IPB_CACHE_MB)
+with st.sidebar.expander("🧠 Cache do servidor"):
+    metricas_cache = cache.metricas()
+    st.caption(
+        f"{metricas_cache['bytes'] / 1024**2:.1f} MB de {metricas_cache['orcamento_bytes'] / 1024**2:.0f} MB "
+        f"· {metricas_cache['itens']} itens"
+    )
+    st.caption(
+        f"Taxa de acerto: {metricas_cache['taxa_acerto'] * 100:.1f}% · Despejos: {metricas_cache['despejos']} "
+        f"· Recusados: {metricas_cache['rejeitados']}"
+    )
+    metricas_categorias = pd.DataFrame(metricas_cache['categorias']).T
+    metricas_categorias['MB'] = (metricas_categorias['bytes'] / 1024**2).round(2)
+    metricas_categorias['Acerto (%)'] = (metricas_categorias['taxa_acerto'] * 100).round(1)
+    st.dataframe(
+        metricas_categorias[['itens', 'MB', 'Acerto (%)', 'despejos', 'rejeitados']],
+        use_container_width=True
+    )
 
 # Footer
 st.markdown("---")
@@ -711,3 +945,7 @@ st.markdown(
     """,
     unsafe_allow_html=True
 )
+
+# Página já desenhada: pré-carregar os meses vizinhos e os mais recentes em
+# segundo plano, para que a troca de mês encontre os dados no cache
+pre_carregar_meses(mes_selecionado, meses_disponiveis)
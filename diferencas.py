@@ -0,0 +1,146 @@
+import logging
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from comparacao import NIVEIS_AGREGADO
+
+# Diferença entre duas versões de um conjunto, linha a linha.
+# Cada linha recebe uma impressão digital estável (hash do conteúdo de todas
+# as colunas, igual entre execuções); linhas repetidas são distinguidas pela
+# ordem de ocorrência do mesmo hash. Linhas cuja identidade só existe na
+# versão nova foram inseridas, as que só existem na anterior foram
+# removidas, e uma alteração é uma remoção mais uma inserção. O 'Nº de
+# Lançamento' serve apenas para contar quantas delas foram alterações.
+#
+# Só o agregado mensal é atualizado com essas linhas: o agregado das
+# inseridas é somado e o das removidas subtraído, e esse passo custa o
+# tamanho da mudança (mais a tabela de agregados, que é pequena). A planilha
+# ainda é lida inteira, todas as linhas passam pelo hash e os demais
+# derivados (opções, índice de facetas, hashes) são refeitos do zero.
+
+logger = logging.getLogger(__name__)
+
+Diferenca = namedtuple('Diferenca', ['inseridas', 'removidas', 'atualizadas'])
+
+# Chave usada só para classificar inserção + remoção como alteração
+COLUNA_CHAVE = 'Nº de Lançamento'
+
+# Constantes da combinação dos hashes (primo do FNV, hash de valor ausente e
+# passo da ocorrência de linhas repetidas)
+MULTIPLICADOR = np.uint64(0x100000001B3)
+HASH_AUSENTE = np.uint64(0xC2B2AE3D27D4EB4F)
+PASSO_OCORRENCIA = np.uint64(0x9E3779B97F4A7C15)
+
+# Marcador de chave vazia na comparação dos grupos do agregado
+AUSENTE = '\x00(vazio)'
+
+# Acima desta fração de linhas alteradas, recalcular tudo sai mais barato
+LIMITE_DIFERENCA = 0.5
+
+
+# Hash de uma coluna (uint64). Texto é fatorado antes: só os valores
+# distintos passam pelo hash, o que é bem mais rápido com nomes repetidos
+def _hash_coluna(serie):
+    if pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_datetime64_any_dtype(serie):
+        return pd.util.hash_pandas_object(serie, index=False).to_numpy()
+    codigos, distintos = pd.factorize(serie)
+    hashes = pd.util.hash_array(np.asarray(distintos, dtype=object))
+    return np.where(codigos >= 0, hashes[np.maximum(codigos, 0)], HASH_AUSENTE).astype('uint64')
+
+
+# Hash de cada linha (uint64), combinando as colunas em ordem e independente
+# do índice do DataFrame
+def hash_linhas(df):
+    hashes = np.zeros(len(df), dtype='uint64')
+    with np.errstate(over='ignore'):
+        for coluna in df.columns:
+            hashes = (hashes * MULTIPLICADOR) ^ _hash_coluna(df[coluna])
+    return hashes
+
+
+# Identidade de cada linha: o hash, com as cópias idênticas de uma linha
+# diferenciadas pela ordem de ocorrência (a segunda cópia não é a primeira)
+def _identidades(hashes):
+    serie = pd.Series(hashes)
+    repetidas = serie.duplicated(keep=False).to_numpy()
+    if not repetidas.any():
+        return serie
+    ocorrencias = serie[repetidas].groupby(serie[repetidas]).cumcount().to_numpy().astype('uint64')
+    identidades = hashes.copy()
+    with np.errstate(over='ignore'):
+        identidades[repetidas] += ocorrencias * PASSO_OCORRENCIA
+    return pd.Series(identidades)
+
+
+def diferenca(df_anterior, hashes_anteriores, df_novo, hashes_novos):
+    anteriores = _identidades(hashes_anteriores)
+    novos = _identidades(hashes_novos)
+    inseridas = df_novo[~novos.isin(anteriores).to_numpy()]
+    removidas = df_anterior[~anteriores.isin(novos).to_numpy()]
+
+    atualizadas = 0
+    if COLUNA_CHAVE in df_novo.columns and COLUNA_CHAVE in df_anterior.columns:
+        chaves = inseridas[COLUNA_CHAVE].dropna()
+        atualizadas = int(chaves.isin(removidas[COLUNA_CHAVE].dropna()).sum())
+    return Diferenca(inseridas, removidas, atualizadas)
+
+
+# Diferença entre o instantâneo anterior de um conjunto (dados, hashes em
+# derivados['linhas']) e a nova leitura; None quando não compensa aplicar
+def diferenca_conjunto(anterior, dados, derivados):
+    df_anterior, df_novo = anterior.dados[0], dados[0]
+    if 'linhas' not in anterior.derivados or list(df_anterior.columns) != list(df_novo.columns):
+        return None
+    delta = diferenca(df_anterior, anterior.derivados['linhas'], df_novo, derivados['linhas'])
+    if len(delta.inseridas) + len(delta.removidas) > LIMITE_DIFERENCA * max(len(df_novo), 1):
+        return None
+    logger.info("Diferença: %d inserida(s), %d removida(s), %d alterada(s)",
+                len(delta.inseridas) - delta.atualizadas, len(delta.removidas) - delta.atualizadas,
+                delta.atualizadas)
+    return delta
+
+
+# Chaves de agrupamento com os valores ausentes trocados por AUSENTE
+def _sem_ausentes(indice):
+    niveis = [indice.get_level_values(posicao) for posicao in range(indice.nlevels)]
+    return pd.MultiIndex.from_arrays(
+        [nivel.astype(object).where(nivel.notna(), AUSENTE) for nivel in niveis], names=indice.names
+    )
+
+
+# Aplica a diferença à tabela de agregados mensais (soma e contagem por
+# Ano, Mês, Centro e Especificação): só os grupos tocados pelas linhas
+# alteradas mudam; grupos novos entram na ordem e os que zeram saem
+def atualizar_agregado(agregado, delta):
+    if delta.inseridas.empty and delta.removidas.empty:
+        return agregado
+    colunas = NIVEIS_AGREGADO + ['Centavos']
+    removidas = delta.removidas[colunas]
+    linhas = pd.concat([delta.inseridas[colunas].assign(Quantidade=1),
+                        removidas.assign(Centavos=-removidas['Centavos'], Quantidade=-1)], ignore_index=True)
+    variacao = linhas.groupby(NIVEIS_AGREGADO, observed=True, dropna=False, sort=False)[
+        ['Centavos', 'Quantidade']].sum()
+
+    base = agregado.set_index(NIVEIS_AGREGADO)
+    # NaN não casa em junções: as chaves são comparadas com os vazios
+    # trocados por um marcador (Centro de Custo vazio existe na planilha)
+    chaves_base, chaves_variacao = _sem_ausentes(base.index), _sem_ausentes(variacao.index)
+    existentes = chaves_variacao.isin(chaves_base)
+    posicoes = chaves_base.get_indexer(chaves_variacao[existentes])
+    centavos = base['Centavos'].to_numpy().copy()
+    quantidade = base['Quantidade'].to_numpy().copy()
+    np.add.at(centavos, posicoes, variacao['Centavos'].to_numpy()[existentes])
+    np.add.at(quantidade, posicoes, variacao['Quantidade'].to_numpy()[existentes])
+
+    novo = pd.DataFrame({'Centavos': centavos, 'Quantidade': quantidade}, index=base.index)
+    novos_grupos = variacao[~existentes]
+    if len(novos_grupos):
+        # Ordem do groupby (vazios por último em cada nível); sort_index não
+        # a reproduz quando há vazios num nível
+        novo = pd.concat([novo, novos_grupos]).reset_index().sort_values(
+            NIVEIS_AGREGADO, na_position='last', kind='stable').set_index(NIVEIS_AGREGADO)
+    novo = novo[novo['Quantidade'] > 0].reset_index()
+    novo['Periodo'] = novo['Ano'] * 100 + novo['Mes_Num']
+    return novo
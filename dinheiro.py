@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+# Valores monetários em centavos inteiros.
+# Na ingestão cada valor ganha a coluna 'Centavos' (int64). Somas, diferenças
+# e saldos são feitos nela, sem o erro acumulado de somar milhares de floats;
+# a conversão para reais acontece só na exibição (cartões, tabelas, eixos).
+
+
+# Reais (float) -> centavos (int64). Vazios e não finitos viram 0.
+def para_centavos(valores):
+    if isinstance(valores, pd.Series):
+        return pd.Series(para_centavos(valores.to_numpy(dtype='float64', na_value=np.nan)),
+                         index=valores.index, name='Centavos')
+    centavos = np.rint(np.asarray(valores, dtype='float64') * 100)
+    centavos = np.where(np.isfinite(centavos), centavos, 0).astype('int64')
+    return int(centavos) if centavos.ndim == 0 else centavos
+
+
+def para_reais(centavos):
+    return centavos / 100
+
+
+# "R$ 1.234,56" montado só com aritmética inteira
+def formatar_centavos(centavos):
+    centavos = int(centavos)
+    sinal = '-' if centavos < 0 else ''
+    reais, resto = divmod(abs(centavos), 100)
+    return f"R$ {sinal}{reais:,}".replace(',', '.') + f",{resto:02d}"
+
+
+# Mesma formatação para uma coluna inteira, com operações de string vetorizadas
+def formatar_coluna(centavos):
+    centavos = pd.Series(centavos).astype('int64')
+    absoluto = centavos.abs()
+    reais = (absoluto // 100).astype('string').str.replace(r'\B(?=(\d{3})+$)', '.', regex=True)
+    resto = (absoluto % 100).astype('string').str.zfill(2)
+    sinal = pd.Series(np.where(centavos < 0, '-', ''), index=centavos.index)
+    return ('R$ ' + sinal + reais + ',' + resto).astype(object)
+
+
+# Média em centavos, arredondada ao centavo com aritmética inteira (0 se vazio)
+def media_centavos(centavos):
+    quantidade = len(centavos)
+    if quantidade == 0:
+        return 0
+    total = int(pd.Series(centavos).sum())
+    return (2 * total + quantidade) // (2 * quantidade)
+
+
+# Percentual entre dois valores em centavos (None quando o todo é zero)
+def percentual(parte, todo):
+    return parte * 100 / todo if todo else None
+
+
+# Soma exata por grupo, convertida para reais só no fim (coluna 'Valor'),
+# pronta para gráficos
+def somar_em_reais(df, por):
+    return (df.groupby(por)['Centavos'].sum() / 100).rename('Valor')
@@ -0,0 +1,152 @@
+from collections import namedtuple
+
+import numpy as np
+
+from cache_limitado import cache
+from dinheiro import para_centavos
+
+# Estado canônico dos filtros do dashboard anual.
+# Os valores dos widgets viram uma tupla normalizada: listas como tuplas
+# ordenadas e sem repetição, e faixa de valor em centavos (o limite que
+# coincide com o mínimo ou o máximo possível vira None, "sem limite"). Duas
+# sessões com a mesma seleção, em qualquer ordem, geram a mesma chave.
+#
+# A chave (com a versão dos dados) indexa o cache compartilhado de recortes:
+# posições das linhas filtradas, contagens das facetas, cubo e agregados.
+# O estado também vai para a URL (?centro=...&mes=...), então um link
+# compartilhado abre a mesma visão, já respondida pelo cache.
+
+EstadoFiltros = namedtuple('EstadoFiltros', [
+    'centros', 'excluidos', 'especificacoes', 'meses', 'categorias', 'valor_min', 'valor_max'
+])
+
+# Campo do estado -> chave do widget no session_state e parâmetro da URL
+CAMPOS_LISTA = {
+    'centros': ('filtro_centro_incluir', 'centro'),
+    'excluidos': ('filtro_centro_excluir', 'excluir'),
+    'especificacoes': ('filtro_especificacao', 'espec'),
+    'meses': ('filtro_meses', 'mes'),
+    'categorias': ('filtro_categoria_receitas', 'categoria'),
+}
+CHAVE_VALOR = 'filtro_valor'
+PARAMETROS_VALOR = ('vmin', 'vmax')
+
+# Campos que afetam as despesas (a categoria só filtra receitas)
+CAMPOS_DESPESAS = ('centros', 'excluidos', 'especificacoes', 'meses', 'valor_min', 'valor_max')
+
+
+def _lista(valores):
+    return tuple(sorted(set(valores or ())))
+
+
+# Estado canônico a partir dos valores dos widgets (faixa em reais)
+def normalizar(centros=(), excluidos=(), especificacoes=(), meses=(), categorias=(),
+               valor_min=0.0, valor_max=None, limite_valor=None):
+    minimo = para_centavos(valor_min or 0)
+    maximo = None if valor_max is None else para_centavos(valor_max)
+    if minimo <= 0:
+        minimo = None
+    if maximo is not None and limite_valor is not None and maximo >= para_centavos(limite_valor):
+        maximo = None
+    return EstadoFiltros(_lista(centros), _lista(excluidos), _lista(especificacoes), _lista(meses),
+                         _lista(categorias), minimo, maximo)
+
+
+# Estado atual da sessão (lido do session_state antes de desenhar os widgets)
+def estado_da_sessao(sessao, limite_valor):
+    valor_min, valor_max = sessao.get(CHAVE_VALOR, (0.0, limite_valor))
+    listas = {campo: sessao.get(chave, []) for campo, (chave, _) in CAMPOS_LISTA.items()}
+    return normalizar(**listas, valor_min=valor_min, valor_max=valor_max, limite_valor=limite_valor)
+
+
+# Filtros no formato do índice de facetas
+def filtros_facetas(estado):
+    return {
+        'Centro de Custo': {'incluir': list(estado.centros), 'excluir': list(estado.excluidos)},
+        'Especificação': {'incluir': list(estado.especificacoes)},
+        'Mês Ano Ref.': {'incluir': list(estado.meses)}
+    }
+
+
+# Máscara da faixa de valor sobre a coluna de centavos do índice
+def mascara_valor(estado, centavos):
+    mascara = np.ones(len(centavos), dtype=bool)
+    if estado.valor_min is not None:
+        mascara &= centavos >= estado.valor_min
+    if estado.valor_max is not None:
+        mascara &= centavos <= estado.valor_max
+    return mascara
+
+
+# Chave de cache de um resultado derivado do recorte de despesas
+def chave_despesas(estado, versao, nome):
+    return ('vista', nome, versao, tuple(getattr(estado, campo) for campo in CAMPOS_DESPESAS))
+
+
+# Resultado compartilhado entre sessões para o mesmo recorte e versão
+def obter_vista(nome, estado, versao, calcular):
+    return cache.obter_ou_calcular(chave_despesas(estado, versao, nome), 'agregados', calcular)
+
+
+# Posições (int32) das linhas do recorte: ocupam bem menos que o DataFrame
+# filtrado e viram o recorte com um único iloc
+def posicoes_filtradas(estado, versao, indice):
+    def calcular():
+        mascara = indice.filtrar(filtros_facetas(estado), base=mascara_valor(estado, indice.valores))
+        return np.flatnonzero(mascara).astype('int32')
+    return obter_vista('posicoes', estado, versao, calcular)
+
+
+# Máscara booleana do recorte (para contagens sobre as linhas já filtradas)
+def mascara_das_posicoes(posicoes, tamanho):
+    mascara = np.zeros(tamanho, dtype=bool)
+    mascara[posicoes] = True
+    return mascara
+
+
+# Parâmetros da URL que representam o estado (listas repetem o parâmetro)
+def para_parametros(estado):
+    parametros = {}
+    for campo, (_, parametro) in CAMPOS_LISTA.items():
+        valores = getattr(estado, campo)
+        if valores:
+            parametros[parametro] = list(valores)
+    for parametro, centavos in zip(PARAMETROS_VALOR, (estado.valor_min, estado.valor_max)):
+        if centavos is not None:
+            parametros[parametro] = [f"{centavos / 100:.2f}"]
+    return parametros
+
+
+# Valores dos widgets a partir da URL, só com opções que existem nos dados
+# opcoes: {campo: lista de opções válidas}
+def valores_da_url(parametros, opcoes, limite_valor):
+    valores = {}
+    for campo, (chave, parametro) in CAMPOS_LISTA.items():
+        escolhidos = [valor for valor in parametros.get(parametro, []) if valor in set(opcoes.get(campo, []))]
+        if escolhidos:
+            valores[chave] = list(dict.fromkeys(escolhidos))
+
+    faixa = []
+    for parametro, padrao in zip(PARAMETROS_VALOR, (0.0, limite_valor)):
+        try:
+            faixa.append(min(max(float(parametros.get(parametro, [padrao])[0]), 0.0), limite_valor))
+        except ValueError:
+            faixa.append(padrao)
+    if faixa != [0.0, limite_valor] and faixa[0] <= faixa[1]:
+        valores[CHAVE_VALOR] = tuple(faixa)
+    return valores
+
+
+# Atualiza só os parâmetros do estado que mudaram (os demais ficam como estão)
+def sincronizar_url(query_params, estado):
+    desejados = para_parametros(estado)
+    parametros = [parametro for _, parametro in CAMPOS_LISTA.values()] + list(PARAMETROS_VALOR)
+    for parametro in parametros:
+        atual = query_params.get_all(parametro)
+        desejado = desejados.get(parametro, [])
+        if atual == desejado:
+            continue
+        if desejado:
+            query_params[parametro] = desejado
+        else:
+            del query_params[parametro]
@@ -0,0 +1,138 @@
+import io
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+# Exportação em Excel (xlsx) das visões filtradas.
+# A planilha é gravada no modo de escrita contínua do openpyxl (write_only):
+# as linhas são serializadas em blocos, sem montar as células de todas as
+# abas antes de salvar. O arquivo pronto (compactado) vai inteiro para a
+# memória, que é como o st.download_button recebe os dados.
+# Valores saem como números (a partir dos centavos) com formato de moeda e
+# datas como datas do Excel. Abas: lançamentos, resumo por centro e top N.
+
+MIME_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+FORMATO_MOEDA = '"R$" #,##0.00;[Red]-"R$" #,##0.00'
+FORMATO_DATA = 'DD/MM/YYYY'
+FORMATO_PERCENTUAL = '0.00%'
+
+# Colunas auxiliares criadas na leitura (não vão para a planilha)
+COLUNAS_INTERNAS = ['Centavos', 'Mes_Num', 'Ano', 'Nome_Mes']
+
+TAMANHO_BLOCO = 5000
+
+
+def _cabecalho(planilha, colunas):
+    fonte = Font(bold=True)
+    celulas = []
+    for coluna in colunas:
+        celula = WriteOnlyCell(planilha, value=coluna)
+        celula.font = fonte
+        celulas.append(celula)
+    planilha.append(celulas)
+
+
+def _celula(planilha, valor, formato):
+    if formato is None or valor is None:
+        return valor
+    celula = WriteOnlyCell(planilha, value=valor)
+    celula.number_format = formato
+    return celula
+
+
+# Valores de um bloco de uma coluna, já no tipo nativo do Excel (vazios -> None)
+def _valores_bloco(serie):
+    return serie.astype(object).where(serie.notna(), None).tolist()
+
+
+# Aba de lançamentos: escreve o DataFrame bloco a bloco
+def _aba_detalhe(livro, df, titulo):
+    planilha = livro.create_sheet(titulo)
+    colunas = [c for c in df.columns if c not in COLUNAS_INTERNAS]
+    formatos = []
+    for coluna in colunas:
+        if coluna == 'Valor':
+            formatos.append(FORMATO_MOEDA)
+        elif pd.api.types.is_datetime64_any_dtype(df[coluna]):
+            formatos.append(FORMATO_DATA)
+        else:
+            formatos.append(None)
+
+    for posicao, coluna in enumerate(colunas):
+        largura = 14 if formatos[posicao] else min(max(len(str(coluna)) + 4, 12), 45)
+        planilha.column_dimensions[_letra(posicao)].width = largura
+    planilha.freeze_panes = 'A2'
+    _cabecalho(planilha, colunas)
+
+    for inicio in range(0, len(df), TAMANHO_BLOCO):
+        bloco = df.iloc[inicio:inicio + TAMANHO_BLOCO]
+        valores = []
+        for coluna in colunas:
+            if coluna == 'Valor' and 'Centavos' in bloco.columns:
+                # Reais a partir dos centavos inteiros (sem resíduo de float)
+                valores.append((bloco['Centavos'] / 100).tolist())
+            else:
+                valores.append(_valores_bloco(bloco[coluna]))
+        for linha in zip(*valores):
+            planilha.append([_celula(planilha, valor, formato) for valor, formato in zip(linha, formatos)])
+
+    if len(colunas):
+        planilha.auto_filter.ref = f"A1:{_letra(len(colunas) - 1)}{len(df) + 1}"
+    return planilha
+
+
+def _letra(posicao):
+    return get_column_letter(posicao + 1)
+
+
+# Aba de resumo: uma linha por grupo com quantidade, total e participação
+def _aba_resumo(livro, df, coluna, titulo, top=None):
+    planilha = livro.create_sheet(titulo)
+    planilha.column_dimensions['A'].width = 45
+    for letra in 'BCD':
+        planilha.column_dimensions[letra].width = 16
+    _cabecalho(planilha, [coluna, 'Lançamentos', 'Total', '% do Total'])
+
+    if coluna not in df.columns or df.empty:
+        return planilha
+    resumo = df.groupby(coluna, dropna=False)['Centavos'].agg(['count', 'sum'])
+    resumo = resumo.sort_values('sum', ascending=False)
+    total = int(df['Centavos'].sum())
+    if top is not None:
+        resumo = resumo.head(top)
+
+    for rotulo, (quantidade, centavos) in resumo.iterrows():
+        planilha.append([
+            '(não informado)' if pd.isna(rotulo) else rotulo,
+            int(quantidade),
+            _celula(planilha, int(centavos) / 100, FORMATO_MOEDA),
+            _celula(planilha, int(centavos) / total if total else None, FORMATO_PERCENTUAL)
+        ])
+    if top is None:
+        fonte = Font(bold=True)
+        celulas = [WriteOnlyCell(planilha, value='Total'), WriteOnlyCell(planilha, value=len(df)),
+                   WriteOnlyCell(planilha, value=total / 100)]
+        celulas[2].number_format = FORMATO_MOEDA
+        for celula in celulas:
+            celula.font = fonte
+        planilha.append(celulas)
+    return planilha
+
+
+# Grava a planilha em `destino` (caminho ou arquivo binário aberto)
+def escrever_xlsx(destino, df, titulo='Lançamentos', top=20):
+    livro = Workbook(write_only=True)
+    _aba_detalhe(livro, df, titulo[:31])
+    _aba_resumo(livro, df, 'Centro de Custo', 'Resumo por Centro')
+    _aba_resumo(livro, df, 'Especificação', f'Top {top} Especificações'[:31], top=top)
+    livro.save(destino)
+
+
+# Planilha pronta (bytes) para o st.download_button
+def exportar_xlsx(df, titulo='Lançamentos', top=20):
+    destino = io.BytesIO()
+    escrever_xlsx(destino, df, titulo, top)
+    return destino.getvalue()
@@ -0,0 +1,395 @@
+import argparse
+import json
+import sys
+from datetime import datetime
+from html import escape
+from pathlib import Path
+
+import pandas as pd
+
+# Exportação dos dashboards para um único arquivo HTML estático.
+# Os lançamentos são pré-agregados por (período, dimensões) e embutidos como
+# colunas de inteiros: cada dimensão vira um dicionário de rótulos e uma
+# lista de códigos, e os valores vão em centavos. O plotly.js vai junto no
+# arquivo, e filtros, indicadores, gráficos e tabelas são recalculados no
+# navegador a partir dessas colunas, sem servidor. O arquivo pode ser
+# enviado por e-mail ou aberto sem internet.
+
+MIME_HTML = 'text/html'
+SEM_VALOR = '(não informado)'
+
+# Nomes dos meses (mesmos do dados.MESES_NOMES, sem importar a camada de dados)
+NOMES_MESES = {1: 'Janeiro', 2: 'Fevereiro', 3: 'Março', 4: 'Abril', 5: 'Maio', 6: 'Junho',
+               7: 'Julho', 8: 'Agosto', 9: 'Setembro', 10: 'Outubro', 11: 'Novembro', 12: 'Dezembro'}
+
+
+# Série em colunas: período, códigos de cada dimensão, total e quantidade
+def _serie(nome, papel, df, periodo, dimensoes):
+    if df is None or df.empty:
+        return {'nome': nome, 'papel': papel, 'dimensoes': dimensoes,
+                'rotulos': [[] for _ in dimensoes], 'codigos': [[] for _ in dimensoes], 'p': [], 'v': [], 'n': []}
+
+    chaves = pd.DataFrame({dimensao: df[dimensao].astype('string').fillna(SEM_VALOR) if dimensao in df.columns
+                           else SEM_VALOR for dimensao in dimensoes}, index=df.index)
+    chaves.insert(0, '_periodo', periodo.fillna(0).astype('int64'))
+    grupos = chaves.assign(_centavos=df['Centavos']).groupby(['_periodo'] + dimensoes, sort=True)['_centavos']
+    grupos = grupos.agg(['sum', 'count']).reset_index()
+
+    rotulos, codigos = [], []
+    for dimensao in dimensoes:
+        codigo, valores = pd.factorize(grupos[dimensao], sort=True)
+        rotulos.append([str(valor) for valor in valores])
+        codigos.append(codigo.tolist())
+    return {
+        'nome': nome, 'papel': papel, 'dimensoes': dimensoes, 'rotulos': rotulos, 'codigos': codigos,
+        'p': grupos['_periodo'].tolist(), 'v': grupos['sum'].astype('int64').tolist(),
+        'n': grupos['count'].astype('int64').tolist()
+    }
+
+
+def _json_embutido(dados):
+    texto = json.dumps(dados, ensure_ascii=False, separators=(',', ':'))
+    # Evita fechar a tag <script> dentro dos dados
+    return texto.replace('</', '<\\/')
+
+
+# Monta o HTML a partir do título, dos períodos [(código, rótulo)] e das séries
+def gerar_html(titulo, subtitulo, nome_periodo, periodos, series):
+    from plotly.offline import get_plotlyjs
+
+    dados = {
+        'titulo': titulo,
+        'periodo': nome_periodo,
+        'periodos': [{'codigo': int(codigo), 'rotulo': rotulo} for codigo, rotulo in periodos],
+        'series': series
+    }
+    gerado = datetime.now().strftime('%d/%m/%Y %H:%M')
+    return (MODELO_HTML
+            .replace('__TITULO__', escape(titulo))
+            .replace('__SUBTITULO__', escape(f"{subtitulo} · gerado em {gerado}"))
+            .replace('__PLOTLY__', get_plotlyjs())
+            .replace('__DADOS__', _json_embutido(dados)))
+
+
+# Painel anual: despesas por mês, centro e especificação; receitas por categoria
+def html_anual(df_despesas, df_receitas, ano=None):
+    ano = ano or (int(df_despesas['Ano'].max()) if 'Ano' in df_despesas.columns and len(df_despesas) else '')
+    series = [
+        _serie('Receitas', 'entrada', df_receitas, df_receitas['Mes_Num'] if df_receitas is not None else None,
+               ['Categoria']),
+        _serie('Despesas', 'saida', df_despesas, df_despesas['Mes_Num'], ['Centro de Custo', 'Especificação']),
+    ]
+    periodos = [(mes, NOMES_MESES[mes]) for mes in range(1, 13)]
+    return gerar_html(f"Dashboard Financeiro - IPB {ano}", "Visão anual", 'Mês', periodos, series)
+
+
+def _dia(df):
+    if df is None or df.empty or 'Data Lançamento' not in df.columns:
+        return pd.Series(dtype='int64')
+    return pd.to_datetime(df['Data Lançamento'], errors='coerce').dt.day
+
+
+# Painel mensal: entradas e saídas por dia, centro e especificação
+def html_mensal(rotulo_mes, df_entradas, df_saidas):
+    dimensoes = ['Centro de Custo', 'Especificação']
+    series = [
+        _serie('Entradas', 'entrada', df_entradas, _dia(df_entradas), dimensoes),
+        _serie('Saídas', 'saida', df_saidas, _dia(df_saidas), dimensoes),
+    ]
+    dias = sorted(set(series[0]['p']) | set(series[1]['p']))
+    periodos = [(dia, f"Dia {dia:02d}" if dia else 'Sem data') for dia in dias]
+    return gerar_html(f"Dashboard Mensal - IPB - {rotulo_mes}", "Visão mensal", 'Dia', periodos, series)
+
+
+MODELO_HTML = r"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>__TITULO__</title>
+<style>
+  body { font-family: -apple-system, "Segoe UI", Roboto, sans-serif; margin: 0; color: #222; background: #fafafa; }
+  header { padding: 1rem 2rem; border-bottom: 3px solid #1f77b4; background: #fff; }
+  header h1 { margin: 0; color: #1f77b4; font-size: 1.8rem; }
+  header p { margin: .2rem 0 0; color: #666; }
+  main { display: flex; gap: 1.5rem; padding: 1rem 2rem; }
+  aside { width: 280px; flex-shrink: 0; }
+  section { flex: 1; min-width: 0; }
+  aside h3 { margin: 1rem 0 .4rem; font-size: 1rem; }
+  aside details { background: #fff; border: 1px solid #ddd; border-radius: 6px; padding: .4rem .6rem; margin-bottom: .5rem; }
+  aside .lista { max-height: 220px; overflow-y: auto; font-size: .85rem; }
+  aside label { display: block; padding: 1px 0; }
+  aside input[type=search] { width: 100%; box-sizing: border-box; padding: .4rem; }
+  button { margin-top: .6rem; padding: .4rem .8rem; cursor: pointer; }
+  .kpis { display: grid; grid-template-columns: repeat(auto-fit, minmax(180px, 1fr)); gap: .8rem; }
+  .kpi { background: #f0f2f6; border-radius: 10px; padding: .8rem 1rem; }
+  .kpi span { display: block; color: #555; font-size: .85rem; }
+  .kpi strong { font-size: 1.35rem; }
+  .graficos { display: grid; grid-template-columns: repeat(auto-fit, minmax(420px, 1fr)); gap: 1rem; }
+  .grafico { background: #fff; border-radius: 8px; margin-top: 1rem; }
+  h2 { font-size: 1.2rem; margin: 1.4rem 0 .4rem; }
+  table { border-collapse: collapse; width: 100%; background: #fff; font-size: .9rem; }
+  th, td { padding: .35rem .6rem; border-bottom: 1px solid #eee; text-align: left; }
+  td.num, th.num { text-align: right; }
+  .nota { color: #666; font-size: .85rem; }
+</style>
+<script>__PLOTLY__</script>
+</head>
+<body>
+<header><h1>__TITULO__</h1><p>__SUBTITULO__</p></header>
+<main>
+  <aside>
+    <h3>🔍 Filtros</h3>
+    <input type="search" id="busca" placeholder="Buscar (centro, especificação, categoria)">
+    <div id="filtros"></div>
+    <button id="limpar">🔄 Limpar filtros</button>
+    <p class="nota">Clique em uma fatia ou barra dos gráficos para filtrar.</p>
+  </aside>
+  <section>
+    <div class="kpis" id="kpis"></div>
+    <div class="grafico" id="grafico_periodos"></div>
+    <div class="graficos" id="graficos"></div>
+    <div id="tabelas"></div>
+  </section>
+</main>
+<script type="application/json" id="dados">__DADOS__</script>
+<script>
+(function () {
+  const DADOS = JSON.parse(document.getElementById('dados').textContent);
+  const CORES = { entrada: '#2ecc71', saida: '#e74c3c' };
+  const moeda = new Intl.NumberFormat('pt-BR', { style: 'currency', currency: 'BRL' });
+  const inteiro = new Intl.NumberFormat('pt-BR');
+  const real = c => moeda.format(c / 100);
+  const normalizar = t => t.normalize('NFD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+  const rotuloPeriodo = {};
+  DADOS.periodos.forEach(p => { rotuloPeriodo[p.codigo] = p.rotulo; });
+
+  // Estado dos filtros: períodos marcados e, por série, a 1ª dimensão marcada
+  const estado = { periodos: new Set(), grupos: DADOS.series.map(() => new Set()), busca: '' };
+  // Rótulos já normalizados para a busca
+  const busca = DADOS.series.map(s => s.rotulos.map(r => r.map(normalizar)));
+
+  function caixa(texto, aoMudar) {
+    const rotulo = document.createElement('label');
+    const entrada = document.createElement('input');
+    entrada.type = 'checkbox';
+    entrada.addEventListener('change', () => aoMudar(entrada.checked));
+    rotulo.appendChild(entrada);
+    rotulo.appendChild(document.createTextNode(' ' + texto));
+    return [rotulo, entrada];
+  }
+
+  function bloco(titulo, itens, conjunto) {
+    const detalhes = document.createElement('details');
+    const resumo = document.createElement('summary');
+    resumo.textContent = titulo;
+    detalhes.appendChild(resumo);
+    const lista = document.createElement('div');
+    lista.className = 'lista';
+    itens.forEach(([valor, texto]) => {
+      const [rotulo, entrada] = caixa(texto, marcado => {
+        if (marcado) conjunto.add(valor); else conjunto.delete(valor);
+        desenhar();
+      });
+      entrada.dataset.valor = valor;
+      lista.appendChild(rotulo);
+    });
+    detalhes.appendChild(lista);
+    return detalhes;
+  }
+
+  const filtros = document.getElementById('filtros');
+  filtros.appendChild(bloco('📅 ' + DADOS.periodo, DADOS.periodos.map(p => [p.codigo, p.rotulo]), estado.periodos));
+  DADOS.series.forEach((s, i) => {
+    filtros.appendChild(bloco(s.nome + ': ' + s.dimensoes[0], s.rotulos[0].map((r, c) => [c, r]), estado.grupos[i]));
+  });
+
+  function sincronizarCaixas() {
+    const conjuntos = [estado.periodos].concat(estado.grupos);
+    filtros.querySelectorAll('details').forEach((d, i) => {
+      d.querySelectorAll('input').forEach(e => { e.checked = conjuntos[i].has(Number(e.dataset.valor)); });
+    });
+  }
+
+  // Linhas de uma série que passam nos filtros
+  function linhas(i) {
+    const s = DADOS.series[i];
+    const termo = normalizar(estado.busca.trim());
+    const grupos = estado.grupos[i];
+    const resultado = [];
+    for (let k = 0; k < s.p.length; k++) {
+      if (estado.periodos.size && !estado.periodos.has(s.p[k])) continue;
+      if (grupos.size && !grupos.has(s.codigos[0][k])) continue;
+      if (termo && !s.codigos.some((cods, d) => busca[i][d][cods[k]].includes(termo))) continue;
+      resultado.push(k);
+    }
+    return resultado;
+  }
+
+  function somarPor(s, selecao, chave) {
+    const totais = new Map();
+    selecao.forEach(k => {
+      const c = chave(k);
+      const atual = totais.get(c) || [0, 0];
+      atual[0] += s.v[k];
+      atual[1] += s.n[k];
+      totais.set(c, atual);
+    });
+    return totais;
+  }
+
+  function kpi(rotulo, valor) {
+    return '<div class="kpi"><span>' + rotulo + '</span><strong>' + valor + '</strong></div>';
+  }
+
+  function escapar(texto) {
+    return String(texto).replace(/[&<>"]/g, c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;' }[c]));
+  }
+
+  const primeiro = v => (Array.isArray(v) ? v[0] : v);
+
+  function alternar(conjunto, valor) {
+    if (conjunto.has(valor)) conjunto.delete(valor); else conjunto.add(valor);
+    sincronizarCaixas();
+    desenhar();
+  }
+
+  function desenhar() {
+    const selecoes = DADOS.series.map((_, i) => linhas(i));
+    const totais = DADOS.series.map((s, i) => selecoes[i].reduce((a, k) => a + s.v[k], 0));
+    const quantidades = DADOS.series.map((s, i) => selecoes[i].reduce((a, k) => a + s.n[k], 0));
+
+    // Indicadores
+    let html = '';
+    DADOS.series.forEach((s, i) => {
+      html += kpi((s.papel === 'entrada' ? '💵 ' : '💸 ') + 'Total ' + s.nome, real(totais[i]));
+      html += kpi('📝 Lançamentos (' + s.nome + ')', inteiro.format(quantidades[i]));
+    });
+    const entrada = DADOS.series.findIndex(s => s.papel === 'entrada');
+    const saida = DADOS.series.findIndex(s => s.papel === 'saida');
+    if (entrada >= 0 && saida >= 0) html += kpi('📊 Saldo', real(totais[entrada] - totais[saida]));
+    document.getElementById('kpis').innerHTML = html;
+
+    // Comparativo por período
+    const codigos = DADOS.periodos.map(p => p.codigo);
+    const tracos = DADOS.series.map((s, i) => {
+      const porPeriodo = somarPor(s, selecoes[i], k => s.p[k]);
+      return {
+        type: 'bar', name: s.nome, marker: { color: CORES[s.papel] },
+        x: codigos.map(c => rotuloPeriodo[c]), y: codigos.map(c => (porPeriodo.get(c) || [0])[0] / 100),
+        customdata: codigos, hovertemplate: '<b>%{x}</b><br>' + s.nome + ': R$ %{y:,.2f}<extra></extra>'
+      };
+    });
+    if (entrada >= 0 && saida >= 0) {
+      tracos.push({
+        type: 'scatter', mode: 'lines+markers', name: 'Saldo', x: tracos[0].x, customdata: codigos,
+        y: tracos[entrada].y.map((v, k) => v - tracos[saida].y[k]),
+        line: { color: '#3498db', width: 3 }, hovertemplate: '<b>%{x}</b><br>Saldo: R$ %{y:,.2f}<extra></extra>'
+      });
+    }
+    Plotly.react('grafico_periodos', tracos, {
+      title: 'Comparativo por ' + DADOS.periodo, barmode: 'group', height: 420,
+      legend: { orientation: 'h', y: 1.1 }, yaxis: { title: 'Valor (R$)', separatethousands: true },
+      separators: ',.'
+    }, { responsive: true, displaylogo: false });
+
+    // Por série: distribuição pela 1ª dimensão e top 10 pela última
+    const graficos = document.getElementById('graficos');
+    const tabelas = document.getElementById('tabelas');
+    graficos.innerHTML = '';
+    tabelas.innerHTML = '';
+    DADOS.series.forEach((s, i) => {
+      const porGrupo = [...somarPor(s, selecoes[i], k => s.codigos[0][k]).entries()].sort((a, b) => b[1][0] - a[1][0]);
+      const pizza = document.createElement('div');
+      pizza.className = 'grafico';
+      graficos.appendChild(pizza);
+      Plotly.newPlot(pizza, [{
+        type: 'pie', hole: 0.4, textinfo: 'percent', textposition: 'inside',
+        labels: porGrupo.map(([c]) => s.rotulos[0][c]), values: porGrupo.map(([, t]) => t[0] / 100),
+        customdata: porGrupo.map(([c]) => c),
+        hovertemplate: '<b>%{label}</b><br>R$ %{value:,.2f}<br>%{percent}<extra></extra>'
+      }], { title: s.nome + ' por ' + s.dimensoes[0], height: 400, separators: ',.' },
+      { responsive: true, displaylogo: false });
+      pizza.on('plotly_click', e => alternar(estado.grupos[i], primeiro(e.points[0].customdata)));
+
+      const ultima = s.dimensoes.length - 1;
+      if (ultima > 0) {
+        const top = [...somarPor(s, selecoes[i], k => s.codigos[ultima][k]).entries()]
+          .sort((a, b) => b[1][0] - a[1][0]).slice(0, 10).reverse();
+        const barras = document.createElement('div');
+        barras.className = 'grafico';
+        graficos.appendChild(barras);
+        Plotly.newPlot(barras, [{
+          type: 'bar', orientation: 'h', marker: { color: CORES[s.papel] },
+          y: top.map(([c]) => s.rotulos[ultima][c].slice(0, 50)), x: top.map(([, t]) => t[0] / 100),
+          hovertemplate: '<b>%{y}</b><br>R$ %{x:,.2f}<extra></extra>'
+        }], { title: 'Top 10 ' + s.nome + ' por ' + s.dimensoes[ultima], height: 400, separators: ',.',
+              margin: { l: 260 } }, { responsive: true, displaylogo: false });
+      }
+
+      // Tabela resumo pela 1ª dimensão
+      const total = totais[i] || 1;
+      let tabela = '<h2>📋 ' + escapar(s.nome) + ' por ' + escapar(s.dimensoes[0]) + '</h2><table><tr><th>' +
+        escapar(s.dimensoes[0]) + '</th><th class="num">Lançamentos</th><th class="num">Total</th>' +
+        '<th class="num">% do Total</th></tr>';
+      porGrupo.forEach(([c, t]) => {
+        tabela += '<tr><td>' + escapar(s.rotulos[0][c]) + '</td><td class="num">' + inteiro.format(t[1]) +
+          '</td><td class="num">' + real(t[0]) + '</td><td class="num">' +
+          (t[0] / total * 100).toFixed(1).replace('.', ',') + '%</td></tr>';
+      });
+      tabelas.insertAdjacentHTML('beforeend', tabela + '</table>');
+    });
+  }
+
+  document.getElementById('busca').addEventListener('input', e => { estado.busca = e.target.value; desenhar(); });
+  document.getElementById('limpar').addEventListener('click', () => {
+    estado.periodos.clear();
+    estado.grupos.forEach(g => g.clear());
+    estado.busca = '';
+    document.getElementById('busca').value = '';
+    sincronizarCaixas();
+    desenhar();
+  });
+
+  desenhar();
+  document.getElementById('grafico_periodos').on('plotly_click', e => {
+    alternar(estado.periodos, primeiro(e.points[0].customdata));
+  });
+})();
+</script>
+</body>
+</html>
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta os dashboards IPB para HTML estático")
+    parser.add_argument('painel', help="'anual' ou o mês do painel mensal (ex.: dez)")
+    parser.add_argument('--saida', metavar='ARQUIVO', help="arquivo de saída (padrão: painel_<painel>.html)")
+    opcoes = parser.parse_args()
+
+    import dados
+
+    if opcoes.painel == 'anual':
+        # Só as colunas usadas no painel são lidas da fonte
+        df_despesas, _ = dados.consultar_despesas(colunas=['Centro de Custo', 'Especificação'])
+        df_receitas, _ = dados.carregar_receitas()
+        conteudo = html_anual(df_despesas, df_receitas)
+    elif opcoes.painel in dados.listar_meses_mensais():
+        df_entradas, _ = dados.carregar_entradas(opcoes.painel)
+        df_saidas, _ = dados.carregar_saidas(opcoes.painel)
+        rotulo = NOMES_MESES.get(dados.ORDEM_MESES.index(opcoes.painel) + 1, opcoes.painel) \
+            if opcoes.painel in dados.ORDEM_MESES else opcoes.painel
+        conteudo = html_mensal(rotulo, df_entradas, df_saidas)
+    else:
+        print(f"Painel desconhecido: {opcoes.painel} (use 'anual' ou um mês de mensal/)", file=sys.stderr)
+        return 1
+
+    destino = Path(opcoes.saida or f"painel_{opcoes.painel}.html")
+    destino.write_text(conteudo, encoding='utf-8')
+    print(f"{destino} ({destino.stat().st_size / 1024**2:.1f} MB)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
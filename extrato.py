@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+from cache_limitado import cache
+
+# Extrato por conta (ou por forma de pagamento): movimento diário de entradas
+# menos saídas e saldo acumulado a partir do saldo inicial de cada conta.
+#
+# Cada mês é agrupado por (chave, dia) com códigos inteiros: a chave é
+# fatorada, o dia vira o número de dias desde 1970 e as linhas são ordenadas
+# pelas duas (lexsort). Os totais de cada (chave, dia) saem de somas
+# acumuladas nas fronteiras dos grupos, e o saldo é a soma acumulada do
+# líquido dentro de cada chave, mais o saldo de abertura do mês.
+#
+# O resultado de cada mês (linhas do extrato e saldo de fechamento por chave)
+# fica no cache, chaveado pela versão do mês (impressão digital dos arquivos,
+# ver repositorio.py) e pelas dos meses anteriores. Um mês só é lido quando o
+# seu passo não está no cache: um mês novo parte do fechamento do anterior e
+# só soma os próprios lançamentos, sem reler nem refazer os já calculados.
+
+CHAVES_EXTRATO = ['Conta', 'Forma de Pagamento']
+SEM_CHAVE = '(não informada)'
+COLUNAS_EXTRATO = ['Data', 'Entradas', 'Saídas', 'Líquido', 'Saldo']
+
+
+# Lançamentos do mês como (chave, dia, centavos com sinal)
+def _lancamentos(df, chave, sinal):
+    if df is None or df.empty or 'Data Lançamento' not in df.columns:
+        return pd.DataFrame({'Chave': pd.Series(dtype=object), 'Dia': pd.Series(dtype='int64'),
+                             'Centavos': pd.Series(dtype='int64')})
+    nomes = df[chave].astype('string').str.strip() if chave in df.columns else pd.Series(pd.NA, index=df.index)
+    datas = pd.to_datetime(df['Data Lançamento'], errors='coerce')
+    validas = datas.notna().to_numpy()
+    return pd.DataFrame({
+        'Chave': nomes.fillna(SEM_CHAVE).replace('', SEM_CHAVE).astype(object).to_numpy()[validas],
+        'Dia': datas[validas].to_numpy().astype('datetime64[D]').astype('int64'),
+        'Centavos': sinal * df['Centavos'].to_numpy(dtype='int64')[validas],
+    })
+
+
+# Movimento de um mês por (chave, dia), ordenado por chave e data
+def movimento_diario(entradas, saidas, chave='Conta'):
+    lancamentos = pd.concat([_lancamentos(entradas, chave, 1), _lancamentos(saidas, chave, -1)],
+                            ignore_index=True)
+    codigos, nomes = pd.factorize(lancamentos['Chave'], sort=True)
+    dias = lancamentos['Dia'].to_numpy()
+    centavos = lancamentos['Centavos'].to_numpy()
+    ordem = np.lexsort((dias, codigos))
+    codigos, dias, centavos = codigos[ordem], dias[ordem], centavos[ordem]
+
+    # Fronteiras dos grupos (chave, dia) na ordem
+    inicio = np.ones(len(ordem), dtype=bool)
+    inicio[1:] = (codigos[1:] != codigos[:-1]) | (dias[1:] != dias[:-1])
+    posicoes = np.flatnonzero(inicio)
+    entradas_grupo = np.add.reduceat(np.where(centavos > 0, centavos, 0), posicoes) if len(posicoes) else centavos
+    saidas_grupo = np.add.reduceat(np.where(centavos < 0, -centavos, 0), posicoes) if len(posicoes) else centavos
+
+    return pd.DataFrame({
+        chave: np.asarray(nomes, dtype=object)[codigos[posicoes]],
+        'Data': dias[posicoes].astype('datetime64[D]').astype('datetime64[ns]'),
+        'Entradas': entradas_grupo.astype('int64'),
+        'Saídas': saidas_grupo.astype('int64'),
+    }).assign(Líquido=lambda m: m['Entradas'] - m['Saídas'])
+
+
+# Saldo diário de um mês a partir da abertura ({chave: centavos}); devolve
+# as linhas do extrato e o fechamento por chave
+def _extrato_mes(movimento, chave, abertura):
+    liquido = movimento['Líquido'].to_numpy(dtype='int64')
+    chaves = movimento[chave].to_numpy()
+    nova = np.ones(len(movimento), dtype=bool)
+    nova[1:] = chaves[1:] != chaves[:-1]
+    # Soma acumulada de cada chave: acumulado total menos o acumulado até o
+    # início do grupo
+    acumulado = np.cumsum(liquido)
+    inicios = np.flatnonzero(nova)
+    base = np.repeat(acumulado[inicios] - liquido[inicios], np.diff(np.r_[inicios, len(movimento)]))
+    saldo_inicial = pd.Series(chaves).map(abertura).fillna(0).to_numpy(dtype='int64')
+    linhas = movimento.assign(Saldo=saldo_inicial + acumulado - base)
+
+    fechamento = dict(abertura)
+    ultimas = np.r_[inicios[1:] - 1, len(movimento) - 1] if len(inicios) else inicios
+    fechamento.update(zip(chaves[ultimas], linhas['Saldo'].to_numpy()[ultimas].tolist()))
+    return linhas, fechamento
+
+
+# Extrato dos meses em ordem: lista de (rótulo, versão, carregar), em que
+# carregar() devolve (entradas, saídas) e só é chamado quando o mês não está
+# no cache. saldos_iniciais: DataFrame (Conta, Centavos), usado só com chave
+# 'Conta'. Retorna as linhas do extrato (com a coluna 'Mês') e o saldo final
+# por chave.
+def extrato(meses, chave='Conta', saldos_iniciais=None):
+    abertura = {}
+    if chave == 'Conta' and saldos_iniciais is not None and not saldos_iniciais.empty:
+        abertura = dict(zip(saldos_iniciais['Conta'], saldos_iniciais['Centavos'].astype('int64').tolist()))
+
+    # A chave de cada mês encadeia as versões dos meses anteriores
+    chave_estado = ('extrato', chave, tuple(sorted(abertura.items())))
+    fechamento, partes = abertura, []
+    for rotulo, versao, carregar in meses:
+        chave_estado = (chave_estado, rotulo, versao)
+        linhas, fechamento = cache.obter_ou_calcular(
+            chave_estado, 'agregados',
+            lambda: _extrato_mes(movimento_diario(*carregar(), chave), chave, fechamento)
+        )
+        partes.append(linhas.assign(Mês=rotulo))
+
+    if not partes:
+        return pd.DataFrame(columns=[chave] + COLUNAS_EXTRATO + ['Mês']), fechamento
+    return pd.concat(partes, ignore_index=True), fechamento
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+# Índice de facetas para filtros em cascata.
+# Cada dimensão (Centro de Custo, Especificação, Mês...) é codificada uma vez
+# em inteiros. Com isso, a máscara de um filtro é uma consulta a uma tabela
+# pequena, e as contagens e totais de cada faceta saem de um np.bincount
+# sobre as linhas que passam pelos *outros* filtros, sem refiltrar o DataFrame.
+# Valores e totais ficam em centavos inteiros (coluna 'Centavos').
+
+
+class IndiceFacetas:
+    def __init__(self, df, dimensoes, coluna_valor='Centavos'):
+        self.dimensoes = [dim for dim in dimensoes if dim in df.columns]
+        self.tamanho = len(df)
+        self.valores = df[coluna_valor].to_numpy(dtype='int64') if len(df) > 0 else np.zeros(0, dtype='int64')
+        self._codigos = {}
+        self._rotulos = {}
+        self._posicoes = {}
+
+        for dim in self.dimensoes:
+            codigos, rotulos = pd.factorize(df[dim], sort=True)
+            # Código 0 fica reservado para valores vazios (NaN)
+            self._codigos[dim] = codigos.astype('int64') + 1
+            self._rotulos[dim] = rotulos
+            self._posicoes[dim] = {rotulo: i + 1 for i, rotulo in enumerate(rotulos)}
+
+    def rotulos(self, dim):
+        return self._rotulos[dim].tolist()
+
+    # Máscara das linhas cujo valor em `dim` está (ou não está) em `selecionados`
+    def mascara(self, dim, selecionados, excluir=False):
+        tabela = np.zeros(len(self._rotulos[dim]) + 1, dtype=bool)
+        posicoes = [self._posicoes[dim][v] for v in selecionados if v in self._posicoes[dim]]
+        tabela[posicoes] = True
+        if excluir:
+            tabela = ~tabela
+        return tabela[self._codigos[dim]]
+
+    # filtros: {dim: {'incluir': [...], 'excluir': [...]}}
+    def _mascaras_por_dimensao(self, filtros):
+        mascaras = {}
+        for dim in self.dimensoes:
+            filtro = filtros.get(dim) or {}
+            mascara = None
+            if filtro.get('incluir'):
+                mascara = self.mascara(dim, filtro['incluir'])
+            if filtro.get('excluir'):
+                excluir = self.mascara(dim, filtro['excluir'], excluir=True)
+                mascara = excluir if mascara is None else mascara & excluir
+            mascaras[dim] = mascara
+        return mascaras
+
+    # Máscara final com todos os filtros aplicados
+    def filtrar(self, filtros, base=None):
+        mascara = np.ones(self.tamanho, dtype=bool) if base is None else base.copy()
+        for parcial in self._mascaras_por_dimensao(filtros).values():
+            if parcial is not None:
+                mascara &= parcial
+        return mascara
+
+    # Contagem e total por opção de cada dimensão, considerando os filtros das
+    # demais dimensões. As máscaras "todas menos uma" saem de produtos de
+    # prefixo/sufixo, então o custo cresce linearmente com o número de dimensões.
+    def contar(self, filtros, base=None):
+        mascaras = self._mascaras_por_dimensao(filtros)
+        todas = np.ones(self.tamanho, dtype=bool) if base is None else base
+        ordem = self.dimensoes
+
+        prefixos = [todas]
+        for dim in ordem[:-1]:
+            parcial = mascaras[dim]
+            prefixos.append(prefixos[-1] if parcial is None else prefixos[-1] & parcial)
+
+        resultado = {}
+        sufixo = None
+        for i in range(len(ordem) - 1, -1, -1):
+            dim = ordem[i]
+            outras = prefixos[i] if sufixo is None else prefixos[i] & sufixo
+
+            codigos = self._codigos[dim][outras]
+            tamanho = len(self._rotulos[dim]) + 1
+            quantidade = np.bincount(codigos, minlength=tamanho)[1:]
+            # Somas de inteiros em float64 são exatas até 2^53 centavos
+            total = np.bincount(codigos, weights=self.valores[outras], minlength=tamanho)[1:].astype('int64')
+            resultado[dim] = pd.DataFrame(
+                {'Quantidade': quantidade, 'Total': total},
+                index=self._rotulos[dim]
+            )
+
+            parcial = mascaras[dim]
+            if parcial is not None:
+                sufixo = parcial if sufixo is None else sufixo & parcial
+        return resultado
+
+
+# Opções de um filtro: só as que ainda têm lançamentos, mais as já selecionadas
+# (o widget não pode perder um valor escolhido)
+def opcoes_faceta(contagem, selecionados, ordem=None):
+    disponiveis = set(contagem.index[contagem['Quantidade'] > 0]) | set(selecionados)
+    if ordem is None:
+        ordem = contagem.index
+    return [opcao for opcao in ordem if opcao in disponiveis]
@@ -0,0 +1,386 @@
+import argparse
+import os
+import re
+import sqlite3
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from arvore_receitas import ler_negrito
+
+# Fontes de dados dos dashboards.
+# A camada de dados pede tabelas lógicas ('despesas', 'receitas', 'entradas'
+# e 'saidas') a uma fonte, que sabe onde e como elas estão gravadas:
+#   - xlsx:    as planilhas de sempre (despesas-anual.xlsx, mensal/dez-saidas.xlsx...)
+#   - csv:     um diretório com despesas.csv (ou despesas/MM-AAAA.csv, um por
+#              mês), receitas.csv e mensal/<mes>-<tipo>.csv
+#   - parquet: um diretório com despesas.parquet (ou o conjunto despesas/),
+#              receitas.parquet e os conjuntos entradas/ e saidas/
+#              (partições hive, ex.: saidas/mes=dez/)
+#   - sqlite:  a exportação do sistema contábil, com as tabelas despesas,
+#              receitas, entradas e saidas (as mensais com a coluna 'mes')
+#
+# Toda leitura aceita projeção (colunas) e filtros {coluna: [valores]}. Cada
+# fonte empurra o que consegue para a leitura: partições e arquivos são
+# descartados pelo mês, o Parquet filtra por grupo de linhas e o SQLite no
+# WHERE. O que sobra é filtrado depois, então o resultado é o mesmo em
+# qualquer fonte. Escolha da fonte: variável IPB_FONTE (ex.: parquet:/dados).
+
+# Coluna de partição das tabelas mensais (valores 'jan' ... 'dez')
+PARTICAO_MENSAL = 'mes'
+TABELAS_MENSAIS = ('entradas', 'saidas')
+TABELAS = ('despesas', 'receitas') + TABELAS_MENSAIS
+
+# Linhas por grupo nos Parquet gravados pela conversão
+TAMANHO_GRUPO_PARQUET = 5000
+
+# Arquivos por mês das despesas em CSV: 03-2025.csv <-> '03/2025'
+PADRAO_ARQUIVO_MES = re.compile(r'^(\d{2})-(\d{4})$')
+
+
+def _valores(filtros, coluna):
+    valores = (filtros or {}).get(coluna)
+    return list(valores) if valores else None
+
+
+# Colunas a ler: as pedidas mais as usadas nos filtros aplicados depois
+def _colunas_leitura(colunas, filtros):
+    if colunas is None:
+        return None
+    extras = [coluna for coluna, valores in (filtros or {}).items()
+              if valores and coluna not in colunas and coluna != PARTICAO_MENSAL]
+    return list(colunas) + extras
+
+
+# Filtros e projeção aplicados depois da leitura (o que a fonte não empurrou)
+def _filtrar(df, filtros, colunas=None):
+    for coluna, valores in (filtros or {}).items():
+        if valores and coluna in df.columns:
+            df = df[df[coluna].isin(list(valores))]
+    if colunas is not None:
+        df = df[[coluna for coluna in colunas if coluna in df.columns]]
+    return df.reset_index(drop=True)
+
+
+class Fonte:
+    # Diretórios observados recursivamente pelo monitor de arquivos
+    recursivo = False
+
+    # Lê uma tabela lógica com projeção e filtros
+    def ler(self, tabela, colunas=None, filtros=None):
+        raise NotImplementedError
+
+    # Arquivos de que a tabela depende (a versão dos dados vem deles)
+    def arquivos(self, tabela, filtros=None):
+        raise NotImplementedError
+
+    def diretorios(self):
+        raise NotImplementedError
+
+    # Meses com dados mensais (prefixos 'jan' ... 'dez')
+    def meses_mensais(self):
+        raise NotImplementedError
+
+    # Negrito da coluna de rótulos das receitas (só existe nas planilhas)
+    def negrito(self, tabela):
+        return None
+
+    # Rótulo da origem de uma tabela (ex.: na quarentena do dashboard);
+    # filtros de partição restringem aos arquivos lidos (ex.: um mês)
+    def descrever(self, tabela, filtros=None):
+        arquivos = self.arquivos(tabela, filtros)
+        if len(arquivos) == 1:
+            return arquivos[0].name
+        return f"{tabela}: {len(arquivos)} arquivos"
+
+
+class FonteExcel(Fonte):
+    def __init__(self, diretorio):
+        self.diretorio = Path(diretorio)
+        self.mensal = self.diretorio / "mensal"
+
+    def _caminhos(self, tabela, filtros=None):
+        if tabela == 'despesas':
+            return [self.diretorio / "despesas-anual.xlsx"]
+        if tabela == 'receitas':
+            return [self.diretorio / "receitas-anual.xlsx"]
+        meses = _valores(filtros, PARTICAO_MENSAL) or self.meses_mensais()
+        return [self.mensal / f"{mes}-{tabela}.xlsx" for mes in meses]
+
+    # O Excel não tem leitura parcial de linhas: só as colunas são projetadas
+    def ler(self, tabela, colunas=None, filtros=None):
+        leitura = _colunas_leitura(colunas, filtros)
+        partes = [
+            pd.read_excel(caminho, usecols=(lambda coluna: coluna in leitura) if leitura is not None else None)
+            for caminho in self._caminhos(tabela, filtros) if caminho.exists()
+        ]
+        if not partes:
+            return pd.DataFrame()
+        df = partes[0] if len(partes) == 1 else pd.concat(partes, ignore_index=True)
+        return _filtrar(df, filtros, colunas)
+
+    def arquivos(self, tabela, filtros=None):
+        return self._caminhos(tabela, filtros)
+
+    def diretorios(self):
+        return [self.diretorio, self.mensal]
+
+    def meses_mensais(self):
+        if not self.mensal.exists():
+            return []
+        return [arquivo.stem.replace("-entradas", "") for arquivo in self.mensal.glob("*-entradas.xlsx")]
+
+    def negrito(self, tabela):
+        caminho = self._caminhos(tabela)[0]
+        return ler_negrito(caminho) if caminho.exists() else None
+
+
+class FonteCSV(Fonte):
+    recursivo = True
+    TAMANHO_BLOCO = 50000
+
+    def __init__(self, diretorio):
+        self.diretorio = Path(diretorio)
+        self.mensal = self.diretorio / "mensal"
+
+    # Despesas: um arquivo só ou um por mês; com filtro de mês, os arquivos
+    # de outros meses nem são abertos
+    def _caminhos(self, tabela, filtros=None):
+        if tabela == 'despesas':
+            particionado = self.diretorio / "despesas"
+            if not particionado.is_dir():
+                return [self.diretorio / "despesas.csv"]
+            meses = _valores(filtros, 'Mês Ano Ref.')
+            caminhos = []
+            for arquivo in sorted(particionado.glob("*.csv")):
+                encontrado = PADRAO_ARQUIVO_MES.match(arquivo.stem)
+                if meses is None or encontrado is None or f"{encontrado[1]}/{encontrado[2]}" in meses:
+                    caminhos.append(arquivo)
+            return caminhos
+        if tabela == 'receitas':
+            return [self.diretorio / "receitas.csv"]
+        meses = _valores(filtros, PARTICAO_MENSAL) or self.meses_mensais()
+        return [self.mensal / f"{mes}-{tabela}.csv" for mes in meses]
+
+    # Leitura em blocos: cada bloco já sai filtrado, então a memória fica
+    # proporcional ao resultado, não ao arquivo
+    def _ler_arquivo(self, caminho, leitura, filtros, colunas):
+        with open(caminho, encoding='utf-8-sig') as arquivo:
+            separador = ';' if ';' in arquivo.readline() else ','
+        blocos = pd.read_csv(caminho, sep=separador, encoding='utf-8-sig', chunksize=self.TAMANHO_BLOCO,
+                             usecols=(lambda coluna: coluna in leitura) if leitura is not None else None)
+        return [_filtrar(bloco, filtros, colunas) for bloco in blocos]
+
+    def ler(self, tabela, colunas=None, filtros=None):
+        leitura = _colunas_leitura(colunas, filtros)
+        partes = []
+        for caminho in self._caminhos(tabela, filtros):
+            if caminho.exists():
+                partes += self._ler_arquivo(caminho, leitura, filtros, colunas)
+        if not partes:
+            return pd.DataFrame()
+        return pd.concat(partes, ignore_index=True)
+
+    def arquivos(self, tabela, filtros=None):
+        return self._caminhos(tabela, filtros)
+
+    def diretorios(self):
+        return [self.diretorio]
+
+    def meses_mensais(self):
+        if not self.mensal.exists():
+            return []
+        return [arquivo.stem.replace("-entradas", "") for arquivo in self.mensal.glob("*-entradas.csv")]
+
+
+# O Parquet depende do pyarrow; sem ele a falha aparece ao escolher a fonte,
+# com a instrução de instalação, e não na primeira leitura
+def _exigir_pyarrow():
+    try:
+        import pyarrow.dataset
+    except ImportError as erro:
+        raise ImportError("A fonte Parquet precisa do pacote pyarrow (pip install pyarrow)") from erro
+
+
+class FonteParquet(Fonte):
+    recursivo = True
+
+    def __init__(self, diretorio):
+        _exigir_pyarrow()
+        self.diretorio = Path(diretorio)
+
+    def _caminho(self, tabela):
+        pasta = self.diretorio / tabela
+        return pasta if pasta.is_dir() else self.diretorio / f"{tabela}.parquet"
+
+    # Projeção e filtros vão para o pyarrow: partições fora do filtro não são
+    # abertas e grupos de linhas são descartados pelas estatísticas
+    def ler(self, tabela, colunas=None, filtros=None):
+        import pyarrow.dataset as ds
+
+        caminho = self._caminho(tabela)
+        if not caminho.exists():
+            return pd.DataFrame()
+        conjunto = ds.dataset(caminho, format='parquet', partitioning='hive')
+        nomes = conjunto.schema.names
+
+        expressao = None
+        for coluna, valores in (filtros or {}).items():
+            if valores and coluna in nomes:
+                condicao = ds.field(coluna).isin(list(valores))
+                expressao = condicao if expressao is None else expressao & condicao
+        if colunas is None:
+            projecao = [nome for nome in nomes if nome != PARTICAO_MENSAL]
+        else:
+            projecao = [coluna for coluna in colunas if coluna in nomes]
+        df = conjunto.to_table(columns=projecao, filter=expressao).to_pandas()
+        return _filtrar(df, {c: v for c, v in (filtros or {}).items() if c not in nomes}, colunas)
+
+    def arquivos(self, tabela, filtros=None):
+        caminho = self._caminho(tabela)
+        if caminho.is_dir():
+            meses = _valores(filtros, PARTICAO_MENSAL) if tabela in TABELAS_MENSAIS else None
+            pastas = [caminho / f"{PARTICAO_MENSAL}={mes}" for mes in meses] if meses else [caminho]
+            return sorted(arquivo for pasta in pastas if pasta.is_dir() for arquivo in pasta.rglob("*.parquet"))
+        return [caminho]
+
+    def diretorios(self):
+        return [self.diretorio]
+
+    def meses_mensais(self):
+        pasta = self._caminho('entradas')
+        if pasta.is_dir():
+            prefixo = f"{PARTICAO_MENSAL}="
+            return [sub.name[len(prefixo):] for sub in pasta.iterdir() if sub.is_dir() and sub.name.startswith(prefixo)]
+        if pasta.exists():
+            return self.ler('entradas', [PARTICAO_MENSAL])[PARTICAO_MENSAL].dropna().unique().tolist()
+        return []
+
+
+class FonteSQLite(Fonte):
+    def __init__(self, arquivo):
+        self.arquivo = Path(arquivo)
+
+    def _conectar(self):
+        return sqlite3.connect(f"file:{self.arquivo}?mode=ro", uri=True)
+
+    @staticmethod
+    def _nome(identificador):
+        return '"' + str(identificador).replace('"', '""') + '"'
+
+    # Projeção no SELECT e filtros no WHERE (com parâmetros)
+    def ler(self, tabela, colunas=None, filtros=None):
+        if tabela not in TABELAS or not self.arquivo.exists():
+            return pd.DataFrame()
+        with self._conectar() as conexao:
+            nomes = [linha[1] for linha in conexao.execute(f"PRAGMA table_info({self._nome(tabela)})")]
+            if not nomes:
+                return pd.DataFrame()
+            if colunas is None:
+                projecao = [nome for nome in nomes if not (tabela in TABELAS_MENSAIS and nome == PARTICAO_MENSAL)]
+            else:
+                projecao = [coluna for coluna in colunas if coluna in nomes]
+            condicoes, parametros = [], []
+            for coluna, valores in (filtros or {}).items():
+                if valores and coluna in nomes:
+                    condicoes.append(f"{self._nome(coluna)} IN ({', '.join('?' for _ in valores)})")
+                    parametros += list(valores)
+            consulta = f"SELECT {', '.join(self._nome(c) for c in projecao) or '*'} FROM {self._nome(tabela)}"
+            if condicoes:
+                consulta += " WHERE " + " AND ".join(condicoes)
+            return pd.read_sql_query(consulta, conexao, params=parametros)
+
+    def arquivos(self, tabela, filtros=None):
+        return [self.arquivo]
+
+    def diretorios(self):
+        return [self.arquivo.parent]
+
+    def meses_mensais(self):
+        if not self.arquivo.exists():
+            return []
+        try:
+            with self._conectar() as conexao:
+                linhas = conexao.execute(f"SELECT DISTINCT {self._nome(PARTICAO_MENSAL)} FROM entradas").fetchall()
+        except sqlite3.OperationalError:
+            return []
+        return [linha[0] for linha in linhas if linha[0]]
+
+
+TIPOS = {'xlsx': FonteExcel, 'csv': FonteCSV, 'parquet': FonteParquet, 'sqlite': FonteSQLite}
+
+
+# 'tipo:caminho' (ex.: 'sqlite:/dados/contabil.db'); sem valor, as planilhas
+# xlsx do diretório do projeto
+def criar_fonte(especificacao, diretorio_padrao):
+    if not especificacao:
+        return FonteExcel(diretorio_padrao)
+    tipo, _, caminho = especificacao.partition(':')
+    if tipo not in TIPOS:
+        raise ValueError(f"Fonte desconhecida: {tipo} (use {', '.join(TIPOS)})")
+    return TIPOS[tipo](Path(caminho) if caminho else Path(diretorio_padrao))
+
+
+# Grava as tabelas de uma fonte em outro formato (ex.: para gerar um
+# diretório Parquet a partir das planilhas)
+def converter(origem, tipo, destino):
+    destino = Path(destino)
+    if tipo == 'parquet':
+        _exigir_pyarrow()
+    meses = origem.meses_mensais()
+    if tipo == 'sqlite':
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        with sqlite3.connect(destino) as conexao:
+            origem.ler('despesas').to_sql('despesas', conexao, if_exists='replace', index=False)
+            origem.ler('receitas').to_sql('receitas', conexao, if_exists='replace', index=False)
+            for tabela in TABELAS_MENSAIS:
+                partes = [origem.ler(tabela, filtros={PARTICAO_MENSAL: [mes]}).assign(**{PARTICAO_MENSAL: mes})
+                          for mes in meses]
+                if partes:
+                    pd.concat(partes, ignore_index=True).to_sql(tabela, conexao, if_exists='replace', index=False)
+        return
+
+    destino.mkdir(parents=True, exist_ok=True)
+    despesas = origem.ler('despesas')
+    receitas = origem.ler('receitas')
+    if tipo == 'csv':
+        (destino / "despesas").mkdir(exist_ok=True)
+        for mes_ano, parte in despesas.groupby('Mês Ano Ref.'):
+            parte.to_csv(destino / "despesas" / f"{str(mes_ano).replace('/', '-')}.csv", index=False)
+        receitas.to_csv(destino / "receitas.csv", index=False)
+        (destino / "mensal").mkdir(exist_ok=True)
+        for tabela in TABELAS_MENSAIS:
+            for mes in meses:
+                origem.ler(tabela, filtros={PARTICAO_MENSAL: [mes]}).to_csv(
+                    destino / "mensal" / f"{mes}-{tabela}.csv", index=False)
+    elif tipo == 'parquet':
+        # Ordenado pelo mês: o filtro de mês descarta grupos de linhas inteiros
+        despesas.sort_values('Mês Ano Ref.', kind='stable').to_parquet(
+            destino / "despesas.parquet", index=False, row_group_size=TAMANHO_GRUPO_PARQUET)
+        receitas.to_parquet(destino / "receitas.parquet", index=False)
+        for tabela in TABELAS_MENSAIS:
+            for mes in meses:
+                pasta = destino / tabela / f"{PARTICAO_MENSAL}={mes}"
+                pasta.mkdir(parents=True, exist_ok=True)
+                df = origem.ler(tabela, filtros={PARTICAO_MENSAL: [mes]})
+                df.to_parquet(pasta / "dados.parquet", index=False)
+    else:
+        raise ValueError(f"Conversão para {tipo} não suportada")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converte as fontes de dados dos dashboards IPB")
+    parser.add_argument('tipo', choices=['csv', 'parquet', 'sqlite'], help="formato de destino")
+    parser.add_argument('destino', help="diretório (csv, parquet) ou arquivo .db (sqlite)")
+    parser.add_argument('--origem', default=os.environ.get('IPB_FONTE'),
+                        help="fonte de origem no formato tipo:caminho (padrão: IPB_FONTE ou as planilhas)")
+    opcoes = parser.parse_args()
+
+    converter(criar_fonte(opcoes.origem, Path(__file__).parent), opcoes.tipo, opcoes.destino)
+    print(f"Dados gravados em {opcoes.destino}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
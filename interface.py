@@ -0,0 +1,86 @@
+import streamlit as st
+
+from dinheiro import formatar_centavos, para_centavos
+
+# Elementos de interface comuns às páginas (configuração, estilo e
+# formatação). Os dados vêm de dados.py, que é o mesmo para as duas páginas
+# dentro do processo do servidor.
+
+# CSS customizado
+CSS = """
+<style>
+    .main-header {
+        font-size: 2.5rem;
+        font-weight: 700;
+        color: #1E3A5F;
+        text-align: center;
+        margin-bottom: 1rem;
+    }
+    .section-header {
+        font-size: 1.8rem;
+        font-weight: 600;
+        color: #2c3e50;
+        margin-top: 2rem;
+        margin-bottom: 1rem;
+        padding: 0.5rem;
+        background: linear-gradient(90deg, #f0f0f0 0%, #ffffff 100%);
+        border-left: 5px solid #3498db;
+    }
+    .metric-card {
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        padding: 1rem;
+        border-radius: 10px;
+        color: white;
+    }
+    .stMetric {
+        background-color: #f8f9fa;
+        padding: 1rem;
+        border-radius: 10px;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    }
+    div[data-testid="stMetricValue"] {
+        font-size: 1.8rem;
+        font-weight: 700;
+    }
+    .entrada-card {
+        background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%);
+        padding: 1rem;
+        border-radius: 10px;
+        color: white;
+    }
+    .saida-card {
+        background: linear-gradient(135deg, #eb3349 0%, #f45c43 100%);
+        padding: 1rem;
+        border-radius: 10px;
+        color: white;
+    }
+</style>
+"""
+
+
+# Configuração da página e CSS (vale tanto na aplicação multipágina quanto
+# executando uma página sozinha)
+def configurar_pagina(titulo, icone):
+    st.set_page_config(
+        page_title=titulo,
+        page_icon=icone,
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    st.markdown(CSS, unsafe_allow_html=True)
+
+
+# Função para formatar valores em Real (somas já vêm em centavos; aqui só
+# médias e valores avulsos, arredondados para o centavo)
+def formatar_real(valor):
+    return formatar_centavos(para_centavos(valor))
+
+
+# Rótulo das opções de filtro com quantidade e total da faceta
+def rotulo_faceta(contagem):
+    def formatar(opcao):
+        if opcao in contagem.index:
+            linha = contagem.loc[opcao]
+            return f"{opcao} ({int(linha['Quantidade'])} · {formatar_centavos(linha['Total'])})"
+        return opcao
+    return formatar
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+# Calendário de lançamentos (mapa de calor): total por dia da semana × semana
+# e por dia do mês × mês, para ver o padrão das ofertas de domingo e a
+# concentração de pagamentos em certos dias.
+#
+# As datas viram códigos inteiros (dias desde 1970-01-01) e cada lançamento
+# cai numa posição do vetor de dias do período; np.bincount soma valores e
+# quantidades de uma vez, sem agrupar por data. As grades do calendário são
+# só remapeamentos desse vetor diário (semana e dia da semana, mês e dia do
+# mês saem do próprio código). O vetor diário também serve ao gráfico de
+# evolução diária.
+
+DIAS_SEMANA = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+MESES_ABREV = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+
+# 1970-01-01 foi uma quinta-feira: (código + 3) % 7 dá 0 na segunda
+_DESLOCAMENTO_SEGUNDA = 3
+
+
+# Totais diários (centavos e quantidade) entre o primeiro e o último dia com
+# lançamento; dias sem lançamento ficam com zero
+def binar_dias(df):
+    if df is None or df.empty or 'Data Lançamento' not in df.columns:
+        return {'inicio': 0, 'centavos': np.zeros(0, dtype='int64'), 'quantidade': np.zeros(0, dtype='int64')}
+    datas = pd.to_datetime(df['Data Lançamento'], errors='coerce').to_numpy()
+    validas = ~np.isnat(datas)
+    codigos = datas[validas].astype('datetime64[D]').astype('int64')
+    if len(codigos) == 0:
+        return {'inicio': 0, 'centavos': np.zeros(0, dtype='int64'), 'quantidade': np.zeros(0, dtype='int64')}
+    inicio = int(codigos.min())
+    posicoes = codigos - inicio
+    centavos = df['Centavos'].to_numpy(dtype='int64')[validas]
+    # bincount soma em float64: exato para centavos até 2^53
+    return {
+        'inicio': inicio,
+        'centavos': np.rint(np.bincount(posicoes, weights=centavos)).astype('int64'),
+        'quantidade': np.bincount(posicoes).astype('int64'),
+    }
+
+
+# Junta vetores diários de períodos diferentes (ex.: um por mês) num só
+def juntar_dias(partes):
+    partes = [parte for parte in partes if len(parte['centavos'])]
+    if not partes:
+        return {'inicio': 0, 'centavos': np.zeros(0, dtype='int64'), 'quantidade': np.zeros(0, dtype='int64')}
+    inicio = min(parte['inicio'] for parte in partes)
+    fim = max(parte['inicio'] + len(parte['centavos']) for parte in partes)
+    centavos = np.zeros(fim - inicio, dtype='int64')
+    quantidade = np.zeros(fim - inicio, dtype='int64')
+    for parte in partes:
+        deslocamento = parte['inicio'] - inicio
+        centavos[deslocamento:deslocamento + len(parte['centavos'])] += parte['centavos']
+        quantidade[deslocamento:deslocamento + len(parte['quantidade'])] += parte['quantidade']
+    return {'inicio': inicio, 'centavos': centavos, 'quantidade': quantidade}
+
+
+# Datas (datetime64[D]) e totais só dos dias com lançamento
+def dias_com_lancamento(diario):
+    posicoes = np.flatnonzero(diario['quantidade'])
+    datas = (diario['inicio'] + posicoes).astype('datetime64[D]')
+    return datas, diario['centavos'][posicoes], diario['quantidade'][posicoes]
+
+
+# Grade dia da semana × semana (7 linhas; colunas a partir da segunda-feira
+# da primeira semana). Retorna (centavos, quantidade, segundas-feiras)
+def grade_semanas(diario):
+    codigos = diario['inicio'] + np.arange(len(diario['centavos']))
+    semanas = (codigos + _DESLOCAMENTO_SEGUNDA) // 7
+    dia_semana = (codigos + _DESLOCAMENTO_SEGUNDA) % 7
+    primeira = int(semanas.min()) if len(semanas) else 0
+    colunas = int(semanas.max()) - primeira + 1 if len(semanas) else 0
+    posicoes = dia_semana * colunas + (semanas - primeira)
+    tamanho = 7 * colunas
+    centavos = np.bincount(posicoes, weights=diario['centavos'], minlength=tamanho)
+    quantidade = np.bincount(posicoes, weights=diario['quantidade'], minlength=tamanho)
+    segundas = (np.arange(primeira, primeira + colunas) * 7 - _DESLOCAMENTO_SEGUNDA).astype('datetime64[D]')
+    return (np.rint(centavos).astype('int64').reshape(7, colunas),
+            quantidade.astype('int64').reshape(7, colunas), segundas)
+
+
+# Grade dia do mês × mês (31 linhas). Retorna (centavos, quantidade, meses
+# como datetime64[M])
+def grade_meses(diario):
+    dias = (diario['inicio'] + np.arange(len(diario['centavos']))).astype('datetime64[D]')
+    meses = dias.astype('datetime64[M]')
+    codigos_mes = meses.astype('int64')
+    dia_mes = (dias - meses.astype('datetime64[D]')).astype('int64')
+    primeiro = int(codigos_mes.min()) if len(dias) else 0
+    colunas = int(codigos_mes.max()) - primeiro + 1 if len(dias) else 0
+    posicoes = dia_mes * colunas + (codigos_mes - primeiro)
+    tamanho = 31 * colunas
+    centavos = np.bincount(posicoes, weights=diario['centavos'], minlength=tamanho)
+    quantidade = np.bincount(posicoes, weights=diario['quantidade'], minlength=tamanho)
+    return (np.rint(centavos).astype('int64').reshape(31, colunas),
+            quantidade.astype('int64').reshape(31, colunas),
+            np.arange(primeiro, primeiro + colunas).astype('datetime64[M]'))
+
+
+def rotulo_mes(mes):
+    mes = pd.Timestamp(mes)
+    return f"{MESES_ABREV[mes.month - 1]}/{mes.year}"
@@ -0,0 +1,114 @@
+import logging
+import threading
+from pathlib import Path
+
+# Monitor de arquivos: avisa o repositório quando uma planilha é alterada,
+# criada ou removida. Usa o watchdog (inotify no Linux) quando disponível e
+# cai para uma verificação periódica das impressões digitais caso contrário.
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # pragma: no cover - depende do ambiente
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+# Extensões das fontes de dados que interessam ao dashboard
+EXTENSOES = {'.xlsx', '.xls', '.csv', '.parquet', '.db', '.sqlite', '.sqlite3'}
+
+# Tempo de espera para agrupar vários eventos de uma mesma gravação
+ESPERA_SEGUNDOS = 1.0
+INTERVALO_POLLING = 5.0
+
+
+# Arquivos temporários do Excel (~$arquivo.xlsx) e ocultos são ignorados
+def _relevante(caminho):
+    caminho = Path(caminho)
+    if caminho.name.startswith(('~$', '.')):
+        return False
+    return caminho.suffix.lower() in EXTENSOES
+
+
+class _Tratador(FileSystemEventHandler):
+    def __init__(self, monitor):
+        self._monitor = monitor
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        for caminho in (getattr(event, 'src_path', None), getattr(event, 'dest_path', None)):
+            if caminho and _relevante(caminho):
+                self._monitor.notificar(Path(caminho))
+
+
+class MonitorArquivos:
+    # recursivos: diretórios observados com os subdiretórios (partições de
+    # CSV e Parquet)
+    def __init__(self, repositorio, diretorios, recursivos=()):
+        self._repositorio = repositorio
+        self._recursivos = list(dict.fromkeys(Path(d) for d in recursivos))
+        self._diretorios = [d for d in dict.fromkeys(Path(d) for d in diretorios) if d not in self._recursivos]
+        self._pendentes = set()
+        self._temporizador = None
+        self._trava = threading.Lock()
+        self._observador = None
+        self._parar = threading.Event()
+        self.modo = None
+
+    def iniciar(self):
+        if self.modo is not None:
+            return self
+
+        if Observer is not None:
+            try:
+                self._observador = Observer()
+                tratador = _Tratador(self)
+                for diretorio in self._diretorios + self._recursivos:
+                    if diretorio.exists():
+                        self._observador.schedule(tratador, str(diretorio),
+                                                  recursive=diretorio in self._recursivos)
+                self._observador.daemon = True
+                self._observador.start()
+                self.modo = 'inotify'
+                return self
+            except OSError:
+                # Limite de inotify atingido ou sistema de arquivos sem suporte
+                logger.warning("Monitor de arquivos indisponível; usando verificação periódica")
+                self._observador = None
+
+        threading.Thread(target=self._polling, name='monitor-polling', daemon=True).start()
+        self.modo = 'polling'
+        return self
+
+    def parar(self):
+        self._parar.set()
+        if self._observador is not None:
+            self._observador.stop()
+
+    # Agrupa eventos próximos e dispara uma única verificação
+    def notificar(self, caminho):
+        with self._trava:
+            self._pendentes.add(caminho)
+            if self._temporizador is not None:
+                self._temporizador.cancel()
+            self._temporizador = threading.Timer(ESPERA_SEGUNDOS, self._processar)
+            self._temporizador.daemon = True
+            self._temporizador.start()
+
+    def _processar(self):
+        with self._trava:
+            caminhos, self._pendentes = self._pendentes, set()
+            self._temporizador = None
+        try:
+            self._repositorio.verificar(caminhos)
+        except Exception:
+            logger.exception("Falha ao verificar arquivos alterados")
+
+    def _polling(self):
+        while not self._parar.wait(INTERVALO_POLLING):
+            try:
+                self._repositorio.verificar()
+            except Exception:
+                logger.exception("Falha na verificação periódica de arquivos")
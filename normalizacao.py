@@ -0,0 +1,280 @@
+import csv
+import logging
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Normalização de nomes (Especificação, Fornecedor): grafias diferentes do
+# mesmo fornecedor ou tipo de despesa viram um nome canônico na leitura, e os
+# agrupamentos (Top 10, treemap, opções dos filtros) deixam de se dividir.
+#
+# 1. Chave: sem acentos, maiúsculas/minúsculas, pontuação e espaços extras.
+#    Nomes com a mesma chave são o mesmo nome.
+# 2. Índice de similaridade entre as chaves distintas: trigramas de
+#    caracteres num índice invertido. Cada nome só é comparado com os que
+#    dividem algum dos seus trigramas mais raros (filtro de prefixo), então
+#    não há comparação de todos os pares.
+# 3. Candidatos precisam de Jaccard de trigramas alto, dos mesmos números e
+#    de palavras divergentes quase iguais (edição): "ESGOSTO" ~ "ESGOTO"
+#    passa, "UMP" x "UPA" ou "CORAL ADULTO" x "CORAL INFANTIL" não.
+# 4. Nomes com a mesma chave formam um grupo, cujo canônico é o nome já
+#    canônico no arquivo ou, se não houver, a grafia mais usada. Pares
+#    parecidos são unidos (union-find) entre esses grupos.
+#
+# O mapeamento fica em nomes_canonicos.csv (coluna; variante; canonico;
+# similaridade; aplicar). Só as junções de mesma chave (acentos, caixa,
+# espaços, pontuação) são aplicadas sozinhas; as por semelhança podem unir
+# nomes distintos ("ALESSANDRA" ~ "ALESSANDRO") e vão para revisão em
+# nomes_propostos.csv com aplicar=não. Para aceitar uma, copie a linha para
+# nomes_canonicos.csv com aplicar=sim. O arquivo de propostas não faz parte
+# da versão dos conjuntos: gravá-lo durante a leitura não dispara outra
+# reconstrução. nomes_canonicos.csv só é editado à mão e é relido junto com
+# as planilhas.
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_ARQUIVO = ['coluna', 'variante', 'canonico', 'similaridade', 'aplicar']
+
+LIMIAR_TRIGRAMAS = 0.7
+LIMIAR_EDICAO = 0.8
+
+_trava_arquivo = threading.Lock()
+# Nomes já consultados no índice neste processo, por (arquivo, coluna,
+# origem): a releitura de uma planilha só consulta os nomes que apareceram
+# desde então
+_examinados = defaultdict(set)
+
+
+# Chave de comparação: sem acentos, minúsculas e só letras e números
+def chave(nome):
+    texto = unicodedata.normalize('NFKD', str(nome))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).casefold()
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', texto).split())
+
+
+def _trigramas(texto):
+    texto = f" {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _razao_edicao(a, b):
+    if not a and not b:
+        return 1.0
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i]
+        for j, cb in enumerate(b, 1):
+            atual.append(min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        anterior = atual
+    return 1 - anterior[-1] / max(len(a), len(b))
+
+
+# Confirmação de um candidato: mesmos números e palavras divergentes parecidas
+def _semelhantes(a, b):
+    if re.findall(r'\d+', a) != re.findall(r'\d+', b):
+        return None
+    palavras_a, palavras_b = Counter(a.split()), Counter(b.split())
+    so_a = ' '.join(sorted((palavras_a - palavras_b).elements()))
+    so_b = ' '.join(sorted((palavras_b - palavras_a).elements()))
+    if _razao_edicao(so_a, so_b) < LIMIAR_EDICAO:
+        return None
+    return _razao_edicao(a, b)
+
+
+class IndiceSimilaridade:
+    def __init__(self, chaves):
+        self.chaves = list(chaves)
+        self.trigramas = [_trigramas(c) for c in self.chaves]
+        self.tamanhos = np.array([len(gramas) for gramas in self.trigramas])
+        postagens = defaultdict(list)
+        for posicao, gramas in enumerate(self.trigramas):
+            for grama in gramas:
+                postagens[grama].append(posicao)
+        self.postagens = {grama: np.array(lista, dtype='int64') for grama, lista in postagens.items()}
+
+    # Filtro de prefixo: com Jaccard >= t, dois nomes dividem ao menos um dos
+    # |A| - ceil(t·|A|) + 1 trigramas mais raros de A. Só as listas desses
+    # trigramas (curtas, por serem raros) são percorridas, e o filtro de
+    # tamanho (t·|A| <= |B| <= |A|/t) descarta o resto de uma vez.
+    def _candidatos(self, posicao):
+        gramas = sorted(self.trigramas[posicao], key=lambda g: (len(self.postagens[g]), g))
+        tamanho_prefixo = len(gramas) - math.ceil(LIMIAR_TRIGRAMAS * len(gramas)) + 1
+        candidatos, comuns = np.unique(np.concatenate([self.postagens[g] for g in gramas[:tamanho_prefixo]]),
+                                       return_counts=True)
+        tamanhos = self.tamanhos[candidatos]
+        # Interseção máxima possível: trigramas comuns no prefixo mais todos
+        # os de fora dele; Jaccard >= t exige interseção >= t·(|A|+|B|)/(1+t)
+        necessario = LIMIAR_TRIGRAMAS * (len(gramas) + tamanhos) / (1 + LIMIAR_TRIGRAMAS)
+        aceitos = ((tamanhos >= LIMIAR_TRIGRAMAS * len(gramas)) & (tamanhos * LIMIAR_TRIGRAMAS <= len(gramas))
+                   & (comuns + len(gramas) - tamanho_prefixo >= necessario) & (candidatos != posicao))
+        return candidatos[aceitos].tolist()
+
+    # Chaves parecidas com a da posição dada: [(posição, similaridade)]
+    def vizinhos(self, posicao):
+        gramas = self.trigramas[posicao]
+        resultado = []
+        for outra in self._candidatos(posicao):
+            outros = self.trigramas[outra]
+            intersecao = len(gramas & outros)
+            if intersecao < LIMIAR_TRIGRAMAS * (len(gramas) + len(outros) - intersecao):
+                continue
+            similaridade = _semelhantes(self.chaves[posicao], self.chaves[outra])
+            if similaridade is not None:
+                resultado.append((outra, similaridade))
+        return resultado
+
+
+class _Uniao:
+    def __init__(self):
+        self.pai = {}
+
+    def raiz(self, item):
+        self.pai.setdefault(item, item)
+        while self.pai[item] != item:
+            self.pai[item] = self.pai[self.pai[item]]
+            item = self.pai[item]
+        return item
+
+    def unir(self, a, b):
+        self.pai[self.raiz(a)] = self.raiz(b)
+
+
+# Propõe variante -> canônico para os nomes ainda desconhecidos.
+# contagens: {nome: ocorrências}; conhecidos: nomes já presentes no arquivo;
+# canonicos: nomes já escolhidos como canônicos (preferidos nos grupos);
+# examinados: nomes já consultados antes, sem par (não são consultados de
+# novo, mas continuam no índice para os nomes novos).
+# Retorna [(variante, canônico, similaridade)]; similaridade 1.0 indica a
+# mesma chave, e só essas propostas são seguras para aplicar sem revisão.
+def propor(contagens, conhecidos=(), canonicos=(), examinados=()):
+    conhecidos, canonicos = set(conhecidos), set(canonicos)
+    consultados = conhecidos | set(examinados)
+
+    def preferido(nomes, quantidade):
+        return sorted(nomes, key=lambda n: (n not in canonicos, n not in conhecidos, -quantidade(n), n))[0]
+
+    por_chave = defaultdict(list)
+    for nome in contagens:
+        por_chave[chave(nome)].append(nome)
+    chaves = list(por_chave)
+
+    # Mesma chave: cada grafia aponta para o nome preferido do grupo
+    propostas = []
+    representantes = {}
+    for texto, nomes in por_chave.items():
+        representante = preferido(nomes, contagens.get)
+        representantes[texto] = representante
+        propostas.extend((nome, representante, 1.0) for nome in nomes
+                         if nome != representante and nome not in conhecidos)
+
+    # Semelhança: une os grupos de chave parecida. Só as chaves com algum
+    # nome novo são consultadas no índice
+    uniao = _Uniao()
+    similaridades = {}
+    indice = IndiceSimilaridade(chaves)
+    for posicao, texto in enumerate(chaves):
+        if all(nome in consultados for nome in por_chave[texto]):
+            continue
+        for outra, similaridade in indice.vizinhos(posicao):
+            for parte in (texto, chaves[outra]):
+                similaridades[parte] = max(similaridades.get(parte, 0.0), similaridade)
+            uniao.unir(texto, chaves[outra])
+
+    grupos = defaultdict(list)
+    for texto in similaridades:
+        grupos[uniao.raiz(texto)].append(texto)
+
+    totais = {texto: sum(contagens[nome] for nome in nomes) for texto, nomes in por_chave.items()}
+    for textos in grupos.values():
+        canonico = preferido([representantes[t] for t in textos], lambda n: totais[chave(n)])
+        for texto in textos:
+            representante = representantes[texto]
+            if representante != canonico and representante not in conhecidos:
+                propostas.append((representante, canonico, round(similaridades[texto], 3)))
+    return propostas
+
+
+def ler_mapeamento(arquivo):
+    if not arquivo.exists():
+        return pd.DataFrame(columns=CAMPOS_ARQUIVO)
+    return pd.read_csv(arquivo, sep=';', dtype=str, encoding='utf-8-sig', keep_default_na=False)
+
+
+# Acrescenta propostas ao arquivo de revisão, com aplicar=não (gravação
+# atômica; linhas já gravadas não são alteradas)
+def _gravar_propostas(arquivo, coluna, propostas):
+    with _trava_arquivo:
+        atual = ler_mapeamento(arquivo)
+        existentes = set(zip(atual['coluna'], atual['variante']))
+        novas = [(coluna, variante, canonico, f"{similaridade:.3f}", 'não')
+                 for variante, canonico, similaridade in propostas if (coluna, variante) not in existentes]
+        if not novas:
+            return
+        linhas = [tuple(linha) for linha in atual[CAMPOS_ARQUIVO].itertuples(index=False)] + novas
+        temporario = arquivo.with_name(f".{arquivo.name}.{threading.get_ident()}.tmp")
+        with open(temporario, 'w', newline='', encoding='utf-8-sig') as f:
+            escritor = csv.writer(f, delimiter=';')
+            escritor.writerow(CAMPOS_ARQUIVO)
+            escritor.writerows(linhas)
+        os.replace(temporario, arquivo)
+
+
+# Segue cadeias (A -> B -> C vira A -> C), ignorando ciclos
+def _resolver(mapeamento):
+    resolvido = {}
+    for variante in mapeamento:
+        destino, vistos = mapeamento[variante], {variante}
+        while destino in mapeamento and destino not in vistos:
+            vistos.add(destino)
+            destino = mapeamento[destino]
+        resolvido[variante] = destino
+    return resolvido
+
+
+# Aplica os nomes canônicos às colunas do DataFrame: as regras marcadas no
+# arquivo e as junções de mesma chave. As junções por semelhança de nomes
+# que o arquivo ainda não conhece são gravadas em arquivo_propostas (quando
+# informado) para revisão, sem serem aplicadas.
+# origem: conjunto de onde vêm os dados (ex.: 'despesas', 'saidas/dez')
+def normalizar_colunas(df, colunas, arquivo, origem='', arquivo_propostas=None):
+    colunas = [coluna for coluna in colunas if coluna in df.columns]
+    if df.empty or not colunas:
+        return df
+    mapeamento = ler_mapeamento(arquivo)
+    df = df.copy()
+    for coluna in colunas:
+        regras = mapeamento[mapeamento['coluna'] == coluna]
+        conhecidos = set(regras['variante']) | set(regras['canonico'])
+        aplicadas = regras[regras['aplicar'].str.strip().str.lower().isin(['sim', 's', '1'])]
+
+        contagens = df[coluna].dropna().value_counts().to_dict()
+        examinados = _examinados[(str(arquivo), coluna, origem)]
+        propostas = propor(contagens, conhecidos, set(aplicadas['canonico']), examinados)
+        mesma_chave = [(variante, canonico) for variante, canonico, _ in propostas
+                       if chave(variante) == chave(canonico)]
+        revisar = [proposta for proposta in propostas if chave(proposta[0]) != chave(proposta[1])]
+        gravadas = True
+        if revisar and arquivo_propostas is not None:
+            try:
+                _gravar_propostas(arquivo_propostas, coluna, revisar)
+            except OSError:
+                logger.warning("Não foi possível gravar as propostas de nomes em %s", arquivo_propostas)
+                gravadas = False
+        # Com a gravação falha, os nomes são consultados de novo na próxima
+        # leitura e as propostas voltam a ser oferecidas
+        if gravadas:
+            examinados.update(contagens)
+
+        trocas = dict(zip(aplicadas['variante'], aplicadas['canonico']))
+        trocas.update(mesma_chave)
+        trocas = {variante: canonico for variante, canonico in _resolver(trocas).items()
+                  if variante != canonico and variante in contagens}
+        if trocas:
+            df[coluna] = df[coluna].replace(trocas)
+    return df
@@ -0,0 +1,85 @@
+import pandas as pd
+
+from cache_limitado import cache
+
+# Orçamento x realizado por centro de custo e mês.
+# O realizado vem da tabela de agregados mensais das despesas (já calculada
+# pelo repositório). A execução é montada mês a mês: cada mês é uma junção
+# vetorizada (orçado x realizado por centro) guardada no cache com a
+# assinatura dos seus próprios dados. Quando chega um mês novo, ou um mês é
+# corrigido, só esse mês é recalculado; os demais saem do cache.
+# Orçado, realizado e variações em centavos inteiros.
+
+COLUNAS_EXECUCAO = ['Centro de Custo', 'Mes_Num', 'Orçado', 'Realizado', 'Variação', '% Executado']
+
+
+# Assinatura do conteúdo de um recorte (muda quando qualquer valor muda)
+def _assinatura(df):
+    if df.empty:
+        return 0
+    return int(pd.util.hash_pandas_object(df, index=False).sum())
+
+
+# Orçamento que vale para o ano: linhas do próprio ano ou sem ano definido
+def orcamento_do_ano(orcamento, ano):
+    return orcamento[orcamento['Ano'].isin([ano, 0])]
+
+
+def _execucao_mes(orcado, realizado, mes):
+    orcado = orcado.groupby('Centro de Custo')['Centavos'].sum().rename('Orçado')
+    realizado = realizado.groupby('Centro de Custo', dropna=False)['Centavos'].sum().rename('Realizado')
+
+    execucao = pd.concat([orcado, realizado], axis=1, join='outer').fillna(0).astype('int64')
+    execucao['Variação'] = execucao['Realizado'] - execucao['Orçado']
+    execucao['% Executado'] = execucao['Realizado'] / execucao['Orçado'].where(execucao['Orçado'] != 0) * 100
+    execucao.index.name = 'Centro de Custo'
+    execucao = execucao.reset_index()
+    execucao.insert(1, 'Mes_Num', mes)
+    return execucao[COLUNAS_EXECUCAO]
+
+
+# Execução por centro e mês do ano inteiro (12 meses, com ou sem lançamentos)
+def execucao_orcamento(orcamento, agregado, ano):
+    orcamento = orcamento_do_ano(orcamento, ano)
+    agregado = agregado[agregado['Ano'] == ano]
+    orcado_por_mes = dict(tuple(orcamento.groupby('Mes_Num')))
+    realizado_por_mes = dict(tuple(agregado.groupby('Mes_Num')))
+    vazio_orcado = orcamento.iloc[0:0]
+    vazio_realizado = agregado.iloc[0:0]
+
+    partes = []
+    for mes in range(1, 13):
+        orcado = orcado_por_mes.get(mes, vazio_orcado)
+        realizado = realizado_por_mes.get(mes, vazio_realizado)
+        chave = ('execucao_orcamento', ano, mes, _assinatura(orcado), _assinatura(realizado))
+        partes.append(cache.obter_ou_calcular(
+            chave, 'agregados', lambda: _execucao_mes(orcado, realizado, mes)
+        ))
+    return pd.concat(partes, ignore_index=True)
+
+
+# Último mês do ano com lançamentos (meses decorridos para o ritmo de gasto)
+def meses_decorridos(agregado, ano):
+    meses = agregado.loc[agregado['Ano'] == ano, 'Mes_Num']
+    return int(meses.max()) if len(meses) > 0 else 0
+
+
+# Resumo por centro: orçado anual, realizado no ano, ritmo mensal e projeção
+# para dezembro mantido o ritmo atual
+def projecao_orcamento(execucao, decorridos):
+    ate_agora = execucao[execucao['Mes_Num'] <= decorridos]
+    anual = execucao.groupby('Centro de Custo', dropna=False)['Orçado'].sum()
+    resumo = pd.DataFrame({
+        'Orçado Anual': anual,
+        'Orçado até o Mês': ate_agora.groupby('Centro de Custo', dropna=False)['Orçado'].sum(),
+        'Realizado': ate_agora.groupby('Centro de Custo', dropna=False)['Realizado'].sum()
+    }).fillna(0).astype('int64')
+
+    resumo['Variação'] = resumo['Realizado'] - resumo['Orçado até o Mês']
+    base = resumo['Orçado Anual'].where(resumo['Orçado Anual'] != 0)
+    resumo['% Executado'] = resumo['Realizado'] / base * 100
+    resumo['Ritmo Mensal'] = resumo['Realizado'] // decorridos if decorridos else 0
+    resumo['Projeção Anual'] = resumo['Realizado'] * 12 // decorridos if decorridos else 0
+    resumo['% Projetado'] = resumo['Projeção Anual'] / base * 100
+    resumo.index.name = 'Centro de Custo'
+    return resumo.sort_values('Orçado Anual', ascending=False).reset_index()
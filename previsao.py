@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+from cache_limitado import cache
+
+# Projeção do fluxo de caixa mensal (receitas por categoria, despesas por
+# centro de custo) para os meses seguintes ao último com dados.
+# As séries viram uma matriz (série x mês, em centavos) e todas são ajustadas
+# de uma vez por mínimos quadrados com a mesma matriz de regressão (tendência
+# linear e, com dois anos ou mais de histórico, efeito de cada mês do ano).
+# Como o modelo é linear, a projeção de um conjunto de séries é a soma das
+# projeções, e os resíduos somados dão a incerteza do conjunto: os filtros
+# do dashboard não exigem novo ajuste. O modelo fica no cache por versão dos
+# dados.
+
+# Banda de 95% (aproximação normal)
+NIVEL_CONFIANCA = 95
+Z_BANDA = 1.96
+# Histórico mínimo (em meses) para estimar o efeito de cada mês do ano
+MIN_MESES_SAZONAL = 24
+
+
+def _deslocar(codigo, meses):
+    indice = (codigo // 100) * 12 + (codigo % 100 - 1) + meses
+    return (indice // 12) * 100 + indice % 12 + 1
+
+
+# Códigos AAAAMM consecutivos de `inicio` até `fim`
+def _periodos(inicio, fim):
+    quantidade = (fim // 100 - inicio // 100) * 12 + (fim % 100 - inicio % 100) + 1
+    return [_deslocar(inicio, passo) for passo in range(max(quantidade, 0))]
+
+
+# Meses a projetar: os que faltam para fechar o ano do último mês com dados;
+# com o ano fechado, o ano seguinte inteiro
+def meses_restantes(ultimo_periodo):
+    restantes = 12 - ultimo_periodo % 100
+    return restantes if restantes > 0 else 12
+
+
+# Último mês projetado para séries que são comparadas mês a mês (receitas x
+# despesas): fecha o ano do mais recente dos seus últimos meses, para que
+# todas terminem no mesmo mês
+def fim_comum(ultimos_periodos):
+    ultimo = max(ultimos_periodos)
+    return _deslocar(ultimo, meses_restantes(ultimo))
+
+
+# Matriz de regressão: constante, tendência e (opcional) um termo por mês
+def _desenho(periodos, inicio, sazonal):
+    passos = np.array([(p // 100 - inicio // 100) * 12 + (p % 100 - inicio % 100) for p in periodos], dtype='float64')
+    colunas = [np.ones_like(passos), passos]
+    if sazonal:
+        meses = np.array([p % 100 for p in periodos])
+        colunas += [(meses == mes).astype('float64') for mes in range(2, 13)]
+    return np.column_stack(colunas)
+
+
+class Previsao:
+    # tabela: colunas `coluna_serie`, 'Periodo' (AAAAMM) e 'Centavos';
+    # fim: último mês projetado (padrão: o que fecha o ano do último mês)
+    def __init__(self, tabela, coluna_serie, fim=None):
+        tabela = tabela.assign(**{coluna_serie: tabela[coluna_serie].fillna('(não informado)')})
+        largura = tabela.pivot_table(index=coluna_serie, columns='Periodo', values='Centavos',
+                                     aggfunc='sum', fill_value=0)
+        historico = _periodos(int(largura.columns.min()), int(largura.columns.max())) if len(largura.columns) else []
+        largura = largura.reindex(columns=historico, fill_value=0)
+        if historico and fim is None:
+            fim = _deslocar(historico[-1], meses_restantes(historico[-1]))
+
+        self.series = largura.index
+        self.historico = historico
+        self.futuro = _periodos(_deslocar(historico[-1], 1), fim) if historico else []
+
+        sazonal = len(historico) >= MIN_MESES_SAZONAL
+        x = _desenho(historico, historico[0], sazonal) if historico else np.zeros((0, 2))
+        x_futuro = _desenho(self.futuro, historico[0], sazonal) if self.futuro else np.zeros((0, x.shape[1]))
+        y = largura.to_numpy(dtype='float64')
+        self.ultimos_12 = largura.iloc[:, -12:].sum(axis=1).astype('int64').to_numpy()
+
+        # Um único lstsq ajusta todas as séries (uma coluna do lado direito por série)
+        if len(historico) and len(self.series):
+            coeficientes, _, posto, _ = np.linalg.lstsq(x, y.T, rcond=None)
+        else:
+            coeficientes, posto = np.zeros((x.shape[1], len(self.series))), 0
+        self.residuos = y - (x @ coeficientes).T
+        self.pontos = (x_futuro @ coeficientes).T
+        self.graus_liberdade = max(len(historico) - posto, 0)
+
+        # Variância da previsão de cada mês e da soma do horizonte, a menos de sigma²
+        inversa = np.linalg.pinv(x.T @ x) if len(historico) else np.zeros((x.shape[1], x.shape[1]))
+        self.fator_mes = 1 + np.einsum('hp,pq,hq->h', x_futuro, inversa, x_futuro)
+        soma = x_futuro.sum(axis=0)
+        self.fator_total = len(self.futuro) + soma @ inversa @ soma
+
+    def _linhas(self, series):
+        if series is None:
+            return np.ones(len(self.series), dtype=bool)
+        return self.series.isin(list(series))
+
+    def _sigma(self, residuos):
+        if self.graus_liberdade == 0:
+            return np.full(residuos.shape[:-1], np.nan)
+        return np.sqrt((residuos ** 2).sum(axis=-1) / self.graus_liberdade)
+
+    # Projeção mês a mês da soma das séries escolhidas (todas se None)
+    def projetar(self, series=None):
+        linhas = self._linhas(series)
+        previsto = self.pontos[linhas].sum(axis=0)
+        margem = Z_BANDA * self._sigma(self.residuos[linhas].sum(axis=0)) * np.sqrt(self.fator_mes)
+        resultado = pd.DataFrame({
+            'Periodo': self.futuro,
+            'Ano': [p // 100 for p in self.futuro],
+            'Mes_Num': [p % 100 for p in self.futuro],
+            'Previsto': np.rint(np.clip(previsto, 0, None)),
+            'Inferior': np.rint(np.clip(previsto - margem, 0, None)),
+            'Superior': np.rint(np.clip(previsto + margem, 0, None)),
+        })
+        for coluna in ['Previsto', 'Inferior', 'Superior']:
+            resultado[coluna] = resultado[coluna].fillna(resultado['Previsto']).astype('int64')
+        return resultado
+
+    # Total projetado no horizonte para cada série, com a banda
+    def por_serie(self):
+        previsto = self.pontos.sum(axis=1)
+        margem = Z_BANDA * self._sigma(self.residuos) * np.sqrt(self.fator_total)
+        resumo = pd.DataFrame({
+            'Últimos 12 Meses': self.ultimos_12,
+            'Previsto': np.rint(np.clip(previsto, 0, None)),
+            'Inferior': np.rint(np.clip(previsto - margem, 0, None)),
+            'Superior': np.rint(np.clip(previsto + margem, 0, None)),
+        }, index=self.series)
+        for coluna in ['Previsto', 'Inferior', 'Superior']:
+            resumo[coluna] = resumo[coluna].fillna(resumo['Previsto']).astype('int64')
+        resumo.index.name = self.series.name
+        return resumo.sort_values('Previsto', ascending=False).reset_index()
+
+
+# Tabela de receitas no formato da previsão (a planilha não tem ano: usa o
+# ano das despesas)
+def tabela_receitas(df_receitas, ano):
+    tabela = df_receitas[['Categoria', 'Mes_Num', 'Centavos']].copy()
+    tabela['Periodo'] = ano * 100 + tabela['Mes_Num']
+    return tabela
+
+
+# Modelos ajustados no cache, chaveados pela versão de cada conjunto e pelo
+# último mês projetado
+def previsao_despesas(agregado, versao, fim=None):
+    return cache.obter_ou_calcular(
+        ('previsao', 'despesas', versao, fim), 'agregados', lambda: Previsao(agregado, 'Centro de Custo', fim)
+    )
+
+
+def previsao_receitas(df_receitas, ano, versao, fim=None):
+    return cache.obter_ou_calcular(
+        ('previsao', 'receitas', ano, versao, fim), 'agregados',
+        lambda: Previsao(tabela_receitas(df_receitas, ano), 'Categoria', fim)
+    )
@@ -0,0 +1,222 @@
+import numpy as np
+import pandas as pd
+
+from cache_limitado import cache
+
+# Pagamentos recorrentes (salários, contas de consumo, aluguel, dízimo ao
+# Supremo Concílio) e calendário dos próximos compromissos.
+# Cada lançamento vira uma chave de série: hash do nome (Especificação e,
+# quando existe, Fornecedor) e faixa de valor (logaritmo do valor em passos de
+# TOLERANCIA_VALOR). Faixas vizinhas do mesmo nome formam uma série só, então
+# um valor que oscila pouco não se divide, mas duas contas do mesmo nome com
+# valores bem diferentes (ex.: condomínios de R$ 160 e R$ 250) ficam
+# separadas.
+#
+# Cada mês é resumido uma vez (série -> quantidade, total e dia típico). Os
+# resumos da planilha ficam no cache pela versão do conjunto (impressão
+# digital dos arquivos), então as execuções seguintes não tocam nos dados.
+# Quando a versão muda, cada mês é comparado pelo conteúdo com o resumo já
+# guardado e só um mês novo ou alterado é resumido de novo. A periodicidade sai dos intervalos (em meses) entre os meses
+# com pagamento de cada série, calculada sobre os resumos, que são pequenos.
+
+# Variação de valor aceita dentro de uma faixa (25%)
+TOLERANCIA_VALOR = 0.25
+# Mínimo de meses com pagamento e fração de intervalos compatíveis com o período
+MIN_OCORRENCIAS = 3
+MIN_REGULARIDADE = 0.75
+# Dias de folga depois do dia típico antes de marcar atraso
+TOLERANCIA_DIAS = 5
+# Meses à frente no calendário de compromissos
+HORIZONTE_MESES = 3
+# Séries sem pagamento há mais de N períodos são consideradas encerradas
+PERIODOS_ENCERRAMENTO = 2
+# Meses anteriores à referência verificados em busca de pagamentos em falta
+MESES_PENDENTES = 3
+
+PERIODICIDADES = {1: 'Mensal', 2: 'Bimestral', 3: 'Trimestral', 6: 'Semestral', 12: 'Anual'}
+COLUNAS_NOME = ['Especificação', 'Fornecedor']
+
+COLUNAS_SERIES = ['Especificação', 'Fornecedor', 'Centro de Custo', 'Periodicidade', 'Período (meses)',
+                  'Dia Típico', 'Valor Típico', 'Ocorrências', 'Último Pagamento', 'Próximo Vencimento']
+
+
+def _indice_mes(periodo):
+    return (periodo // 100) * 12 + periodo % 100 - 1
+
+
+def _periodo(indice):
+    return (indice // 12) * 100 + indice % 12 + 1
+
+
+def _texto(df, coluna):
+    if coluna not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    return df[coluna].astype('string').str.strip().fillna('').astype(object)
+
+
+def _assinatura(df):
+    if df.empty:
+        return 0
+    return int(pd.util.hash_pandas_object(df, index=True).sum())
+
+
+# Resumo de um mês: uma linha por (nome, faixa de valor)
+def _resumir_mes(df):
+    validos = df[df['Centavos'] > 0]
+    nomes = pd.DataFrame({coluna: _texto(validos, coluna) for coluna in COLUNAS_NOME})
+    datas = pd.to_datetime(validos['Data Lançamento'], errors='coerce') \
+        if 'Data Lançamento' in validos.columns else pd.Series(pd.NaT, index=validos.index)
+    base = pd.DataFrame({
+        'Chave': pd.util.hash_pandas_object(nomes, index=False).to_numpy(),
+        'Faixa': np.floor(np.log(validos['Centavos'].to_numpy(dtype='float64'))
+                          / np.log1p(TOLERANCIA_VALOR)).astype('int64'),
+        'Centavos': validos['Centavos'].to_numpy(dtype='int64'),
+        'Dia': datas.dt.day.to_numpy(),
+        'Especificação': nomes['Especificação'].to_numpy(),
+        'Fornecedor': nomes['Fornecedor'].to_numpy(),
+        'Centro de Custo': _texto(validos, 'Centro de Custo').to_numpy(),
+    })
+    grupos = base.groupby(['Chave', 'Faixa'], sort=False)
+    return grupos.agg(
+        Quantidade=('Centavos', 'size'), Centavos=('Centavos', 'sum'), Dia=('Dia', 'median'),
+        **{'Especificação': ('Especificação', 'first'), 'Fornecedor': ('Fornecedor', 'first'),
+           'Centro de Custo': ('Centro de Custo', 'first')}
+    ).reset_index()
+
+
+# Resumos dos meses (lista de (Periodo AAAAMM, DataFrame)), um por mês no cache
+def resumir_meses(meses):
+    partes = []
+    for periodo, df in meses:
+        if df is None or df.empty or 'Centavos' not in df.columns:
+            continue
+        resumo = cache.obter_ou_calcular(
+            ('recorrencias', periodo, _assinatura(df)), 'agregados', lambda: _resumir_mes(df)
+        )
+        partes.append(resumo.assign(Periodo=periodo))
+    if not partes:
+        return pd.DataFrame(columns=['Chave', 'Faixa', 'Quantidade', 'Centavos', 'Dia', 'Periodo'] + COLUNAS_NOME)
+    return pd.concat(partes, ignore_index=True)
+
+
+# Meses de um DataFrame com 'Ano' e 'Mes_Num' (ex.: a planilha anual)
+def meses_do_ano(df):
+    periodos = df['Ano'] * 100 + df['Mes_Num']
+    return [(int(periodo), parte) for periodo, parte in df.groupby(periodos, sort=True)]
+
+
+# Resumos da planilha anual, no cache pela versão do conjunto
+def resumir_ano(df, versao):
+    return cache.obter_ou_calcular(('recorrencias', 'ano', versao), 'agregados',
+                                   lambda: resumir_meses(meses_do_ano(df)))
+
+
+# Série de cada linha dos resumos: faixas vizinhas do mesmo nome se juntam
+def _series(resumos):
+    ordenado = resumos.sort_values(['Chave', 'Faixa'], kind='stable')
+    chaves, faixas = ordenado['Chave'].to_numpy(), ordenado['Faixa'].to_numpy()
+    nova = np.ones(len(ordenado), dtype=bool)
+    nova[1:] = (chaves[1:] != chaves[:-1]) | (faixas[1:] - faixas[:-1] > 1)
+    return pd.Series(np.cumsum(nova), index=ordenado.index).reindex(resumos.index)
+
+
+# Periodicidade de uma série a partir dos índices dos meses com pagamento
+def _estimar_periodo(indices):
+    if len(indices) < MIN_OCORRENCIAS:
+        return None
+    intervalos = np.diff(indices)
+    periodo = int(np.median(intervalos))
+    if periodo not in PERIODICIDADES:
+        return None
+    compativeis = (intervalos % periodo == 0).mean()
+    return periodo if compativeis >= MIN_REGULARIDADE else None
+
+
+def _data_prevista(periodo, dia):
+    inicio = pd.Timestamp(year=periodo // 100, month=periodo % 100, day=1)
+    dia = 1 if pd.isna(dia) else int(round(dia))
+    return inicio + pd.Timedelta(days=min(dia, inicio.days_in_month) - 1)
+
+
+# Séries recorrentes, calendário de compromissos e pagamentos em falta.
+# referencia: data dos dados mais recentes (padrão: fim do último mês)
+def detectar(resumos, referencia=None):
+    vazio = (pd.DataFrame(columns=COLUNAS_SERIES), pd.DataFrame(), pd.DataFrame())
+    if resumos.empty:
+        return vazio
+    resumos = resumos.assign(Serie=_series(resumos))
+    if referencia is None or pd.isna(referencia):
+        referencia = _data_prevista(int(resumos['Periodo'].max()), 31)
+    referencia = pd.Timestamp(referencia)
+    periodo_referencia = referencia.year * 100 + referencia.month
+    indice_referencia = _indice_mes(periodo_referencia)
+
+    # Uma linha por (série, mês) e o nome mais frequente de cada série
+    por_mes = resumos.groupby(['Serie', 'Periodo'], sort=True).agg(
+        Centavos=('Centavos', 'sum'), Dia=('Dia', 'median')).reset_index()
+    nomes = resumos.sort_values(['Serie', 'Quantidade'], ascending=[True, False], kind='stable') \
+        .drop_duplicates('Serie').set_index('Serie')
+    inicios = np.flatnonzero(np.r_[True, np.diff(por_mes['Serie'].to_numpy()) != 0])
+    fins = np.r_[inicios[1:], len(por_mes)]
+    todos_indices = _indice_mes(por_mes['Periodo'].to_numpy())
+    todos_centavos = por_mes['Centavos'].to_numpy()
+    todos_dias = por_mes['Dia'].to_numpy(dtype='float64')
+
+    series, calendario, pendentes = [], [], []
+    for inicio, fim in zip(inicios, fins):
+        indices = todos_indices[inicio:fim]
+        periodo = _estimar_periodo(indices)
+        if periodo is None:
+            continue
+
+        principal = nomes.loc[por_mes['Serie'].iat[inicio]]
+        valor_tipico = int(np.median(todos_centavos[inicio:fim]))
+        dias = todos_dias[inicio:fim]
+        dia_tipico = np.nanmedian(dias) if (~np.isnan(dias)).any() else np.nan
+        ultimo = int(indices[-1])
+        identificacao = {'Especificação': principal['Especificação'], 'Fornecedor': principal['Fornecedor'],
+                         'Centro de Custo': principal['Centro de Custo'], 'Periodicidade': PERIODICIDADES[periodo]}
+        series.append({
+            **identificacao, 'Período (meses)': periodo,
+            'Dia Típico': None if pd.isna(dia_tipico) else int(round(dia_tipico)),
+            'Valor Típico': valor_tipico, 'Ocorrências': len(indices),
+            'Último Pagamento': _periodo(ultimo), 'Próximo Vencimento': _data_prevista(_periodo(ultimo + periodo), dia_tipico),
+        })
+        if indice_referencia - ultimo > periodo * PERIODOS_ENCERRAMENTO:
+            continue
+
+        # Vencimentos sem pagamento: os recentes viram pendências, os do mês
+        # de referência ainda no prazo e os futuros vão para o calendário
+        pagos = set(indices.tolist())
+        esperado = ultimo + periodo
+        while esperado - periodo >= indice_referencia - MESES_PENDENTES and esperado - periodo > indices[0]:
+            esperado -= periodo
+        while esperado <= indice_referencia + HORIZONTE_MESES:
+            if esperado not in pagos:
+                data = _data_prevista(_periodo(esperado), dia_tipico)
+                if esperado < indice_referencia:
+                    situacao = 'Não pago'
+                elif esperado == indice_referencia and referencia > data + pd.Timedelta(days=TOLERANCIA_DIAS):
+                    situacao = 'Atrasado'
+                else:
+                    situacao = None
+                    calendario.append({'Data Prevista': data, **identificacao, 'Valor Previsto': valor_tipico})
+                if situacao is not None:
+                    pendentes.append({'Data Prevista': data, **identificacao, 'Valor Previsto': valor_tipico,
+                                      'Situação': situacao})
+            esperado += periodo
+
+    if not series:
+        return vazio
+    series = pd.DataFrame(series, columns=COLUNAS_SERIES).sort_values('Valor Típico', ascending=False)
+    calendario = pd.DataFrame(calendario)
+    if not calendario.empty:
+        calendario = calendario.sort_values(['Data Prevista', 'Valor Previsto'], ascending=[True, False])
+    pendentes = pd.DataFrame(pendentes)
+    if not pendentes.empty:
+        pendentes = pendentes.sort_values(['Data Prevista', 'Valor Previsto'], ascending=[False, False])
+    # Sem fornecedor nos dados (ex.: a planilha anual), a coluna sai
+    if (series['Fornecedor'] == '').all():
+        series, calendario, pendentes = (tabela.drop(columns='Fornecedor', errors='ignore')
+                                         for tabela in (series, calendario, pendentes))
+    return series.reset_index(drop=True), calendario.reset_index(drop=True), pendentes.reset_index(drop=True)
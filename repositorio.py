@@ -0,0 +1,231 @@
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Repositório de conjuntos de dados com invalidação por arquivo.
+# Cada conjunto sabe de quais arquivos depende; a versão é a impressão
+# digital (tamanho + mtime) desses arquivos. Quando ela muda, o conjunto e
+# seus agregados derivados são reconstruídos em segundo plano e trocados de
+# uma vez só, sem que uma sessão veja metade dos dados novos.
+# Os instantâneos ficam no cache limitado: um conjunto despejado por falta de
+# memória é simplesmente relido na próxima consulta. Um instantâneo maior que
+# o orçamento inteiro do cache (que o recusa) fica guardado à parte, fora do
+# orçamento, para não ser relido a cada consulta.
+# Opcionalmente cada instantâneo também é gravado em disco (pickle), com a
+# versão dos arquivos e a assinatura do código no nome: depois de reiniciar o
+# servidor, a primeira leitura é um pickle.load em vez de parsear o Excel.
+# Conjuntos com `diferenciar` e `incrementais` atualizam os derivados a partir
+# da versão anterior ainda em memória, aplicando só as linhas que mudaram.
+
+logger = logging.getLogger(__name__)
+
+Instantaneo = namedtuple('Instantaneo', ['dados', 'derivados', 'versao'])
+Conjunto = namedtuple('Conjunto', ['arquivos', 'carregar', 'derivados', 'incrementais', 'diferenciar'])
+
+
+# Impressão digital de uma lista de arquivos (arquivo ausente também conta)
+def impressao_digital(arquivos):
+    partes = []
+    for arquivo in sorted(arquivos):
+        try:
+            info = arquivo.stat()
+            partes.append(f"{arquivo}:{info.st_size}:{info.st_mtime_ns}")
+        except FileNotFoundError:
+            partes.append(f"{arquivo}:ausente")
+    return hashlib.sha1("|".join(partes).encode('utf-8')).hexdigest()[:12]
+
+
+class Repositorio:
+    def __init__(self, cache, max_workers=2, diretorio=None, assinatura=''):
+        self._cache = cache
+        self._diretorio = diretorio
+        self._assinatura = assinatura
+        self._conjuntos = {}
+        self._versoes = {}
+        self._grandes = {}
+        self._em_reconstrucao = {}
+        self._travas_carga = {}
+        self._trava = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='reconstrucao')
+
+    # arquivos: função que devolve os caminhos (reavaliada a cada verificação)
+    # carregar: função sem argumentos que lê e prepara os dados
+    # derivados: {nome: função(dados)} recalculados junto com o conjunto
+    # diferenciar: função(instantâneo anterior, dados, derivados) que devolve a
+    #   diferença entre as versões (ou None para recalcular tudo)
+    # incrementais: {nome: função(derivado anterior, diferença)} usadas no lugar
+    #   do derivado completo quando há diferença
+    def registrar(self, nome, arquivos, carregar, derivados=None, incrementais=None, diferenciar=None):
+        with self._trava:
+            if nome not in self._conjuntos:
+                self._conjuntos[nome] = Conjunto(arquivos, carregar, derivados or {}, incrementais or {}, diferenciar)
+                self._travas_carga[nome] = threading.Lock()
+
+    def registrado(self, nome):
+        return nome in self._conjuntos
+
+    def versao(self, nome):
+        conjunto = self._conjuntos[nome]
+        return impressao_digital(conjunto.arquivos())
+
+    # Devolve o instantâneo atual. Na primeira vez carrega de forma síncrona;
+    # depois, se os arquivos mudaram, agenda a reconstrução e segue servindo
+    # a versão anterior até a nova ficar pronta.
+    def obter(self, nome):
+        instantaneo = self._atual(nome)
+        if instantaneo is None:
+            with self._travas_carga[nome]:
+                instantaneo = self._atual(nome)
+                if instantaneo is None:
+                    instantaneo = self._construir(nome)
+                    self._trocar(nome, instantaneo)
+            return instantaneo
+
+        if self.versao(nome) != instantaneo.versao:
+            self.agendar(nome)
+        return instantaneo
+
+    def versoes(self):
+        return dict(self._versoes)
+
+    # Instantâneo servido: o do cache ou o guardado à parte por ser grande
+    def _atual(self, nome):
+        instantaneo = self._cache.obter(('conjunto', nome), 'conjuntos')
+        return instantaneo if instantaneo is not None else self._grandes.get(nome)
+
+    def _carregado(self, nome):
+        return self._cache.contem(('conjunto', nome)) or nome in self._grandes
+
+    # Conjuntos cujos arquivos incluem algum dos caminhos alterados
+    def afetados(self, caminhos):
+        caminhos = {str(c) for c in caminhos}
+        nomes = []
+        for nome, conjunto in list(self._conjuntos.items()):
+            if caminhos & {str(a) for a in conjunto.arquivos()}:
+                nomes.append(nome)
+        return nomes
+
+    # Reconstrói apenas os conjuntos já carregados cuja versão mudou
+    def verificar(self, caminhos=None):
+        nomes = self.afetados(caminhos) if caminhos is not None else list(self._versoes)
+        for nome in nomes:
+            versao = self._versoes.get(nome)
+            if versao is not None and self.versao(nome) != versao:
+                self.agendar(nome)
+
+    def agendar(self, nome):
+        with self._trava:
+            futuro = self._em_reconstrucao.get(nome)
+            if futuro is not None and not futuro.done():
+                return futuro
+            futuro = self._executor.submit(self._reconstruir, nome)
+            self._em_reconstrucao[nome] = futuro
+            return futuro
+
+    # Pré-carga: lê em segundo plano um conjunto que ainda não está no cache,
+    # para que a primeira consulta já o encontre pronto
+    def pre_carregar(self, nome):
+        if self._carregado(nome):
+            return None
+        with self._trava:
+            futuro = self._em_reconstrucao.get(nome)
+            if futuro is not None and not futuro.done():
+                return futuro
+            futuro = self._executor.submit(self._carregar_ausente, nome)
+            self._em_reconstrucao[nome] = futuro
+            return futuro
+
+    # Usa a mesma trava da carga síncrona: uma sessão que pedir o conjunto
+    # durante a pré-carga espera por ela em vez de ler o arquivo de novo
+    def _carregar_ausente(self, nome):
+        try:
+            with self._travas_carga[nome]:
+                if not self._carregado(nome):
+                    self._trocar(nome, self._construir(nome))
+        except Exception:
+            logger.exception("Falha ao pré-carregar '%s'", nome)
+
+    def _construir(self, nome, anterior=None):
+        conjunto = self._conjuntos[nome]
+        versao = self.versao(nome)
+        instantaneo = self._ler_disco(nome, versao)
+        if instantaneo is not None:
+            return instantaneo
+
+        dados = conjunto.carregar()
+        incrementais = conjunto.incrementais if anterior is not None and conjunto.diferenciar else {}
+        derivados = {chave: funcao(dados) for chave, funcao in conjunto.derivados.items()
+                     if chave not in incrementais}
+        if incrementais:
+            delta = conjunto.diferenciar(anterior, dados, derivados)
+            for chave, atualizar in incrementais.items():
+                if delta is not None and chave in anterior.derivados:
+                    derivados[chave] = atualizar(anterior.derivados[chave], delta)
+                else:
+                    derivados[chave] = conjunto.derivados[chave](dados)
+        instantaneo = Instantaneo(dados, derivados, versao)
+        self._gravar_disco(nome, instantaneo)
+        return instantaneo
+
+    def _prefixo_disco(self, nome):
+        return nome.replace('/', '--') + '-'
+
+    def _arquivo_disco(self, nome, versao):
+        return self._diretorio / f"{self._prefixo_disco(nome)}{versao}-{self._assinatura}.pkl"
+
+    def _ler_disco(self, nome, versao):
+        if self._diretorio is None:
+            return None
+        arquivo = self._arquivo_disco(nome, versao)
+        if not arquivo.exists():
+            return None
+        try:
+            with open(arquivo, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            logger.warning("Instantâneo em disco ilegível: %s", arquivo)
+            return None
+
+    # Gravação atômica (arquivo temporário + rename); versões antigas do mesmo
+    # conjunto são apagadas
+    def _gravar_disco(self, nome, instantaneo):
+        if self._diretorio is None:
+            return
+        try:
+            self._diretorio.mkdir(parents=True, exist_ok=True)
+            arquivo = self._arquivo_disco(nome, instantaneo.versao)
+            temporario = arquivo.with_suffix(f'.{threading.get_ident()}.tmp')
+            with open(temporario, 'wb') as f:
+                pickle.dump(instantaneo, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporario, arquivo)
+            for antigo in self._diretorio.glob(f"{self._prefixo_disco(nome)}*.pkl"):
+                if antigo != arquivo:
+                    antigo.unlink(missing_ok=True)
+        except OSError:
+            logger.warning("Não foi possível gravar o instantâneo de '%s' em disco", nome)
+
+    def _reconstruir(self, nome):
+        try:
+            novo = self._construir(nome, anterior=self._atual(nome))
+        except Exception:
+            # Arquivo ainda sendo gravado ou corrompido: mantém a versão atual
+            logger.exception("Falha ao reconstruir '%s'; mantendo versão anterior", nome)
+            return None
+
+        self._trocar(nome, novo)
+        logger.info("Conjunto '%s' atualizado para a versão %s", nome, novo.versao)
+        return novo
+
+    # Troca atômica: a sessão lê o instantâneo antigo ou o novo, nunca uma mistura
+    def _trocar(self, nome, instantaneo):
+        self._cache.guardar(('conjunto', nome), instantaneo, 'conjuntos')
+        if self._cache.contem(('conjunto', nome)):
+            self._grandes.pop(nome, None)
+        else:
+            logger.warning("Conjunto '%s' maior que o orçamento do cache; mantido fora dele", nome)
+            self._grandes[nome] = instantaneo
+        self._versoes[nome] = instantaneo.versao
@@ -1,21 +1,22 @@
 #!/bin/bash
 
-# Script para executar o Dashboard Mensal IPB
+# Script para executar o Dashboard IPB (páginas anual e mensal)
 # Uso: ./run_dashboard_mensal.sh
 
 echo "================================================"
-echo "    Dashboard Mensal IPB Rio Preto 2025"
+echo "    Dashboard IPB Rio Preto 2025"
 echo "================================================"
 echo ""
 echo "Iniciando o dashboard..."
 echo ""
 
-# Executar o streamlit
-python3 -m streamlit run dashboard_mensal.py
+# Aquecer o cache (dados, agregados e visão padrão) e executar o streamlit
+# no mesmo processo, para que o primeiro acesso já encontre tudo pronto
+python3 aquecimento.py --servir app.py
 
 # Se der erro, tentar com streamlit direto
 if [ $? -ne 0 ]; then
     echo ""
     echo "Tentando iniciar com 'streamlit' direto..."
-    streamlit run dashboard_mensal.py
+    streamlit run app.py
 fi
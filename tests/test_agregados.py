@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from agregados import Cubo
+
+
+def _despesas():
+    return pd.DataFrame({
+        'Mes_Num': [1, 1, 2, 2],
+        'Centro de Custo': ['MISSÕES', None, 'MISSÕES', None],
+        'Especificação': ['OFERTA', 'ÁGUA', 'OFERTA', 'LUZ'],
+        'Centavos': [1000, 250, 2000, 750],
+    })
+
+
+# Lançamentos sem Centro de Custo entram no cubo: o total do drill-down é o
+# mesmo do recorte
+def test_chave_vazia_entra_nos_totais():
+    cubo = Cubo(_despesas())
+    assert cubo.consultar({})['Total'].iloc[0] == 4000
+    por_centro = cubo.consultar({'Mes_Num': 1}, ('Centro de Custo',))
+    assert por_centro['Total'].sum() == 1250
+    assert por_centro['Centro de Custo'].isna().sum() == 1
+
+
+def test_drill_na_chave_vazia():
+    cubo = Cubo(_despesas())
+    resumo = cubo.consultar({'Centro de Custo': np.nan}).iloc[0]
+    assert (resumo['Total'], resumo['Quantidade']) == (1000, 2)
+    por_mes = cubo.consultar({'Centro de Custo': np.nan}, ('Mes_Num',))
+    assert por_mes['Total'].tolist() == [250, 750]
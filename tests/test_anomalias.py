@@ -0,0 +1,40 @@
+import pandas as pd
+
+from anomalias import pontuar_meses
+from cache_limitado import cache
+
+
+def _mes(dia, valores):
+    return pd.DataFrame({
+        'Data Lançamento': pd.to_datetime([dia] * len(valores)),
+        'Centro de Custo': 'MANUTENÇÃO', 'Especificação': 'ENERGIA', 'Fornecedor': 'CPFL',
+        'Centavos': valores,
+    })
+
+
+MESES = {'jan': _mes('2025-01-10', [10000] * 6), 'fev': _mes('2025-02-10', [10100] * 6),
+         'mar': _mes('2025-03-10', [10000, 900000])}
+
+
+def _pontuar(versoes, lidos):
+    def carregar(mes):
+        lidos.append(mes)
+        return MESES[mes]
+    return pontuar_meses([(mes, versoes[mes], lambda mes=mes: carregar(mes)) for mes in MESES])
+
+
+# Os passos ficam no cache pela versão: só o mês alterado e os seguintes
+# (cujo estado de partida mudou) são lidos de novo
+def test_so_le_os_meses_com_versao_nova():
+    cache.limpar()
+    versoes, lidos = {'jan': 1, 'fev': 1, 'mar': 1}, []
+    pontuados = _pontuar(versoes, lidos)
+    assert lidos == ['jan', 'fev', 'mar']
+    assert pontuados[pontuados['Mês'] == 'mar']['Fora do Padrão'].tolist() == [False, True]
+
+    lidos.clear()
+    _pontuar(versoes, lidos)
+    assert lidos == []
+
+    _pontuar(dict(versoes, fev=2), lidos)
+    assert lidos == ['fev', 'mar']
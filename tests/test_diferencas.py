@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from comparacao import agregado_mensal
+from diferencas import atualizar_agregado, diferenca, hash_linhas
+
+
+def _despesas():
+    # Centro de Custo vazio em algumas linhas, como na planilha real
+    return pd.DataFrame({
+        'Nº de Lançamento': [1, 2, 3, 4, 5, 6],
+        'Ano': [2025] * 6,
+        'Mes_Num': [1, 1, 1, 2, 2, 2],
+        'Centro de Custo': pd.array(['MISSÕES', None, None, 'MISSÕES', None, 'CAUSAS LOCAIS'], dtype='str'),
+        'Especificação': pd.array(['OFERTAS', 'LIVROS', 'LIVROS', 'OFERTAS', 'ÁGUA', None], dtype='str'),
+        'Centavos': np.array([1000, 28597, 500, 2000, 300, 700], dtype='int64'),
+    })
+
+
+def _atualizar(df_anterior, df_novo):
+    delta = diferenca(df_anterior, hash_linhas(df_anterior), df_novo, hash_linhas(df_novo))
+    return atualizar_agregado(agregado_mensal(df_anterior), delta)
+
+
+def _conferir(df_anterior, df_novo):
+    pd.testing.assert_frame_equal(_atualizar(df_anterior, df_novo), agregado_mensal(df_novo), check_dtype=False)
+
+
+def test_alteracao_em_grupo_com_chave_vazia():
+    anterior = _despesas()
+    novo = anterior.copy()
+    novo.loc[1, 'Centavos'] += 5
+    _conferir(anterior, novo)
+
+
+def test_alteracao_e_insercao_com_chave_vazia_nao_duplicam_grupo():
+    anterior = _despesas()
+    novo = anterior.copy()
+    novo.loc[1, 'Centavos'] += 5
+    inserida = novo.iloc[[2]].assign(**{'Nº de Lançamento': 7, 'Centavos': 42})
+    novo = pd.concat([novo, inserida], ignore_index=True)
+    atualizado = _atualizar(anterior, novo)
+    assert len(atualizado) == len(agregado_mensal(novo))
+    _conferir(anterior, novo)
+
+
+def test_grupo_novo_e_grupo_que_zera_com_chave_vazia():
+    anterior = _despesas()
+    novo = anterior.drop(index=[4]).copy()
+    novo.loc[5, 'Especificação'] = None
+    extra = anterior.iloc[[3]].assign(**{'Centro de Custo': None, 'Especificação': None, 'Centavos': 11})
+    novo = pd.concat([novo, extra], ignore_index=True)
+    _conferir(anterior, novo)
+
+
+@pytest.mark.parametrize('semente', range(10))
+def test_edicoes_aleatorias_conferem_com_recalculo(semente):
+    gerador = np.random.default_rng(semente)
+    centros = np.array(['MISSÕES', 'CAUSAS LOCAIS', None, 'PATRIMÔNIO'], dtype=object)
+    especificacoes = np.array(['OFERTAS', None, 'LIVROS', 'ÁGUA', 'LUZ'], dtype=object)
+    n = 300
+    anterior = pd.DataFrame({
+        'Nº de Lançamento': np.arange(n),
+        'Ano': 2025,
+        'Mes_Num': gerador.integers(1, 13, n),
+        'Centro de Custo': pd.array(gerador.choice(centros, n), dtype='str'),
+        'Especificação': pd.array(gerador.choice(especificacoes, n), dtype='str'),
+        'Centavos': gerador.integers(1, 100000, n).astype('int64'),
+    })
+    novo = anterior.copy()
+    alteradas = gerador.choice(n, 20, replace=False)
+    novo.loc[alteradas, 'Centavos'] += gerador.integers(-50, 50, 20)
+    novo.loc[alteradas[:5], 'Centro de Custo'] = None
+    novo = novo.drop(index=gerador.choice(n, 10, replace=False))
+    inseridas = anterior.sample(15, random_state=semente).assign(
+        **{'Nº de Lançamento': np.arange(n, n + 15), 'Mes_Num': gerador.integers(1, 13, 15)})
+    novo = pd.concat([novo, inseridas], ignore_index=True)
+    _conferir(anterior, novo)
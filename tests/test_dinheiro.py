@@ -0,0 +1,15 @@
+import pandas as pd
+
+from dinheiro import formatar_centavos, media_centavos
+
+
+def test_media_centavos_arredonda_ao_centavo():
+    assert media_centavos(pd.Series([10, 20, 20], dtype='int64')) == 17
+    assert media_centavos(pd.Series([1, 2], dtype='int64')) == 2
+    assert media_centavos(pd.Series([], dtype='int64')) == 0
+
+
+# Float de reais acumula erro na média; a soma em centavos não
+def test_media_centavos_sem_erro_de_float():
+    centavos = pd.Series([10] * 3 + [20] * 3, dtype='int64')
+    assert formatar_centavos(media_centavos(centavos)) == "R$ 0,15"
@@ -0,0 +1,39 @@
+import io
+
+import pandas as pd
+from openpyxl import load_workbook
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from exportacao_excel import exportar_xlsx
+
+
+def _lancamentos():
+    return pd.DataFrame({
+        'Data Lançamento': pd.to_datetime(['2025-12-01', '2025-12-07', None]),
+        'Especificação': ['DÍZIMOS', 'OFERTAS', 'DÍZIMOS'],
+        'Centro de Custo': ['DIZIMÁVEIS', None, 'DIZIMÁVEIS'],
+        'Valor': [10.1, 20.2, 0.3],
+        'Centavos': [1010, 2020, 30],
+    })
+
+
+# O download_button converte o retorno do callable com esta mesma função;
+# um tipo não aceito faz o botão falhar
+def test_exportar_xlsx_passa_pela_conversao_do_download_button():
+    dados = exportar_xlsx(_lancamentos(), 'Entradas')
+    convertido, _ = convert_data_to_bytes_and_infer_mime(dados, unsupported_error=TypeError("tipo não aceito"))
+    assert convertido == dados
+    assert convertido[:2] == b'PK'
+
+
+def test_exportar_xlsx_abas_e_valores():
+    livro = load_workbook(io.BytesIO(exportar_xlsx(_lancamentos(), 'Entradas')))
+    assert livro.sheetnames == ['Entradas', 'Resumo por Centro', 'Top 20 Especificações']
+
+    linhas = list(livro['Entradas'].iter_rows(values_only=True))
+    assert linhas[0] == ('Data Lançamento', 'Especificação', 'Centro de Custo', 'Valor')
+    assert [linha[3] for linha in linhas[1:]] == [10.1, 20.2, 0.3]
+    assert linhas[3][0] is None
+
+    resumo = list(livro['Resumo por Centro'].iter_rows(values_only=True))
+    assert resumo[-1] == ('Total', 3, 30.6, None)
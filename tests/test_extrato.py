@@ -0,0 +1,38 @@
+import pandas as pd
+
+from cache_limitado import cache
+from extrato import extrato
+
+
+def _lancamentos(dia, conta, valores):
+    return pd.DataFrame({'Data Lançamento': pd.to_datetime([dia] * len(valores)), 'Conta': conta,
+                         'Centavos': valores})
+
+
+MESES = {
+    'jan': (_lancamentos('2025-01-05', 'BB', [5000, 2000]), _lancamentos('2025-01-06', 'BB', [1000])),
+    'fev': (_lancamentos('2025-02-05', 'BB', [3000]), _lancamentos('2025-02-07', 'CEF', [500])),
+}
+
+
+def _extrato(versoes, lidos):
+    def carregar(mes):
+        lidos.append(mes)
+        return MESES[mes]
+    saldos = pd.DataFrame({'Conta': ['BB'], 'Centavos': [10000]})
+    return extrato([(mes, versoes[mes], lambda mes=mes: carregar(mes)) for mes in MESES], 'Conta', saldos)
+
+
+def test_saldo_encadeado_e_meses_lidos_so_quando_mudam():
+    cache.limpar()
+    versoes, lidos = {'jan': 1, 'fev': 1}, []
+    linhas, fechamento = _extrato(versoes, lidos)
+    assert fechamento == {'BB': 19000, 'CEF': -500}
+    assert linhas['Saldo'].tolist() == [17000, 16000, 19000, -500]
+
+    lidos.clear()
+    assert _extrato(versoes, lidos)[1] == fechamento
+    assert lidos == []
+
+    _extrato(dict(versoes, fev=2), lidos)
+    assert lidos == ['fev']
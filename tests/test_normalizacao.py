@@ -0,0 +1,51 @@
+import pandas as pd
+
+from normalizacao import CAMPOS_ARQUIVO, ler_mapeamento, normalizar_colunas
+
+COLUNA = 'Especificação'
+
+
+def _despesas():
+    return pd.DataFrame({COLUNA: ['ALESSANDRO - CESTA BÁSICA'] * 5 + ['ALESSANDRA - CESTA BÁSICA'] * 2
+                         + ['Alessandro - Cesta Basica', 'CAUSAS LOCAIS - ÁGUA E ESGOTO']
+                         + ['CAUSAS LOCAIS - ÁGUA E ESGOSTO'] * 2})
+
+
+# Nomes parecidos podem ser pessoas diferentes: só a mesma chave (acentos,
+# caixa, espaços) é unida sem revisão
+def test_so_junta_sozinho_nomes_de_mesma_chave(tmp_path):
+    resultado = normalizar_colunas(_despesas(), [COLUNA], tmp_path / 'nomes.csv', 'teste', tmp_path / 'propostos.csv')
+    contagens = resultado[COLUNA].value_counts()
+    assert contagens['ALESSANDRO - CESTA BÁSICA'] == 6
+    assert contagens['ALESSANDRA - CESTA BÁSICA'] == 2
+    assert contagens['CAUSAS LOCAIS - ÁGUA E ESGOTO'] == 1
+    assert 'Alessandro - Cesta Basica' not in contagens
+
+
+def test_propostas_por_semelhanca_vao_para_revisao(tmp_path):
+    nomes, propostos = tmp_path / 'nomes.csv', tmp_path / 'propostos.csv'
+    normalizar_colunas(_despesas(), [COLUNA], nomes, 'teste', propostos)
+    assert not nomes.exists()
+    revisao = ler_mapeamento(propostos)
+    assert set(revisao['aplicar']) == {'não'}
+    assert set(revisao['variante']) == {'ALESSANDRA - CESTA BÁSICA', 'CAUSAS LOCAIS - ÁGUA E ESGOTO'}
+
+
+def test_proposta_aceita_no_arquivo_e_aplicada(tmp_path):
+    nomes = tmp_path / 'nomes.csv'
+    pd.DataFrame([[COLUNA, 'CAUSAS LOCAIS - ÁGUA E ESGOTO', 'CAUSAS LOCAIS - ÁGUA E ESGOSTO', '0.964', 'sim']],
+                 columns=CAMPOS_ARQUIVO).to_csv(nomes, sep=';', index=False, encoding='utf-8-sig')
+    resultado = normalizar_colunas(_despesas(), [COLUNA], nomes, 'aceita')
+    contagens = resultado[COLUNA].value_counts()
+    assert contagens['CAUSAS LOCAIS - ÁGUA E ESGOSTO'] == 3
+    assert contagens['ALESSANDRA - CESTA BÁSICA'] == 2
+
+
+def test_propostas_voltam_depois_de_falha_na_gravacao(tmp_path):
+    nomes, propostos = tmp_path / 'nomes.csv', tmp_path / 'sem_pasta' / 'propostos.csv'
+    normalizar_colunas(_despesas(), [COLUNA], nomes, 'falha', propostos)
+    assert not propostos.exists()
+
+    propostos.parent.mkdir()
+    normalizar_colunas(_despesas(), [COLUNA], nomes, 'falha', propostos)
+    assert set(ler_mapeamento(propostos)['variante']) == {'ALESSANDRA - CESTA BÁSICA', 'CAUSAS LOCAIS - ÁGUA E ESGOTO'}
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from previsao import Previsao, fim_comum
+
+
+def _tabela(coluna, ultimo_mes):
+    return pd.DataFrame({coluna: 'A', 'Periodo': [202400 + mes for mes in range(1, 13)]
+                         + [202500 + mes for mes in range(1, ultimo_mes + 1)],
+                         'Centavos': 1000})
+
+
+# Despesas até junho e receitas até maio: as duas projeções terminam em
+# dezembro e casam mês a mês pelo período
+def test_projecoes_terminam_no_mesmo_mes():
+    despesas, receitas = _tabela('Centro de Custo', 6), _tabela('Categoria', 5)
+    fim = fim_comum([202506, 202505])
+    assert fim == 202512
+    modelo_despesas = Previsao(despesas, 'Centro de Custo', fim)
+    modelo_receitas = Previsao(receitas, 'Categoria', fim)
+    assert modelo_despesas.futuro == list(range(202507, 202513))
+    assert modelo_receitas.futuro == list(range(202506, 202513))
+    juntas = modelo_receitas.projetar().merge(modelo_despesas.projetar(), on='Periodo')
+    assert juntas['Periodo'].tolist() == list(range(202507, 202513))
+    assert juntas.notna().all().all()
+
+
+def test_horizonte_padrao_fecha_o_ano():
+    assert Previsao(_tabela('Categoria', 12), 'Categoria').futuro == list(range(202601, 202613))
+    assert Previsao(_tabela('Categoria', 5), 'Categoria').futuro == list(range(202506, 202513))
@@ -0,0 +1,22 @@
+from cache_limitado import CacheLimitado
+from repositorio import Repositorio
+
+
+# Um conjunto maior que o orçamento do cache é recusado por ele, mas continua
+# servido sem ser relido a cada consulta; a recusa aparece nas métricas
+def test_conjunto_maior_que_o_orcamento_nao_e_relido(tmp_path):
+    arquivo = tmp_path / 'dados.csv'
+    arquivo.write_text('x')
+    leituras = []
+
+    def carregar():
+        leituras.append(1)
+        return list(range(10000))
+
+    cache = CacheLimitado(1024)
+    repositorio = Repositorio(cache)
+    repositorio.registrar('grande', arquivos=lambda: [arquivo], carregar=carregar)
+    primeiro = repositorio.obter('grande')
+    assert repositorio.obter('grande') is primeiro
+    assert len(leituras) == 1
+    assert cache.metricas()['rejeitados'] == 1
@@ -0,0 +1,323 @@
+import numpy as np
+import pandas as pd
+
+from dinheiro import para_centavos
+
+# Validação vetorizada das planilhas na ingestão.
+# Cada verificação gera uma máscara booleana para a coluna inteira; linhas
+# inválidas vão para um relatório de quarentena em vez de interromper o
+# carregamento ou distorcer silenciosamente os totais.
+
+MESES_COLUNAS = ['JANEIRO', 'FEVEREIRO', 'MARÇO', 'ABRIL', 'MAIO', 'JUNHO',
+                 'JULHO', 'AGOSTO', 'SETEMBRO', 'OUTUBRO', 'NOVEMBRO', 'DEZEMBRO']
+
+COLUNAS_DESPESAS = ['Especificação', 'Valor', 'Mês Ano Ref.', 'Centro de Custo']
+COLUNAS_MENSAL = ['Data Lançamento', 'Especificação', 'Valor']
+COLUNA_CATEGORIA_RECEITAS = 'A) DIZIMAVEIS IGREJA'
+COLUNA_CENTRO_ORCAMENTO = 'Centro de Custo'
+COLUNA_ANUAL_ORCAMENTO = 'Orçamento Anual'
+COLUNA_CONTA = 'Conta'
+COLUNA_SALDO_INICIAL = 'Saldo Inicial'
+
+# Tolerância para comparação de totais (meio centavo)
+TOLERANCIA_TOTAL = 0.005
+
+
+# Monta o relatório de quarentena a partir de um DataFrame de máscaras
+# (uma coluna por motivo). O texto do motivo é montado só para as linhas ruins.
+def _separar(df, mascaras):
+    if mascaras.empty:
+        return df, _quarentena_vazia(df)
+
+    invalidas = mascaras.any(axis=1).to_numpy()
+    if not invalidas.any():
+        return df, _quarentena_vazia(df)
+
+    motivos = mascaras[invalidas].dot(mascaras.columns + '; ').str.rstrip('; ')
+    quarentena = df[invalidas].copy()
+    quarentena.insert(0, 'Motivo', motivos.to_numpy())
+    # Número da linha como aparece no Excel (cabeçalho na linha 1)
+    quarentena.insert(0, 'Linha', df.index[invalidas] + 2)
+
+    return df[~invalidas], quarentena
+
+
+# Linhas válidas ganham a coluna 'Centavos' (int64), base de todas as somas;
+# 'Valor' passa a ser exatamente Centavos / 100 (para exibição e gráficos)
+def _com_centavos(resultado):
+    validos, quarentena = resultado
+    validos = validos.copy()
+    validos['Centavos'] = para_centavos(pd.to_numeric(validos['Valor'], errors='coerce'))
+    validos['Valor'] = validos['Centavos'] / 100
+    return validos, quarentena
+
+
+def _quarentena_vazia(df):
+    quarentena = df.iloc[0:0].copy()
+    quarentena.insert(0, 'Motivo', pd.Series(dtype='object'))
+    quarentena.insert(0, 'Linha', pd.Series(dtype='int64'))
+    return quarentena
+
+
+# Quando falta uma coluna obrigatória, o arquivo inteiro vai para quarentena
+def _verificar_esquema(df, obrigatorias):
+    ausentes = [col for col in obrigatorias if col not in df.columns]
+    if not ausentes:
+        return None
+
+    mascaras = pd.DataFrame(
+        {f"coluna ausente: {col}": np.ones(len(df), dtype=bool) for col in ausentes},
+        index=df.index
+    )
+    _, quarentena = _separar(df, mascaras)
+    validos = pd.DataFrame(columns=list(df.columns) + ausentes)
+    return validos, quarentena
+
+
+# Números digitados no padrão brasileiro ("1.234,56") viram float; o que já
+# é número passa direto
+def _numero(serie):
+    if pd.api.types.is_numeric_dtype(serie):
+        return pd.to_numeric(serie, errors='coerce')
+    texto = serie.astype('string').str.strip()
+    brasileiro = texto.str.contains(',', regex=False, na=False).astype(bool)
+    texto = texto.where(~brasileiro, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(texto, errors='coerce').astype('float64')
+
+
+# Datas de texto: ISO ("2025-12-01", comum em CSV e SQLite) ou no padrão
+# brasileiro ("01/12/2025"); o que já é data passa direto
+def _data(serie):
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    texto = serie.astype('string').str.strip()
+    iso = texto.str.match(r'^\d{4}-\d{2}-\d{2}', na=False).astype(bool)
+    data = pd.to_datetime(texto.where(~iso), errors='coerce', dayfirst=True)
+    if iso.any():
+        data = data.where(~iso, pd.to_datetime(texto.where(iso), errors='coerce', format='ISO8601'))
+    return data
+
+
+# Converte 'Mês Ano Ref.' (MM/AAAA) em mês e ano numéricos de uma vez só
+def separar_mes_ano(serie):
+    partes = serie.astype('string').str.strip().str.extract(r'^(\d{1,2})/(\d{4})$')
+    mes = pd.to_numeric(partes[0], errors='coerce')
+    ano = pd.to_numeric(partes[1], errors='coerce')
+    mes = mes.where(mes.between(1, 12))
+    return mes, ano
+
+
+# Valida a planilha anual de despesas
+def validar_despesas(df):
+    esquema = _verificar_esquema(df, COLUNAS_DESPESAS)
+    if esquema is not None:
+        return _com_centavos(esquema)
+
+    df = df.copy()
+    mascaras = pd.DataFrame(index=df.index)
+
+    valor = pd.to_numeric(df['Valor'], errors='coerce')
+    mascaras['Valor não numérico'] = valor.isna() & df['Valor'].notna()
+    mascaras['Valor vazio'] = df['Valor'].isna()
+    mascaras['Valor não finito'] = np.isinf(valor.fillna(0))
+    df['Valor'] = valor.astype('float64')
+
+    mes, ano = separar_mes_ano(df['Mês Ano Ref.'])
+    mascaras['Mês Ano Ref. inválido'] = mes.isna() | ano.isna()
+    df['Mes_Num'] = mes.fillna(0).astype('int64')
+    df['Ano'] = ano.fillna(0).astype('int64')
+
+    if 'Data Lançamento' in df.columns:
+        data = _data(df['Data Lançamento'])
+        mascaras['Data Lançamento inválida'] = data.isna() & df['Data Lançamento'].notna()
+        df['Data Lançamento'] = data
+
+    # Linhas de total coladas no fim da planilha somariam o ano em dobro
+    mascaras['linha de total'] = df['Especificação'].astype('string').str.match(
+        r'(?i)^\s*total', na=False
+    ).astype(bool)
+
+    return _com_centavos(_separar(df, mascaras))
+
+
+# Valida uma planilha mensal (entradas ou saídas)
+def validar_mensal(df):
+    if df.empty:
+        return df, _quarentena_vazia(df)
+
+    esquema = _verificar_esquema(df, COLUNAS_MENSAL)
+    if esquema is not None:
+        return _com_centavos(esquema)
+
+    df = df.copy()
+    mascaras = pd.DataFrame(index=df.index)
+
+    valor = pd.to_numeric(df['Valor'], errors='coerce')
+    mascaras['Valor não numérico'] = valor.isna() & df['Valor'].notna()
+    mascaras['Valor vazio'] = df['Valor'].isna()
+    mascaras['Valor não finito'] = np.isinf(valor.fillna(0))
+    df['Valor'] = valor.astype('float64')
+
+    data = _data(df['Data Lançamento'])
+    mascaras['Data Lançamento inválida'] = data.isna() & df['Data Lançamento'].notna()
+    mascaras['Data Lançamento vazia'] = df['Data Lançamento'].isna()
+    df['Data Lançamento'] = data
+
+    mascaras['Especificação vazia'] = df['Especificação'].isna()
+
+    if 'Mês Ano Ref.' in df.columns:
+        mes, ano = separar_mes_ano(df['Mês Ano Ref.'])
+        mascaras['Mês Ano Ref. inválido'] = (mes.isna() | ano.isna()) & df['Mês Ano Ref.'].notna()
+
+    return _com_centavos(_separar(df, mascaras))
+
+
+# Valida a planilha de receitas (formato largo, um mês por coluna).
+# Retorna as linhas de categoria válidas, ainda no formato largo, com os
+# meses já convertidos para número.
+def validar_receitas(df):
+    esquema = _verificar_esquema(df, [COLUNA_CATEGORIA_RECEITAS])
+    if esquema is not None:
+        return esquema
+
+    df = df.copy()
+    meses = [mes for mes in MESES_COLUNAS if mes in df.columns]
+    mascaras = pd.DataFrame(index=df.index)
+
+    # Linhas de título, separadores e subtotais não são categorias
+    categoria = df[COLUNA_CATEGORIA_RECEITAS]
+    estrutural = categoria.isna() | categoria.astype('string').str.contains('Total|total', na=False).astype(bool)
+
+    valores = df[meses].apply(pd.to_numeric, errors='coerce')
+    nao_numericos = valores.isna() & df[meses].notna()
+    for mes in meses:
+        mascaras[f"{mes.capitalize()} não numérico"] = nao_numericos[mes] & ~estrutural
+
+    # A coluna TOTAL da própria planilha deve bater com a soma dos meses
+    if 'TOTAL' in df.columns:
+        total = pd.to_numeric(df['TOTAL'], errors='coerce')
+        soma = valores.sum(axis=1)
+        mascaras['TOTAL divergente da soma dos meses'] = (
+            total.notna() & ((soma - total).abs() > TOLERANCIA_TOTAL) & ~estrutural
+        )
+
+    df[meses] = valores
+    validos, quarentena = _separar(df, mascaras)
+    return validos[~estrutural[validos.index]], quarentena
+
+
+# Valida a planilha de orçamento: uma linha por centro de custo, com um valor
+# por mês (JANEIRO..DEZEMBRO) ou só o 'Orçamento Anual' (dividido por 12).
+# A coluna 'Ano' é opcional; sem ela o orçamento vale para qualquer ano.
+# Retorna o orçamento no formato longo (Centro de Custo, Ano, Mes_Num, Centavos).
+def validar_orcamento(df):
+    df = df.rename(columns=lambda c: str(c).strip())
+    df = df.rename(columns={c: c.upper() for c in df.columns if c.upper() in MESES_COLUNAS})
+
+    esquema = _verificar_esquema(df, [COLUNA_CENTRO_ORCAMENTO])
+    if esquema is not None:
+        return _orcamento_vazio(), esquema[1]
+
+    df = df.copy()
+    meses = [mes for mes in MESES_COLUNAS if mes in df.columns]
+    anual = COLUNA_ANUAL_ORCAMENTO in df.columns
+    mascaras = pd.DataFrame(index=df.index)
+
+    if not meses and not anual:
+        mascaras[f"sem colunas de mês nem '{COLUNA_ANUAL_ORCAMENTO}'"] = np.ones(len(df), dtype=bool)
+        _, quarentena = _separar(df, mascaras)
+        return _orcamento_vazio(), quarentena
+
+    centro = df[COLUNA_CENTRO_ORCAMENTO].astype('string').str.strip()
+    # Linhas de total somariam o orçamento em dobro
+    mascaras['linha de total'] = centro.str.match(r'(?i)^total', na=False).astype(bool)
+    mascaras['Centro de Custo vazio'] = centro.isna() | (centro == '')
+    df[COLUNA_CENTRO_ORCAMENTO] = centro
+
+    if 'Ano' in df.columns:
+        ano = pd.to_numeric(df['Ano'], errors='coerce')
+        mascaras['Ano inválido'] = ano.isna() & df['Ano'].notna()
+        df['Ano'] = ano.fillna(0).astype('int64')
+    else:
+        df['Ano'] = 0
+
+    colunas_valor = meses if meses else [COLUNA_ANUAL_ORCAMENTO]
+    valores = df[colunas_valor].apply(_numero)
+    nao_numericos = valores.isna() & df[colunas_valor].notna()
+    for coluna in colunas_valor:
+        mascaras[f"{coluna.capitalize()} não numérico"] = nao_numericos[coluna]
+    mascaras['Orçamento negativo'] = (valores < 0).any(axis=1)
+
+    mascaras['Centro de Custo repetido'] = (
+        df.duplicated([COLUNA_CENTRO_ORCAMENTO, 'Ano'], keep='first') & ~mascaras['Centro de Custo vazio']
+    )
+
+    df[colunas_valor] = valores
+    validos, quarentena = _separar(df, mascaras)
+    validos = validos.fillna({coluna: 0.0 for coluna in colunas_valor})
+
+    if meses:
+        longo = validos.melt(id_vars=[COLUNA_CENTRO_ORCAMENTO, 'Ano'], value_vars=meses,
+                             var_name='Mes', value_name='Orcado')
+        mes_num = longo['Mes'].map({mes: i + 1 for i, mes in enumerate(MESES_COLUNAS)})
+    else:
+        # Só o valor anual: reparte igualmente pelos 12 meses
+        longo = validos.loc[validos.index.repeat(12), [COLUNA_CENTRO_ORCAMENTO, 'Ano']]
+        # Centavos que sobram da divisão ficam nos primeiros meses (soma exata)
+        anual = para_centavos(validos[COLUNA_ANUAL_ORCAMENTO].to_numpy())
+        base, sobra = np.divmod(anual, 12)
+        longo['Orcado'] = np.repeat(base, 12) + (np.tile(np.arange(12), len(validos)) < np.repeat(sobra, 12))
+        mes_num = pd.Series(np.tile(np.arange(1, 13), len(validos)), index=longo.index)
+
+    if meses:
+        longo['Orcado'] = para_centavos(longo['Orcado'].to_numpy())
+    orcamento = pd.DataFrame({
+        'Centro de Custo': longo[COLUNA_CENTRO_ORCAMENTO].to_numpy(dtype=object),
+        'Ano': longo['Ano'].to_numpy(dtype='int64'),
+        'Mes_Num': mes_num.to_numpy(dtype='int64'),
+        'Centavos': longo['Orcado'].to_numpy(dtype='int64')
+    })
+    return orcamento, quarentena
+
+
+def _orcamento_vazio():
+    return pd.DataFrame({
+        'Centro de Custo': pd.Series(dtype='object'),
+        'Ano': pd.Series(dtype='int64'),
+        'Mes_Num': pd.Series(dtype='int64'),
+        'Centavos': pd.Series(dtype='int64')
+    })
+
+
+# Valida os saldos iniciais das contas: uma linha por conta com o saldo de
+# abertura (antes do primeiro mês das planilhas mensais). Saldo negativo é
+# aceito (conta descoberta). Retorna (Conta, Centavos) e a quarentena.
+def validar_saldos(df):
+    df = df.rename(columns=lambda c: str(c).strip())
+    esquema = _verificar_esquema(df, [COLUNA_CONTA, COLUNA_SALDO_INICIAL])
+    if esquema is not None:
+        return _saldos_vazios(), esquema[1]
+
+    df = df.copy()
+    mascaras = pd.DataFrame(index=df.index)
+
+    conta = df[COLUNA_CONTA].astype('string').str.strip()
+    mascaras['Conta vazia'] = conta.isna() | (conta == '')
+    mascaras['Conta repetida'] = conta.duplicated(keep='first') & ~mascaras['Conta vazia']
+    df[COLUNA_CONTA] = conta
+
+    saldo = _numero(df[COLUNA_SALDO_INICIAL])
+    mascaras['Saldo Inicial não numérico'] = saldo.isna() & df[COLUNA_SALDO_INICIAL].notna()
+    mascaras['Saldo Inicial não finito'] = np.isinf(saldo.fillna(0))
+    df[COLUNA_SALDO_INICIAL] = saldo.fillna(0.0)
+
+    validos, quarentena = _separar(df, mascaras)
+    saldos = pd.DataFrame({
+        'Conta': validos[COLUNA_CONTA].to_numpy(dtype=object),
+        'Centavos': para_centavos(validos[COLUNA_SALDO_INICIAL].to_numpy()).astype('int64')
+    })
+    return saldos, quarentena
+
+
+def _saldos_vazios():
+    return pd.DataFrame({'Conta': pd.Series(dtype='object'), 'Centavos': pd.Series(dtype='int64')})